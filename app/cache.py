@@ -0,0 +1,111 @@
+# app/cache.py
+# Ограниченный in-process кэш: LRU + TTL, лимиты по числу записей и по байтам
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Entry(NamedTuple):
+    value: object
+    size: int
+    expires_at: float
+
+
+class LRUTTLCache(Generic[K, V]):
+    """
+    LRU-кэш с TTL на запись.
+    Вытесняет самые давние по использованию записи, пока не уложится и в max_entries,
+    и в max_bytes (размер записи передаёт вызывающий). on_remove вызывается
+    на любое удаление записи (вытеснение, истечение TTL, pop, clear) — через него
+    владелец кэша чистит свои вторичные индексы.
+    Не потокобезопасен: рассчитан на один event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        on_remove: Optional[Callable[[K, V], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._on_remove = on_remove
+        self._clock = clock
+        self._data: "OrderedDict[K, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= self._clock():
+            self.expirations += 1
+            self.misses += 1
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry.value  # type: ignore[return-value]
+
+    def peek(self, key: K) -> Optional[V]:
+        """Как get, но без учёта в счётчиках и без продвижения в LRU."""
+        entry = self._data.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            return None
+        return entry.value  # type: ignore[return-value]
+
+    def set(self, key: K, value: V, *, size: int = 1) -> None:
+        if key in self._data:
+            self._remove(key)
+        if size > self.max_bytes:
+            return  # запись больше всего кэша — не кладём
+        self._data[key] = _Entry(value, size, self._clock() + self.ttl)
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self.evictions += 1
+            self._remove(oldest)
+
+    def pop(self, key: K) -> Optional[V]:
+        if key not in self._data:
+            return None
+        return self._remove(key)
+
+    def clear(self) -> None:
+        for key in list(self._data):
+            self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: K) -> V:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+        if self._on_remove is not None:
+            self._on_remove(key, entry.value)  # type: ignore[arg-type]
+        return entry.value  # type: ignore[return-value]
@@ -0,0 +1,85 @@
+# app/commands.py
+# Служебные команды обслуживания БД:
+#   python -m app.commands recount-likes
+#   python -m app.commands recount-follows
+#   python -m app.commands rebuild-timelines
+#   python -m app.commands migrate-media-layout
+#   python -m app.commands remove-flat-media
+#   python -m app.commands build-media-variants
+import argparse
+import asyncio
+
+from app.db.session import SessionLocal
+from app.services import likes as like_service
+from app.services import media_layout, media_variants, timeline
+from app.services import users as user_service
+
+
+async def recount_likes() -> None:
+    """Пересчитать tweets.likes_count по таблице likes."""
+    async with SessionLocal() as session:
+        fixed = await like_service.recount_likes(session)
+        await session.commit()
+    print(f"✅ likes_count пересчитан, исправлено твитов: {fixed}")
+
+
+async def recount_follows() -> None:
+    """Пересчитать users.followers_count / following_count по таблице follows."""
+    async with SessionLocal() as session:
+        fixed = await user_service.recount_follows(session)
+        await session.commit()
+    print(f"✅ счётчики подписок пересчитаны, исправлено пользователей: {fixed}")
+
+
+async def rebuild_timelines() -> None:
+    """Пересобрать home_timeline по follows + tweets."""
+    async with SessionLocal() as session:
+        rows = await timeline.rebuild_all(session)
+        await session.commit()
+    print(f"✅ home_timeline пересобрана, строк: {rows}")
+
+
+async def migrate_media_layout() -> None:
+    """Перенести старые медиафайлы в раскладку ab/cd/<sha256>.<ext> (можно прерывать)."""
+    report = await media_layout.migrate_layout()
+    print(
+        f"✅ медиа перенесены: {report['moved']} (пачек: {report['batches']}, "
+        f"дубликатов: {report['deduplicated']}, нет файла: {report['missing']})"
+    )
+
+
+async def remove_flat_media() -> None:
+    """Удалить старые плоские файлы, на которые уже не ссылается ни одна строка medias."""
+    removed = await media_layout.remove_flat_files()
+    print(f"✅ удалено старых медиафайлов: {removed}")
+
+
+async def build_media_variants() -> None:
+    """Достроить превью / WebP / копии без EXIF картинкам, у которых их нет."""
+    if not media_variants.available():
+        print("❌ нужен Pillow: pip install pillow")
+        return
+    built = await media_variants.variant_pipeline.build_missing()
+    await media_variants.variant_pipeline.close()
+    print(f"✅ производные построены для медиа: {built}")
+
+
+COMMANDS = {
+    "recount-likes": recount_likes,
+    "recount-follows": recount_follows,
+    "rebuild-timelines": rebuild_timelines,
+    "migrate-media-layout": migrate_media_layout,
+    "remove-flat-media": remove_flat_media,
+    "build-media-variants": build_media_variants,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
+
+
+if __name__ == "__main__":
+    main()
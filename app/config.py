@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -5,9 +7,94 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     # локально по умолчанию SQLite, в Docker/проде переопределим на Postgres
     DATABASE_URL: str = Field(default="sqlite+aiosqlite:///./app.db")
+    # движок и пул соединений (к primary и к репликам одинаково)
+    DB_ECHO: bool = False  # логировать каждый SQL-запрос — только для отладки
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # сек ожидания свободного соединения
+    DB_POOL_RECYCLE: int = 1800  # сек жизни соединения (-1 — без ограничения)
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg: кэш подготовленных выражений на соединение (0 — за pgbouncer в transaction-режиме)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # SQLite: PRAGMA на каждое новое соединение (пусто / None — не трогать)
+    SQLITE_JOURNAL_MODE: Optional[str] = "WAL"
+    SQLITE_SYNCHRONOUS: Optional[str] = "NORMAL"
+    SQLITE_CACHE_SIZE: Optional[int] = -64_000  # < 0 — в КиБ, т.е. ~64 МБ
+    SQLITE_MMAP_SIZE: Optional[int] = 256 * 1024 * 1024
+    # реплики только для чтения (JSON-список URL); пусто — всё читается с DATABASE_URL
+    DATABASE_REPLICA_URLS: list[str] = Field(default_factory=list)
+    # после записи клиент столько секунд читает с primary (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
     # любые прочие настройки
     SECRET_KEY: str = Field(default="change-me")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # in-process кэш api_key → пользователь (без SELECT на каждый запрос);
+    # негативный кэш неизвестных ключей — с коротким TTL
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_MAX_ENTRIES: int = 100_000
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_CACHE_NEGATIVE_MAX_ENTRIES: int = 100_000
+    AUTH_CACHE_NEGATIVE_TTL_SECONDS: float = 10.0
+    # пагинация ленты: размер страницы по умолчанию (если пришёл только cursor) и потолок limit
+    FEED_PAGE_SIZE: int = 50
+    FEED_MAX_PAGE_SIZE: int = 200
+    # стратегия ленты: pull (сборка при чтении), push (fan-out on write), hybrid
+    FEED_STRATEGY: Literal["pull", "push", "hybrid"] = "push"
+    # hybrid: авторы с таким числом подписчиков и больше читаются pull-ом
+    FEED_CELEBRITY_FOLLOWERS: int = 10_000
+    # сколько последних твитов автора кладём в ленту нового подписчика
+    TIMELINE_BACKFILL_LIMIT: int = 800
+    # in-process кэш ленты (LRU + TTL); TTL ограничивает устаревание при нескольких воркерах
+    FEED_CACHE_ENABLED: bool = False
+    FEED_CACHE_MAX_ENTRIES: int = 10_000
+    FEED_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    FEED_CACHE_TTL_SECONDS: float = 30.0
+    # потоковая выдача (NDJSON / chunked JSON): сколько строк курсора обрабатываем за раз
+    FEED_STREAM_CHUNK_SIZE: int = 500
+    # компактный режим лайков: сколько последних лайкнувших встраивать в твит
+    LIKES_PREVIEW_SIZE: int = 3
+    # GET /api/tweets/{id}/likes: размер страницы по умолчанию и потолок limit
+    LIKES_PAGE_SIZE: int = 100
+    LIKES_MAX_PAGE_SIZE: int = 1000
+    # write-behind лайков: запрос ждёт записи пачки; пачка уходит не позже MAX_DELAY_MS
+    # после первого намерения в ней (максимальная задержка записи) или набрав MAX_BATCH
+    LIKES_WRITE_BEHIND: bool = False
+    LIKES_WRITE_BEHIND_MAX_DELAY_MS: float = 5.0
+    LIKES_WRITE_BEHIND_MAX_BATCH: int = 1000
+    # загрузка медиа: чтение кусками, запись на диск в отдельном пуле из MEDIA_WRITE_THREADS
+    # потоков; fsync: off — как ОС решит, file — fsync файла до ответа,
+    # full — ещё и каталога (переименование .part → итоговое имя переживёт сбой питания)
+    MEDIA_UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MEDIA_WRITE_THREADS: int = 4
+    MEDIA_FSYNC: Literal["off", "file", "full"] = "file"
+    # перенос старых файлов в раскладку ab/cd/<sha256>.<ext>: строк Media на транзакцию
+    MEDIA_MIGRATION_BATCH_SIZE: int = 500
+    # производные картинок (превью, WebP для ленты, копия без EXIF): строятся в фоне после
+    # загрузки в пуле из MEDIA_VARIANT_PROCESSES процессов (нужен Pillow). Заданий в очереди
+    # больше MAX_QUEUE — новые отбрасываются (достроить: python -m app.commands build-media-variants)
+    MEDIA_VARIANTS_ENABLED: bool = False
+    MEDIA_VARIANT_PROCESSES: int = 2
+    MEDIA_VARIANT_MAX_QUEUE: int = 1000
+    MEDIA_THUMB_SIZE: int = 320  # px по длинной стороне
+    MEDIA_FEED_SIZE: int = 1280
+    MEDIA_WEBP_QUALITY: int = 80
+    # раздача /media: файлы читаются кусками по SERVE_CHUNK_SIZE (кусок = переход в поток);
+    # за nginx — префикс internal-location для X-Accel-Redirect (файл отдаёт nginx через
+    # sendfile), пусто — отдаёт приложение (сервер с http.response.pathsend — без копирования)
+    MEDIA_SERVE_CHUNK_SIZE: int = 1024 * 1024
+    MEDIA_ACCEL_REDIRECT: str = ""
+    # in-process граф подписок (CSR): «на кого подписан» без запроса в БД; журнал
+    # изменений вливается в массивы, набрав COMPACT_THRESHOLD рёбер. При нескольких
+    # воркерах чужие подписки видны после перезагрузки раз в RELOAD_SECONDS (0 — никогда)
+    FOLLOW_GRAPH_ENABLED: bool = False
+    FOLLOW_GRAPH_COMPACT_THRESHOLD: int = 10_000
+    FOLLOW_GRAPH_RELOAD_SECONDS: float = 0.0
+    # профиль: сколько подписчиков / подписок встраивать списком (для старых клиентов);
+    # полные списки — GET /api/users/{id}/followers и /following
+    PROFILE_FOLLOWS_PREVIEW_SIZE: int = 100
+    # GET /api/users/{id}/followers|following: размер страницы по умолчанию и потолок limit
+    FOLLOWS_PAGE_SIZE: int = 100
+    FOLLOWS_MAX_PAGE_SIZE: int = 1000
 
     model_config = SettingsConfigDict(
         env_file=".env.local",  # читать переменные из .env.local
@@ -0,0 +1,21 @@
+# app/db/dialects.py
+# Различия бэкендов, нужные сервисам: диалект сессии и разбор ошибок целостности
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# SQLSTATE foreign_key_violation (Postgres: asyncpg и psycopg отдают его в .sqlstate)
+_PG_FOREIGN_KEY_VIOLATION = "23503"
+
+
+def dialect_name(session: AsyncSession) -> str:
+    """Имя диалекта, к которому привязана сессия: "postgresql", "sqlite"."""
+    return session.get_bind().dialect.name
+
+
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    """IntegrityError из-за ссылки на несуществующую строку (а не дубля / NOT NULL)."""
+    orig = exc.orig
+    if getattr(orig, "sqlstate", None) == _PG_FOREIGN_KEY_VIOLATION:
+        return True
+    # SQLite (только при PRAGMA foreign_keys=ON)
+    return getattr(orig, "sqlite_errorname", None) == "SQLITE_CONSTRAINT_FOREIGNKEY"
@@ -1,9 +1,12 @@
 # Стандартная библиотека
-# (здесь ничего не нужно)
-
-# Сторонние пакеты
+import itertools
+import time
 from collections.abc import AsyncGenerator
+from typing import Any, Dict, List, Sequence
 
+# Сторонние пакеты
+from fastapi import Request, Response
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -14,12 +17,66 @@ from sqlalchemy.ext.asyncio import (
 # локальные пакеты
 from app.config import settings
 
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Параметры create_async_engine из Settings с учётом диалекта."""
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO, "future": True}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options  # in-memory SQLite живёт на одном соединении (StaticPool) — пул не настроить
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+def _sqlite_pragmas() -> List[str]:
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items() if value not in (None, "")]
+
+
+def make_engine(url: str, **overrides: Any) -> AsyncEngine:
+    """Движок по настройкам (overrides — поверх них, например pool_size в бенчмарке)."""
+    eng = create_async_engine(url, **{**engine_options(url), **overrides})
+    if eng.dialect.name == "sqlite":
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(eng.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection: Any, _record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return eng
+
+
+def read_only_sessionmaker(eng: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """
+    Фабрика сессий только для чтения. На Postgres каждая транзакция открывается
+    как READ ONLY (без xid, сервер может не готовить запись; на hot standby так и так
+    только чтение) и REPEATABLE READ: версия для ETag и тело ответа читаются из одного
+    снимка. У SQLite такого режима нет: отложенный BEGIN и так берёт лишь разделяемую
+    блокировку, а снимок держится до конца транзакции, поэтому движок используется как есть.
+    """
+    if eng.dialect.name == "postgresql":
+        eng = eng.execution_options(postgresql_readonly=True, isolation_level="REPEATABLE READ")
+    return async_sessionmaker(bind=eng, expire_on_commit=False, class_=AsyncSession)
+
+
 # создаём движок
-engine: AsyncEngine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    future=True,
-)
+engine: AsyncEngine = make_engine(settings.DATABASE_URL)
 
 # создаём фабрику сессий для async
 SessionLocal = async_sessionmaker(
@@ -28,9 +85,67 @@ SessionLocal = async_sessionmaker(
     class_=AsyncSession,
 )
 
+# read-your-writes: после записи клиент получает cookie «читать с primary до <unix time>»;
+# заголовок X-Read-Primary (любое значение) делает то же для отдельного запроса
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "x-read-primary"
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadRouter:
+    """
+    Выбор фабрики read-only сессий: реплики по кругу (round-robin),
+    primary — если реплик нет или клиент недавно писал (read-your-writes).
+    Выбор запоминается в request.state: все read-сессии запроса идут в одну базу.
+    """
+
+    def __init__(self, primary: AsyncEngine, replica_urls: Sequence[str]):
+        self.primary = read_only_sessionmaker(primary)
+        self.engines: List[AsyncEngine] = [make_engine(url) for url in replica_urls]
+        self.replicas = [read_only_sessionmaker(eng) for eng in self.engines]
+        self._turn = itertools.count()
+
+    def pick(self, request: Request) -> async_sessionmaker[AsyncSession]:
+        maker = getattr(request.state, "read_sessionmaker", None)
+        if maker is None:
+            if not self.replicas or wants_primary(request):
+                maker = self.primary
+            else:
+                maker = self.replicas[next(self._turn) % len(self.replicas)]
+            request.state.read_sessionmaker = maker
+        return maker
+
+    async def dispose(self) -> None:
+        for eng in self.engines:
+            await eng.dispose()
+
+
+def wants_primary(request: Request) -> bool:
+    """Клиент просит свежие данные: явный заголовок или недавняя запись (cookie)."""
+    if request.headers.get(READ_PRIMARY_HEADER):
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+read_router = ReadRouter(engine, settings.DATABASE_REPLICA_URLS)
+
 
 # зависимость для FastAPI
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_session(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
+    if read_router.replicas and request.method not in _SAFE_METHODS:
+        # выставляем до выполнения: после отправки ответа заголовки уже не поменять,
+        # а при ошибке FastAPI этот response не использует
+        until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            f"{until:.3f}",
+            max_age=max(1, int(settings.READ_YOUR_WRITES_SECONDS)),
+            httponly=True,
+            samesite="lax",
+        )
     async with SessionLocal() as session:
         try:
             yield session
@@ -38,3 +153,12 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         except:
             await session.rollback()
             raise
+
+
+# зависимость для GET-роутов: реплика (round-robin) или primary, read-only и без commit.
+# Подключайте как Depends(get_read_session, scope="function"): сессия закрывается
+# (соединение — обратно в пул) сразу после возврата из эндпоинта, до сериализации
+# и отправки ответа. Со scope по умолчанию ("request") — живёт до конца ответа (стриминг).
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with read_router.pick(request)() as session:
+        yield session
@@ -1,29 +1,66 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.routes import media_router, setup_exception_handlers, tweet_router, user_router
+from app.config import settings
+from app.db import session as db_session
+from app.routes import (
+    MediaFiles,
+    media_router,
+    metrics_router,
+    setup_exception_handlers,
+    tweet_router,
+    user_router,
+)
+from app.services.follow_graph import follow_graph
+from app.services.like_buffer import like_buffer
+from app.services.media_variants import variant_pipeline
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    reloader = None
+    if settings.FOLLOW_GRAPH_ENABLED:
+        await follow_graph.load()
+        if settings.FOLLOW_GRAPH_RELOAD_SECONDS > 0:
+            reloader = asyncio.create_task(
+                follow_graph.run_reloader(settings.FOLLOW_GRAPH_RELOAD_SECONDS)
+            )
+    yield
+    if reloader is not None:
+        reloader.cancel()
+        with suppress(asyncio.CancelledError):
+            await reloader
+    # shutdown: дописать накопленные лайки (write-behind), пока воркер не остановлен
+    await like_buffer.close()
+    await variant_pipeline.close()
+    await db_session.read_router.dispose()  # пулы соединений реплик
 
 
 def create_app() -> FastAPI:
-    media_dir = Path(__file__).resolve().parent / "media"
     dist_dir = Path(__file__).resolve().parent.parent / "dist"
 
-    app = FastAPI(title="Twitter Clone API", version="1.0.0")
+    app = FastAPI(title="Twitter Clone API", version="1.0.0", lifespan=lifespan)
     setup_exception_handlers(app)
 
     # API
     app.include_router(user_router)
     app.include_router(tweet_router)
     app.include_router(media_router)
+    app.include_router(metrics_router)
 
     # статика фронта
     app.mount("/css", StaticFiles(directory=dist_dir / "css"), name="css")
     app.mount("/js", StaticFiles(directory=dist_dir / "js"), name="js")
-    app.mount("/media", StaticFiles(directory=media_dir), name="media")
+    # medias.MEDIA_DIR с подкаталогами ab/cd/ (app/services/medias.media_relpath), каталог
+    # читается при запросе: immutable-кэш, сильный ETag, Range (app/routes/media_files.py)
+    app.mount("/media", MediaFiles(), name="media")
 
     # favicon (если есть)
     @app.get("/favicon.ico", include_in_schema=False)
@@ -1,7 +1,8 @@
 from app.models.follow import Follow
 from app.models.like import Like
-from app.models.media import Media
+from app.models.media import Media, MediaVariant
+from app.models.timeline import HomeTimeline
 from app.models.tweet import Tweet
 from app.models.user import User
 
-__all__ = ["User", "Tweet", "Media", "Like", "Follow"]
+__all__ = ["User", "Tweet", "Media", "MediaVariant", "Like", "Follow", "HomeTimeline"]
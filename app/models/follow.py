@@ -1,5 +1,5 @@
 # app/models/follow.py
-from sqlalchemy import DateTime, ForeignKey, Integer, UniqueConstraint, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -23,14 +23,17 @@ class Follow(Base):
     )
     followee_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"),
-        index=True,
         nullable=False,
     )
 
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    # уникальная пара, чтобы не было дублей подписок
-    __table_args__ = (UniqueConstraint("follower_id", "followee_id", name="uq_follow_pair"),)
+    __table_args__ = (
+        # уникальная пара, чтобы не было дублей подписок
+        UniqueConstraint("follower_id", "followee_id", name="uq_follow_pair"),
+        # подписчики автора (профиль, fan-out) читаются из индекса, без обращения к таблице
+        Index("ix_follows_followee_id_follower_id", "followee_id", "follower_id"),
+    )
 
     follower = relationship("User", foreign_keys=[follower_id])
     followee = relationship("User", foreign_keys=[followee_id])
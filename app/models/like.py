@@ -1,7 +1,7 @@
 # Стандартная библиотека
 
 # Сторонние пакеты
-from sqlalchemy import DateTime, ForeignKey, Integer, UniqueConstraint, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 # Локальные
@@ -29,13 +29,16 @@ class Like(Base):
         Integer,
         ForeignKey("tweets.id", ondelete="CASCADE"),  # если твит удалён — лайки на него удаляются
         nullable=False,
-        index=True,
     )
 
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
         UniqueConstraint("user_id", "tweet_id", name="uq_user_tweet"),  # уникальная пара
+        # последние лайкнувшие твита (превью и постраничный список) — без сортировки всех лайков
+        Index("ix_likes_tweet_id_id", "tweet_id", "id"),
+        # лайкнувшие пачки твитов (join с users) — только из индекса
+        Index("ix_likes_tweet_id_user_id", "tweet_id", "user_id"),
     )
 
     # связи:
@@ -1,7 +1,8 @@
 # Стандартная библиотека
+from typing import Optional
 
 # Сторонние пакеты
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Table, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 # локальные пакеты
@@ -35,6 +36,31 @@ class Media(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     path: Mapped[str] = mapped_column(String, nullable=False)
+    # SHA-256 содержимого (hex): по нему файл называется и дедуплицируется;
+    # NULL — у файлов, загруженных до адресации по содержимому
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     tweets = relationship("Tweet", secondary="tweet_media", back_populates="attachments")
+
+    __table_args__ = (Index("ix_medias_content_hash", "content_hash", unique=True),)
+
+
+class MediaVariant(Base):
+    """
+    Производный файл медиа: превью, WebP для ленты, копия без EXIF.
+    Строится в фоне после загрузки (app/services/media_variants.py);
+    path — как у Media, относительный ("media/ab/cd/<sha256>.thumb.webp").
+    """
+
+    __tablename__ = "media_variants"
+
+    media_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("medias.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)  # thumb / feed / clean
+    path: Mapped[str] = mapped_column(String, nullable=False)
+    width: Mapped[int] = mapped_column(Integer, nullable=False)
+    height: Mapped[int] = mapped_column(Integer, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,37 @@
+# app/models/timeline.py
+from sqlalchemy import DateTime, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class HomeTimeline(Base):
+    """
+    Материализованная домашняя лента (fan-out on write):
+    строка = «твит tweet_id виден в ленте user_id».
+    Заполняется при создании твита и при подписке, чистится при удалении твита
+    и при отписке. author_id и created_at — копии из твита, чтобы отписка
+    и выборка по дате обходились без JOIN.
+    """
+
+    __tablename__ = "home_timeline"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("tweets.id", ondelete="CASCADE"), primary_key=True
+    )
+    author_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # чтение ленты: все строки читателя, свежие первыми
+        Index("ix_home_timeline_user_created", "user_id", "created_at"),
+        # отписка: убрать из ленты читателя все твиты автора
+        Index("ix_home_timeline_user_author", "user_id", "author_id"),
+        # удаление твита: убрать его из всех лент
+        Index("ix_home_timeline_tweet_id", "tweet_id"),
+    )
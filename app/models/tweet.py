@@ -2,7 +2,7 @@
 # (здесь ничего не нужно)
 
 # Сторонние пакеты
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 # Локальные
@@ -20,10 +20,15 @@ class Tweet(Base):
     # Модель:
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     author_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     content: Mapped[str] = mapped_column(String(280), nullable=False)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # денормализованный счётчик лайков (ведёт services/likes.py)
+    likes_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    # сортировка ленты: лайки ↓, затем дата ↓
+    __table_args__ = (Index("ix_tweets_likes_count_created_at", "likes_count", "created_at"),)
 
     # Связи:
     # Один пользователь → много твитов
@@ -36,3 +41,13 @@ class Tweet(Base):
     attachments = relationship(
         "Media", secondary="tweet_media", back_populates="tweets", lazy="selectin"
     )
+
+
+# твиты автора от новых к старым (профиль, backfill ленты при подписке, pull-лента):
+# ORDER BY created_at DESC, id DESC идёт по индексу без сортировки
+Index(
+    "ix_tweets_author_id_created_at",
+    Tweet.author_id,
+    Tweet.created_at.desc(),
+    Tweet.id.desc(),
+)
@@ -22,6 +22,21 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
     api_key: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # денормализованные счётчики подписок (ведёт services/users.py)
+    followers_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    following_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # версии для ETag (services/versions.py): растут в транзакции изменения
+    # tweets_version — твиты пользователя и их лайки; follows_version — его подписки
+    tweets_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    follows_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     # Связи:
     # один пользователь много твитов
@@ -2,6 +2,8 @@
 from .dependencies import get_current_user
 from .exception_handlers import setup_exception_handlers
 from .media import router as media_router
+from .media_files import MediaFiles
+from .metrics import router as metrics_router
 from .tweet import router as tweet_router
 from .user import router as user_router
 
@@ -11,4 +13,6 @@ __all__ = [
     "user_router",
     "tweet_router",
     "media_router",
+    "MediaFiles",
+    "metrics_router",
 ]
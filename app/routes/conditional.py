@@ -0,0 +1,24 @@
+# app/routes/conditional.py
+# Условные GET: ETag + If-None-Match → 304 без сборки ответа
+from fastapi import Request, Response
+
+# браузер/SPA обязан перепроверять ответ (ETag), а не брать его из кэша молча
+REVALIDATE = "private, no-cache"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Есть ли etag (или *) в If-None-Match запроса. Слабое сравнение, как в RFC 9110."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip() for tag in header.split(",")}
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
@@ -4,15 +4,20 @@ from typing import Optional
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
-from app.models import User
+from app.config import settings
+from app.db.session import get_read_session, get_session
 from app.services import users as user_service
+from app.services.auth_cache import Principal, auth_cache
 
 
-async def get_current_user(
-    api_key: Optional[str] = Header(None, alias="api-key"),
-    session: AsyncSession = Depends(get_session),
-) -> User:
+def _invalid_api_key() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid api-key",
+    )
+
+
+async def _authenticate(api_key: Optional[str], session: AsyncSession) -> Principal:
     # Нет заголовка api-key → 401
     if api_key is None:
         raise HTTPException(
@@ -20,12 +25,35 @@ async def get_current_user(
             detail="Missing api-key",
         )
 
+    # сначала in-process кэш: известный ключ — без запроса в БД, неизвестный — сразу 401
+    if settings.AUTH_CACHE_ENABLED:
+        principal = auth_cache.get(api_key)
+        if principal is not None:
+            return principal
+        if auth_cache.is_unknown(api_key):
+            raise _invalid_api_key()
+
     # проверяем пользователя
-    user = await user_service._get_user_by_api_key(session, api_key=api_key)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid api-key",
-        )
+    generation = auth_cache.generation
+    principal = await user_service.get_principal_by_api_key(session, api_key=api_key)
+    if settings.AUTH_CACHE_ENABLED:
+        auth_cache.put(api_key, principal, generation=generation)
+    if principal is None:
+        raise _invalid_api_key()
 
-    return user
+    return principal
+
+
+async def get_current_user(
+    api_key: Optional[str] = Header(None, alias="api-key"),
+    session: AsyncSession = Depends(get_session),
+) -> Principal:
+    return await _authenticate(api_key, session)
+
+
+async def get_current_reader(
+    api_key: Optional[str] = Header(None, alias="api-key"),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> Principal:
+    """То же для GET-роутов: пользователь проверяется в той же read-сессии (реплике)."""
+    return await _authenticate(api_key, session)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, File, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.session import get_session
-from app.models import User
 from app.routes.dependencies import get_current_user  # проверка API-Key
 from app.schemas import MediaUploadResponse
+from app.services.auth_cache import Principal
+from app.services.media_variants import variant_pipeline
 from app.services.medias import upload_media
 
 router = APIRouter(prefix="/api/medias", tags=["medias"])
@@ -20,8 +22,10 @@ router = APIRouter(prefix="/api/medias", tags=["medias"])
 async def upload_media_endpoint(
     file: UploadFile = File(..., description="Файл PNG/JPG для загрузки"),
     session: AsyncSession = Depends(get_session),
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
 ) -> MediaUploadResponse:  # <-- вот тут аннотация
     """Эндпоинт загрузки одного файла (PNG/JPG)."""
     media_id = await upload_media(session, file=file)
+    if settings.MEDIA_VARIANTS_ENABLED:
+        variant_pipeline.schedule(session, media_id)  # превью и WebP — в фоне, после COMMIT
     return MediaUploadResponse(result=True, media_id=media_id)
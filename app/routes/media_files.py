@@ -0,0 +1,78 @@
+# app/routes/media_files.py
+# Раздача /media. Файлы неизменяемы — имя уникально (sha256 содержимого, у старых
+# файлов uuid), поэтому кэшируются навсегда, а ETag берётся из имени.
+import os
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.config import settings
+from app.services import medias
+
+# публичный кэш (CDN, браузер) на год и без перепроверки: по этому URL другого файла не будет
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles для MEDIA_DIR:
+    - Cache-Control immutable и сильный ETag "<имя файла>" (If-None-Match → 304;
+      If-Range с ним же — частичный ответ);
+    - Range (перемотка mp4), HEAD, pathsend (сервер сам отдаёт файл, без копирования
+      через Python) — как у FileResponse;
+    - MEDIA_ACCEL_REDIRECT — только заголовки, файл отдаёт nginx (sendfile, Range).
+
+    Без directory каталог — medias.MEDIA_DIR на момент запроса (как и у загрузки:
+    его можно подменить, и раздача пойдёт из того же места).
+    """
+
+    def __init__(self, *, directory: Optional["os.PathLike[str]"] = None, **kwargs: Any) -> None:
+        super().__init__(directory=directory, **kwargs)
+
+    # StaticFiles запоминает каталог в __init__ — здесь он берётся при каждом обращении
+    @property
+    def directory(self) -> "os.PathLike[str]":
+        return medias.MEDIA_DIR if self._directory is None else self._directory
+
+    @directory.setter
+    def directory(self, value: Optional["os.PathLike[str]"]) -> None:
+        self._directory = value
+
+    @property
+    def all_directories(self) -> List["os.PathLike[str]"]:
+        return [self.directory]
+
+    @all_directories.setter
+    def all_directories(self, _value: List["os.PathLike[str]"]) -> None:
+        pass  # производное от directory
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {
+            "ETag": f'"{Path(full_path).name}"',
+            "Cache-Control": IMMUTABLE,
+            "X-Content-Type-Options": "nosniff",  # пользовательский файл — строго своим типом
+        }
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, stat_result=stat_result
+        )
+        response.chunk_size = settings.MEDIA_SERVE_CHUNK_SIZE  # у Starlette — 64 КиБ на поток
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        if settings.MEDIA_ACCEL_REDIRECT:
+            relpath = Path(full_path).relative_to(Path(str(self.directory)).resolve())
+            accel = Response(status_code=status_code, media_type=response.media_type)
+            for name in ("etag", "cache-control", "x-content-type-options", "last-modified"):
+                accel.headers[name] = response.headers[name]
+            accel.headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT + relpath.as_posix()
+            return accel
+        return response
@@ -0,0 +1,35 @@
+# app/routes/metrics.py
+from fastapi import APIRouter, Depends
+
+from app.routes.dependencies import get_current_reader
+from app.schemas import MetricsResponse
+from app.services.auth_cache import Principal, auth_cache
+from app.services.feed_cache import feed_cache
+from app.services.follow_graph import follow_graph
+from app.services.like_buffer import like_buffer
+from app.services.media_variants import variant_pipeline
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get(
+    "",
+    response_model=MetricsResponse,
+    summary="Счётчики in-process компонентов",
+    description=(
+        "Попадания/промахи/вытеснения кэшей текущего воркера — для подбора размеров. "
+        "Только с api-key."
+    ),
+)
+async def get_metrics(_current_user: Principal = Depends(get_current_reader)) -> MetricsResponse:
+    """Снимок счётчиков текущего процесса."""
+    return MetricsResponse(
+        result=True,
+        metrics={
+            "feed_cache": feed_cache.stats(),
+            "auth_cache": auth_cache.stats(),
+            "like_buffer": like_buffer.stats(),
+            "follow_graph": follow_graph.stats(),
+            "media_variants": variant_pipeline.stats(),
+        },
+    )
@@ -1,16 +1,75 @@
 # app/routes/tweet.py
-from fastapi import APIRouter, Depends
+from typing import AsyncIterator, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
-from app.models import User
-from app.routes.dependencies import get_current_user
-from app.schemas import PostTweetResponse, SimpleResult, TweetCreate, TweetsResponse
+from app.config import settings
+from app.db.session import get_read_session, get_session
+from app.exceptions import DomainValidation
+from app.routes.conditional import etag_matches, not_modified, set_etag
+from app.routes.dependencies import get_current_reader, get_current_user
+from app.schemas import (
+    LikesResponse,
+    PostTweetResponse,
+    SimpleResult,
+    TweetCreate,
+    TweetsResponse,
+)
+from app.serialization import JSONBytesResponse, TweetWire, dumps, likes_body, tweets_body
 from app.services import likes as like_service
 from app.services import tweets as tweet_service
+from app.services.auth_cache import Principal
+from app.services.like_buffer import like_buffer
 
 router = APIRouter(prefix="/api/tweets", tags=["tweets"])
 
+NDJSON = "application/x-ndjson"
+STREAM_FLUSH_BYTES = 64 * 1024  # копим вывод до такого размера, чтобы не слать по твиту за раз
+StreamFormat = Literal["ndjson", "json"]
+LikesMode = Literal["full", "compact"]
+MediaMode = Literal["original", "feed", "thumb", "clean"]
+
+
+def _stream_format(request: Request, stream: Optional[StreamFormat]) -> Optional[StreamFormat]:
+    """Потоковый режим включается явно: ?stream=... или Accept: application/x-ndjson."""
+    if stream is not None:
+        return stream
+    if NDJSON in request.headers.get("accept", ""):
+        return "ndjson"
+    return None
+
+
+async def _encode_stream(
+    items: AsyncIterator[TweetWire], fmt: StreamFormat
+) -> AsyncIterator[bytes]:
+    """
+    ndjson — по твиту на строку; json — тот же конверт {"result": true, "tweets": [...]},
+    что и обычный ответ, только собранный по кускам.
+    """
+    buf: List[bytes] = []
+    size = 0
+    if fmt == "json":
+        buf.append(b'{"result":true,"tweets":[')
+    first = True
+    async for tweet in items:
+        line = dumps(tweet)
+        if fmt == "ndjson":
+            line += b"\n"
+        elif not first:
+            line = b"," + line
+        first = False
+        buf.append(line)
+        size += len(line)
+        if size >= STREAM_FLUSH_BYTES:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if fmt == "json":
+        buf.append(b"]}")
+    if buf:
+        yield b"".join(buf)
+
 
 @router.post(
     "",
@@ -23,7 +82,7 @@ router = APIRouter(prefix="/api/tweets", tags=["tweets"])
 )
 async def create_tweet(
     payload: TweetCreate,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> PostTweetResponse:
     """Создать твит (опционально с прикреплёнными медиа)."""
@@ -39,19 +98,90 @@ async def create_tweet(
 @router.get(
     "",
     response_model=TweetsResponse,
+    response_model_exclude_none=True,  # без пагинации ответ байт-в-байт прежний
     summary="Получить ленту",
     description=(
         "Лента текущего пользователя: его твиты + твиты тех, на кого он подписан. "
-        "Сортировка: по количеству лайков ↓, затем по дате ↓."
+        "Сортировка: по количеству лайков ↓, затем по дате ↓. "
+        "С `limit` лента отдаётся страницами: `next_cursor` из ответа передаётся "
+        "в `cursor` следующего запроса. Ответ несёт `ETag`; с `If-None-Match` "
+        "неизменившаяся лента отдаётся как `304 Not Modified`. "
+        "`stream=ndjson` (или `Accept: application/x-ndjson`) — вся лента потоком, "
+        "по твиту на строку; `stream=json` — обычный конверт, но потоком. "
+        "`likes=compact` — вместо полного списка лайкнувших у твита `likes_count`, "
+        "`liked_by_me` и несколько последних лайкнувших; остальные — "
+        "`GET /api/tweets/{id}/likes`. "
+        "`media=feed` / `thumb` / `clean` — во `attachments` пути производных картинок "
+        "(WebP для ленты, превью, копия без EXIF); пока производной нет — оригинал."
     ),
+    responses={
+        200: {"content": {NDJSON: {}}},
+        304: {"description": "Лента не изменилась"},
+    },
 )
 async def list_feed(
-    _current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
-) -> TweetsResponse:
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    stream: Optional[StreamFormat] = Query(None, description="потоковая выдача всей ленты"),
+    likes: LikesMode = Query("full", description="compact — превью лайкнувших вместо списка"),
+    media: MediaMode = Query("original", description="вид вложений: производные картинок"),
+    _current_user: Principal = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+    stream_session: AsyncSession = Depends(get_read_session),
+) -> TweetsResponse | Response:
     """Вернуть ленту твитов в формате, строго соответствующем ТЗ."""
-    items = await tweet_service.list_feed_for_user(session, viewer_id=_current_user.id)
-    return TweetsResponse(result=True, tweets=items)
+    fmt = _stream_format(request, stream)
+    compact = likes == "compact"
+    media_kind = None if media == "original" else media
+    variant = tuple(v for v in (fmt, "compact" if compact else None, media_kind) if v is not None)
+    if fmt is not None:
+        if limit is not None:
+            raise DomainValidation("limit is not supported in stream mode")
+        # stream_session живёт до конца ответа (scope "request"), курсор доживает;
+        # соединение она берёт лениво — в обычном режиме не используется вовсе.
+        # Версия читается в той же транзакции, что и поток: ETag и тело — из одного снимка
+        version = await tweet_service.feed_version(stream_session, viewer_id=_current_user.id)
+        etag = version.etag(None, cursor, *variant)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        items = await tweet_service.stream_feed(
+            stream_session,
+            viewer_id=_current_user.id,
+            cursor=cursor,
+            compact=compact,
+            media=media_kind,
+            version=version,
+        )
+        streamed = StreamingResponse(
+            _encode_stream(items, fmt),
+            media_type=NDJSON if fmt == "ndjson" else "application/json",
+        )
+        set_etag(streamed, etag)
+        return streamed
+
+    if cursor is not None and limit is None:
+        limit = settings.FEED_PAGE_SIZE
+
+    version = await tweet_service.feed_version(session, viewer_id=_current_user.id)
+    etag = version.etag(limit, cursor, *variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)  # лента не собирается и не сериализуется
+
+    # тело — той же версии, что и ETag: кэш и граф подписок сверяются с ней
+    items, next_cursor = await tweet_service.list_feed_page(
+        session,
+        viewer_id=_current_user.id,
+        limit=limit,
+        cursor=cursor,
+        compact=compact,
+        media=media_kind,
+        version=version,
+    )
+    # response_model остаётся для схемы OpenAPI; тело собираем сами, без повторной валидации
+    body = JSONBytesResponse(tweets_body(items, next_cursor))
+    set_etag(body, etag)
+    return body
 
 
 @router.delete(
@@ -62,7 +192,7 @@ async def list_feed(
 )
 async def delete_tweet(
     tweet_id: int,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> SimpleResult:
     """Удалить собственный твит."""
@@ -70,6 +200,30 @@ async def delete_tweet(
     return SimpleResult(result=True)
 
 
+@router.get(
+    "/{tweet_id}/likes",
+    response_model=LikesResponse,
+    response_model_exclude_none=True,
+    summary="Лайкнувшие твит",
+    description=(
+        "Лайкнувшие твит, от последних к первым, страницами по `limit`: "
+        "`next_cursor` из ответа передаётся в `cursor` следующего запроса."
+    ),
+)
+async def list_likes(
+    tweet_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=settings.LIKES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    _current_user: Principal = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> LikesResponse | Response:
+    """Постраничный список лайкнувших (для компактного режима ленты)."""
+    items, next_cursor = await like_service.list_likers_page(
+        session, tweet_id=tweet_id, limit=limit, cursor=cursor
+    )
+    return JSONBytesResponse(likes_body(items, next_cursor))
+
+
 @router.post(
     "/{tweet_id}/likes",
     response_model=SimpleResult,
@@ -78,11 +232,14 @@ async def delete_tweet(
 )
 async def like_tweet(
     tweet_id: int,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> SimpleResult:
     """Лайкнуть твит."""
-    await like_service.like_tweet(session, user_id=_current_user.id, tweet_id=tweet_id)
+    if settings.LIKES_WRITE_BEHIND:
+        await like_buffer.like(user_id=_current_user.id, tweet_id=tweet_id)
+    else:
+        await like_service.like_tweet(session, user_id=_current_user.id, tweet_id=tweet_id)
     return SimpleResult(result=True)
 
 
@@ -94,9 +251,12 @@ async def like_tweet(
 )
 async def unlike_tweet(
     tweet_id: int,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> SimpleResult:
     """Убрать лайк с твита."""
-    await like_service.unlike_tweet(session, user_id=_current_user.id, tweet_id=tweet_id)
+    if settings.LIKES_WRITE_BEHIND:
+        await like_buffer.unlike(user_id=_current_user.id, tweet_id=tweet_id)
+    else:
+        await like_service.unlike_tweet(session, user_id=_current_user.id, tweet_id=tweet_id)
     return SimpleResult(result=True)
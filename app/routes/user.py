@@ -1,12 +1,17 @@
 # app/routes/user.py
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
-from app.models import User
-from app.routes.dependencies import get_current_user
-from app.schemas import SimpleResult, UserProfile, UserProfileResponse
-from app.services import users
+from app.config import settings
+from app.db.session import get_read_session, get_session
+from app.routes.conditional import etag_matches, not_modified, set_etag
+from app.routes.dependencies import get_current_reader, get_current_user
+from app.schemas import FollowsResponse, SimpleResult, UserProfileResponse
+from app.serialization import JSONBytesResponse, follows_body, profile_body
+from app.services import users, versions
+from app.services.auth_cache import Principal
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -15,30 +20,108 @@ router = APIRouter(prefix="/api/users", tags=["users"])
     "/me",
     response_model=UserProfileResponse,
     summary="Текущий пользователь",
-    description="Возвращает профиль текущего пользователя. Требует api-key.",
+    description="Возвращает профиль текущего пользователя. Требует api-key. "
+    "Поддерживает `ETag` / `If-None-Match` → `304`.",
+    responses={304: {"description": "Профиль не изменился"}},
 )
 async def get_me(
-    _current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
-) -> UserProfileResponse:
+    request: Request,
+    _current_user: Principal = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> UserProfileResponse | Response:
     """Профиль текущего пользователя (`/api/users/me`)."""
-    profile: UserProfile = await users.get_public_profile(session, _current_user.id)
-    return UserProfileResponse(result=True, user=profile)
+    etag = await versions.profile_etag(session, _current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    profile = await users.get_public_profile(session, _current_user.id)
+    body = JSONBytesResponse(profile_body(profile))
+    set_etag(body, etag)
+    return body
 
 
 @router.get(
     "/{user_id}",
     response_model=UserProfileResponse,
     summary="Профиль пользователя",
-    description="Возвращает публичный профиль пользователя по ID. Api-key не обязателен.",
+    description="Возвращает публичный профиль пользователя по ID. Api-key не обязателен. "
+    "Поддерживает `ETag` / `If-None-Match` → `304`.",
+    responses={304: {"description": "Профиль не изменился"}},
 )
 async def get_user_profile(
     user_id: int,
-    session: AsyncSession = Depends(get_session),
-) -> UserProfileResponse:
-    """Публичный профиль пользователя (followers, following)."""
-    profile: UserProfile = await users.get_public_profile(session, user_id)
-    return UserProfileResponse(result=True, user=profile)
+    request: Request,
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> UserProfileResponse | Response:
+    """Публичный профиль пользователя (счётчики и первые followers / following)."""
+    etag = await versions.profile_etag(session, user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    profile = await users.get_public_profile(session, user_id)
+    body = JSONBytesResponse(profile_body(profile))
+    set_etag(body, etag)
+    return body
+
+
+@router.get(
+    "/{user_id}/followers",
+    response_model=FollowsResponse,
+    response_model_exclude_none=True,
+    summary="Подписчики пользователя",
+    description=(
+        "Подписчики по имени, страницами по `limit`: `next_cursor` из ответа "
+        "передаётся в `cursor` следующего запроса. Api-key не обязателен. "
+        "Поддерживает `ETag` / `If-None-Match` → `304`."
+    ),
+    responses={304: {"description": "Список не изменился"}},
+)
+async def list_user_followers(
+    user_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.FOLLOWS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> FollowsResponse | Response:
+    """Постраничный список подписчиков (полный список вместо превью в профиле)."""
+    etag = await versions.profile_etag(session, user_id, "followers", limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    items, next_cursor = await users.list_followers_page(
+        session, user_id=user_id, limit=limit, cursor=cursor
+    )
+    body = JSONBytesResponse(follows_body(items, next_cursor))
+    set_etag(body, etag)
+    return body
+
+
+@router.get(
+    "/{user_id}/following",
+    response_model=FollowsResponse,
+    response_model_exclude_none=True,
+    summary="Подписки пользователя",
+    description=(
+        "На кого подписан пользователь, по имени, страницами по `limit`: `next_cursor` "
+        "из ответа передаётся в `cursor` следующего запроса. Api-key не обязателен. "
+        "Поддерживает `ETag` / `If-None-Match` → `304`."
+    ),
+    responses={304: {"description": "Список не изменился"}},
+)
+async def list_user_following(
+    user_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.FOLLOWS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    session: AsyncSession = Depends(get_read_session, scope="function"),
+) -> FollowsResponse | Response:
+    """Постраничный список подписок (полный список вместо превью в профиле)."""
+    etag = await versions.profile_etag(session, user_id, "following", limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    items, next_cursor = await users.list_following_page(
+        session, user_id=user_id, limit=limit, cursor=cursor
+    )
+    body = JSONBytesResponse(follows_body(items, next_cursor))
+    set_etag(body, etag)
+    return body
 
 
 @router.post(
@@ -49,7 +132,7 @@ async def get_user_profile(
 )
 async def follow_user(
     target_user_id: int,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> SimpleResult:
     """Оформить подписку (follower → followee)."""
@@ -65,7 +148,7 @@ async def follow_user(
 )
 async def unfollow_user(
     target_user_id: int,
-    _current_user: User = Depends(get_current_user),
+    _current_user: Principal = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ) -> SimpleResult:
     """Удалить подписку (follower → followee)."""
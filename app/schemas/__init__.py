@@ -1,5 +1,7 @@
 from .media import MediaUploadResponse
+from .metrics import MetricsResponse
 from .tweet import (
+    LikesResponse,
     LikeUser,
     PostTweetResponse,
     SimpleResult,
@@ -8,6 +10,7 @@ from .tweet import (
     TweetsResponse,
 )
 from .user import (
+    FollowsResponse,
     UserProfile,
     UserProfileResponse,
     UserPublic,
@@ -18,8 +21,10 @@ __all__ = [
     "UserPublic",
     "UserProfile",
     "UserProfileResponse",
+    "FollowsResponse",
     #
     "LikeUser",
+    "LikesResponse",
     "TweetCreate",
     "TweetOut",
     "PostTweetResponse",
@@ -27,4 +32,6 @@ __all__ = [
     "TweetsResponse",
     # media
     "MediaUploadResponse",
+    # metrics
+    "MetricsResponse",
 ]
@@ -0,0 +1,8 @@
+# app/schemas/metrics.py
+from pydantic import BaseModel
+
+
+class MetricsResponse(BaseModel):
+    result: bool = True
+    # имя компонента → его счётчики (например, feed_cache → hits/misses/evictions)
+    metrics: dict[str, dict[str, int | float]]
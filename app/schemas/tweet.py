@@ -20,6 +20,10 @@ class TweetOut(BaseModel):
     attachments: list[str]  # список относительных путей к медиа (как в ТЗ)
     author: UserPublic
     likes: list[LikeUser] = Field(default_factory=list)
+    # компактный режим (?likes=compact): likes — только последние лайкнувшие,
+    # остальные — через GET /api/tweets/{id}/likes
+    likes_count: int | None = None
+    liked_by_me: bool | None = None
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -35,3 +39,10 @@ class SimpleResult(BaseModel):
 class TweetsResponse(BaseModel):
     result: bool = True
     tweets: list[TweetOut]
+    next_cursor: str | None = None  # только при постраничном запросе и если есть ещё
+
+
+class LikesResponse(BaseModel):
+    result: bool = True
+    likes: list[LikeUser]  # от последних к первым
+    next_cursor: str | None = None
@@ -9,8 +9,11 @@ class UserPublic(BaseModel):
 
 
 class UserProfile(UserPublic):
+    # первые PROFILE_FOLLOWS_PREVIEW_SIZE по имени; полные списки — постранично
     followers: list[UserPublic]
     following: list[UserPublic]
+    followers_count: int
+    following_count: int
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -19,6 +22,12 @@ class UserProfileResponse(BaseModel):
     user: UserProfile
 
 
+class FollowsResponse(BaseModel):
+    result: bool = True
+    users: list[UserPublic]  # по имени (username, id)
+    next_cursor: str | None = None
+
+
 class UserWithFollowing(BaseModel):
     id: int
     name: str = Field(alias="username", serialization_alias="name")
@@ -0,0 +1,86 @@
+# app/serialization.py
+# Быстрый путь ответа: строки БД → dict → JSON-байты, без pydantic-объектов
+# и повторной валидации в response_model. Схемы из app/schemas остаются контрактом
+# (OpenAPI, тесты); формат байт-в-байт как у FastAPI/pydantic.
+import json
+from typing import Any, List, NotRequired, Optional, TypedDict
+
+from fastapi import Response
+
+try:  # orjson — необязательная зависимость, без неё работает stdlib json
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+
+# Порядок ключей при сборке dict = порядок полей схем, имена = алиасы (username → name)
+class UserWire(TypedDict):  # UserPublic
+    id: int
+    name: str
+
+
+class LikeWire(TypedDict):  # LikeUser
+    user_id: int
+    name: str
+
+
+class TweetWire(TypedDict):  # TweetOut
+    id: int
+    content: str
+    attachments: List[str]
+    author: UserWire
+    likes: List[LikeWire]
+    # только в компактном режиме лайков: likes — превью, а не полный список
+    likes_count: NotRequired[int]
+    liked_by_me: NotRequired[bool]
+
+
+class ProfileWire(TypedDict):  # UserProfile
+    id: int
+    name: str
+    followers: List[UserWire]
+    following: List[UserWire]
+    followers_count: int
+    following_count: int
+
+
+def dumps(obj: Any) -> bytes:
+    """Компактный JSON без \\u-экранирования не-ASCII — как pydantic и JSONResponse."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class JSONBytesResponse(Response):
+    """Ответ с уже готовым JSON-телом (bytes), без повторной сериализации."""
+
+    media_type = "application/json"
+
+
+def tweets_body(items: List[TweetWire], next_cursor: Optional[str] = None) -> bytes:
+    """Тело TweetsResponse; next_cursor опускается, если его нет (exclude_none)."""
+    body: dict[str, Any] = {"result": True, "tweets": items}
+    if next_cursor is not None:
+        body["next_cursor"] = next_cursor
+    return dumps(body)
+
+
+def likes_body(items: List[LikeWire], next_cursor: Optional[str] = None) -> bytes:
+    """Тело LikesResponse; next_cursor опускается, если его нет (exclude_none)."""
+    body: dict[str, Any] = {"result": True, "likes": items}
+    if next_cursor is not None:
+        body["next_cursor"] = next_cursor
+    return dumps(body)
+
+
+def follows_body(items: List[UserWire], next_cursor: Optional[str] = None) -> bytes:
+    """Тело FollowsResponse; next_cursor опускается, если его нет (exclude_none)."""
+    body: dict[str, Any] = {"result": True, "users": items}
+    if next_cursor is not None:
+        body["next_cursor"] = next_cursor
+    return dumps(body)
+
+
+def profile_body(profile: ProfileWire) -> bytes:
+    """Тело UserProfileResponse."""
+    return dumps({"result": True, "user": profile})
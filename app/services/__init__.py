@@ -1,6 +1,13 @@
 from .likes import like_tweet, unlike_tweet
 from .medias import upload_media
-from .tweets import create_tweet, delete_tweet, list_feed_for_user, list_tweets
+from .tweets import (
+    create_tweet,
+    delete_tweet,
+    list_feed_for_user,
+    list_feed_page,
+    list_tweets,
+    stream_feed,
+)
 from .users import follow, get_public_profile, unfollow
 
 __all__ = [
@@ -13,6 +20,8 @@ __all__ = [
     "delete_tweet",
     "list_tweets",
     "list_feed_for_user",
+    "list_feed_page",
+    "stream_feed",
     # medias
     "upload_media",
     # likes
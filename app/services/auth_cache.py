@@ -0,0 +1,107 @@
+# app/services/auth_cache.py
+# In-process кэш аутентификации: api_key → Principal; сбрасывается из app/services/events.py
+from typing import Dict, NamedTuple, Optional, Set
+
+from app.cache import LRUTTLCache
+from app.config import settings
+
+
+class Principal(NamedTuple):
+    """
+    Аутентифицированный пользователь для роутов: неизменяемый и не привязан
+    к сессии — его можно держать в кэше и отдавать в любой запрос (в отличие от ORM User).
+    """
+
+    id: int
+    username: str
+
+
+class AuthCache:
+    """
+    Кэш api_key → Principal и отдельный негативный кэш неизвестных ключей
+    (с коротким TTL: перебор ключей не превращается в поток SELECT-ов,
+    а только что созданный ключ начинает работать не позже чем через этот TTL).
+
+    Гонка «прочитали пользователя → параллельно его удалили → положили в кэш»
+    закрывается счётчиком поколений: put() с устаревшим generation ничего не кладёт.
+    Кэш живёт в процессе: при нескольких воркерах чужие изменения видны через TTL.
+    """
+
+    def __init__(
+        self, *, max_entries: int, ttl: float, negative_max_entries: int, negative_ttl: float
+    ) -> None:
+        self._known: LRUTTLCache[str, Principal] = LRUTTLCache(
+            max_entries=max_entries, max_bytes=max_entries, ttl=ttl, on_remove=self._unindex
+        )
+        self._unknown: LRUTTLCache[str, bool] = LRUTTLCache(
+            max_entries=negative_max_entries, max_bytes=negative_max_entries, ttl=negative_ttl
+        )
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self._generation = 0
+
+    # ---------- чтение / запись ----------
+    @property
+    def generation(self) -> int:
+        """Номер последней инвалидации: запомнить до запроса в БД, передать в put()."""
+        return self._generation
+
+    def get(self, api_key: str) -> Optional[Principal]:
+        return self._known.get(api_key)
+
+    def is_unknown(self, api_key: str) -> bool:
+        """Ключ недавно не нашёлся в БД (негативный кэш)."""
+        return self._unknown.get(api_key) is not None
+
+    def put(self, api_key: str, principal: Optional[Principal], *, generation: int) -> None:
+        """Запомнить результат поиска ключа (None — ключа нет)."""
+        if generation != self._generation:
+            return
+        if principal is None:
+            self._unknown.set(api_key, True)
+            return
+        self._known.set(api_key, principal)
+        if api_key in self._known:
+            self._keys_by_user.setdefault(principal.id, set()).add(api_key)
+
+    # ---------- инвалидация ----------
+    def invalidate_key(self, api_key: str) -> None:
+        """Ключ появился, сменил владельца или отозван."""
+        self._generation += 1
+        self._known.pop(api_key)
+        self._unknown.pop(api_key)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Пользователь удалён или изменён: забыть все его ключи."""
+        self._generation += 1
+        for api_key in list(self._keys_by_user.get(user_id, ())):
+            self._known.pop(api_key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._known.clear()
+        self._unknown.clear()
+
+    def stats(self) -> Dict[str, int]:
+        known, unknown = self._known.stats(), self._unknown.stats()
+        return {
+            "entries": known["entries"],
+            "hits": known["hits"],
+            "misses": known["misses"],
+            "negative_entries": unknown["entries"],
+            "negative_hits": unknown["hits"],
+        }
+
+    def _unindex(self, api_key: str, principal: Principal) -> None:
+        keys = self._keys_by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(api_key)
+            if not keys:
+                del self._keys_by_user[principal.id]
+
+
+auth_cache = AuthCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+    negative_max_entries=settings.AUTH_CACHE_NEGATIVE_MAX_ENTRIES,
+    negative_ttl=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+)
@@ -0,0 +1,55 @@
+# app/services/cursors.py
+# Непрозрачные курсоры для keyset-пагинации
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List
+
+from app.exceptions import DomainValidation
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"unsupported cursor value: {value!r}")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Упаковать ключ сортировки последней строки страницы в url-safe строку."""
+    raw = json.dumps(list(values), default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *, size: int) -> List[Any]:
+    """Распаковать курсор. Битый или чужой курсор → DomainValidation."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        raise DomainValidation("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise DomainValidation("invalid cursor")
+    return values
+
+
+def parse_cursor_int(value: Any) -> int:
+    """Целое из курсора (bool не принимаем, хоть это и подкласс int)."""
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise DomainValidation("invalid cursor")
+    return value
+
+
+def parse_cursor_str(value: Any) -> str:
+    """Строка из курсора (например, username)."""
+    if not isinstance(value, str):
+        raise DomainValidation("invalid cursor")
+    return value
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    """Дата из курсора (ISO-строка) → datetime."""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise DomainValidation("invalid cursor")
@@ -0,0 +1,132 @@
+# app/services/events.py
+# Точки изменения данных: сервисы сообщают сюда, а отсюда сдвигаются версии (ETag)
+# в той же транзакции и обновляются in-process производные — кэш ленты и кэш
+# аутентификации. Функции, которые пишут версии в БД, — корутины.
+from typing import Callable, Iterable, List, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services import versions
+from app.services.auth_cache import auth_cache
+from app.services.feed_cache import feed_cache
+from app.services.follow_graph import follow_graph
+
+
+def _now_and_after_commit(session: AsyncSession, apply: Callable[[], None]) -> None:
+    """
+    Применить сразу и ещё раз после COMMIT: иначе параллельный запрос может
+    между изменением и коммитом прочитать старые данные и закрепить их
+    (положить в кэш или отдать клиенту под новым ETag).
+    """
+    apply()
+    event.listen(session.sync_session, "after_commit", lambda _s: apply(), once=True)
+
+
+def _after_commit(session: AsyncSession, apply: Callable[[], None]) -> None:
+    """Применить только после COMMIT — для производных, которые не сбрасываются, а ведутся."""
+    event.listen(session.sync_session, "after_commit", lambda _s: apply(), once=True)
+
+
+async def tweet_changed(session: AsyncSession, *, author_id: int) -> None:
+    """Твит автора создан или удалён."""
+    await _authors_changed(session, [author_id])
+
+
+async def media_changed(session: AsyncSession, *, author_ids: Iterable[int]) -> None:
+    """У медиа появились производные или сменился путь: меняется выдача твитов этих авторов."""
+    await _authors_changed(session, list(author_ids))
+
+
+async def _authors_changed(session: AsyncSession, author_ids: List[int]) -> None:
+    await versions.bump_authors(session, author_ids)
+
+    def apply() -> None:
+        if settings.FEED_CACHE_ENABLED:
+            for author_id in author_ids:
+                feed_cache.invalidate_author(author_id)
+
+    _now_and_after_commit(session, apply)
+
+
+async def like_changed(session: AsyncSession, *, tweet_id: int, author_id: Optional[int]) -> None:
+    """Лайк поставлен или снят (author_id может быть неизвестен, если твит уже удалён)."""
+    await likes_changed(session, authors={tweet_id: author_id})
+
+
+async def likes_changed(session: AsyncSession, *, authors: Mapping[int, Optional[int]]) -> None:
+    """Лайки пачки твитов изменились: tweet_id → автор (None — твит уже удалён)."""
+    authors = dict(authors)
+    await versions.bump_authors(session, (a for a in authors.values() if a is not None))
+
+    def apply() -> None:
+        if settings.FEED_CACHE_ENABLED:
+            for tweet_id, author_id in authors.items():
+                feed_cache.invalidate_like(tweet_id, author_id)
+
+    _now_and_after_commit(session, apply)
+
+
+def follow_changed(
+    session: AsyncSession,
+    *,
+    follower_id: int,
+    followee_id: int,
+    followed: bool,
+    versions: Optional[Mapping[int, int]] = None,
+) -> None:
+    """
+    follower_id подписался на followee_id (followed) или отписался от него.
+    follows_version обоих уже сдвинут в UPDATE счётчиков подписок; versions — их новые
+    значения из RETURNING (пусто, если в БД ничего не изменилось).
+    """
+
+    def apply() -> None:
+        if settings.FEED_CACHE_ENABLED:
+            feed_cache.invalidate_viewer(follower_id)
+
+    def update_graph() -> None:
+        if followed:
+            follow_graph.add(follower_id, followee_id, versions)
+        else:
+            follow_graph.remove(follower_id, followee_id, versions)
+
+    _now_and_after_commit(session, apply)
+    if settings.FOLLOW_GRAPH_ENABLED:
+        _after_commit(session, update_graph)
+
+
+def user_changed(
+    session: AsyncSession, *, user_id: Optional[int] = None, api_key: Optional[str] = None
+) -> None:
+    """
+    Пользователь удалён или изменён (user_id) и/или api_key выдан, сменён или отозван
+    (api_key — и старый, и новый: новый мог попасть в негативный кэш).
+    """
+
+    def apply() -> None:
+        if user_id is not None:
+            auth_cache.invalidate_user(user_id)
+        if api_key is not None:
+            auth_cache.invalidate_key(api_key)
+
+    _now_and_after_commit(session, apply)
+
+
+def user_deleted(session: AsyncSession, *, user_id: int, follower_ids: Iterable[int]) -> None:
+    """
+    Пользователь удалён вместе с подписками. follows_version второй стороны
+    подписок уже сдвинут в UPDATE счётчиков (users.delete_user).
+    """
+    follower_ids = list(follower_ids)
+
+    def apply() -> None:
+        auth_cache.invalidate_user(user_id)
+        if settings.FEED_CACHE_ENABLED:
+            for follower_id in follower_ids:
+                feed_cache.invalidate_viewer(follower_id)
+
+    _now_and_after_commit(session, apply)
+    if settings.FOLLOW_GRAPH_ENABLED:
+        _after_commit(session, lambda: follow_graph.remove_user(user_id))
@@ -0,0 +1,200 @@
+# app/services/feed_cache.py
+# In-process кэш страниц ленты; сбрасывается из app/services/events.py
+from collections import deque
+from typing import Deque, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from app.cache import LRUTTLCache
+from app.config import settings
+from app.serialization import TweetWire
+from app.services.versions import FeedVersion
+
+# (viewer_id, limit, cursor, compact, media)
+FeedKey = Tuple[int, Optional[int], Optional[str], bool, Optional[str]]
+FeedPage = Tuple[List[TweetWire], Optional[str]]  # (твиты, next_cursor)
+
+_VIEWER, _AUTHOR, _TWEET = "viewer", "author", "tweet"
+
+
+class _CachedFeed(NamedTuple):
+    page: FeedPage
+    version: str  # версия ленты (из БД), при которой посчитана страница
+    author_ids: FrozenSet[int]  # автор + все, на кого подписан читатель
+    tweet_ids: FrozenSet[int]  # твиты на странице
+
+
+def _estimate_size(page: FeedPage) -> int:
+    """Грубая оценка памяти под страницу (байты): сами строки + накладные на объекты."""
+    items, next_cursor = page
+    size = 200 + len(next_cursor or "")
+    for t in items:
+        size += 400 + len(t["content"].encode()) + len(t["author"]["name"])
+        size += sum(80 + len(path) for path in t["attachments"])
+        size += sum(120 + len(like["name"]) for like in t["likes"])
+    return size
+
+
+class FeedCache:
+    """
+    Кэш страниц ленты по читателю. Запись зависит:
+      - от читателя (подписка/отписка читателя);
+      - от множества авторов ленты (новый/удалённый твит любого из них);
+      - от твитов на странице (лайк/анлайк). Для постраничных записей лайк любого
+        твита автора ленты может переставить строки между страницами, поэтому
+        они сбрасываются и по автору лайкнутого твита.
+
+    Чтобы не положить в кэш страницу, посчитанную до параллельной инвалидации,
+    put() сверяется с журналом последних инвалидаций (seq, вид, id).
+
+    Кэш живёт в процессе, и об изменениях из других воркеров инвалидации не приходят.
+    Поэтому запись хранит версию ленты из БД, при которой посчитана, и get() с другой
+    версией — промах: иначе старое тело ушло бы под новым ETag и закрепилось бы 304-ми.
+    """
+
+    def __init__(
+        self, *, max_entries: int, max_bytes: int, ttl: float, journal_size: int = 1024
+    ) -> None:
+        self._cache: LRUTTLCache[FeedKey, _CachedFeed] = LRUTTLCache(
+            max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, on_remove=self._unindex
+        )
+        self._by_viewer: Dict[int, Set[FeedKey]] = {}
+        self._by_author: Dict[int, Set[FeedKey]] = {}
+        self._paged_by_author: Dict[int, Set[FeedKey]] = {}
+        self._by_tweet: Dict[int, Set[FeedKey]] = {}
+        self._seq = 0
+        self._journal: Deque[Tuple[int, str, int]] = deque(maxlen=journal_size)
+        self.invalidations = 0
+        self.stale = 0  # записи, отброшенные из-за сменившейся версии ленты
+
+    # ---------- чтение / запись ----------
+    @property
+    def seq(self) -> int:
+        """Номер последней инвалидации: запомнить до расчёта страницы, передать в put()."""
+        return self._seq
+
+    def get(
+        self,
+        viewer_id: int,
+        limit: Optional[int],
+        cursor: Optional[str],
+        *,
+        compact: bool = False,
+        media: Optional[str] = None,
+        version: FeedVersion,
+    ) -> Optional[FeedPage]:
+        key: FeedKey = (viewer_id, limit, cursor, compact, media)
+        cached = self._cache.peek(key)
+        if cached is not None and cached.version != version.etag():
+            self._cache.pop(key)  # лента изменилась в обход этого процесса
+            self.stale += 1
+        cached = self._cache.get(key)
+        return cached.page if cached is not None else None
+
+    def put(
+        self,
+        viewer_id: int,
+        limit: Optional[int],
+        cursor: Optional[str],
+        page: FeedPage,
+        *,
+        compact: bool = False,
+        media: Optional[str] = None,
+        version: FeedVersion,
+        author_ids: FrozenSet[int],
+        started_seq: int,
+    ) -> None:
+        tweet_ids = frozenset(t["id"] for t in page[0])
+        if self._invalidated_since(started_seq, viewer_id, author_ids, tweet_ids):
+            return
+
+        key: FeedKey = (viewer_id, limit, cursor, compact, media)
+        cached = _CachedFeed(page, version.etag(), author_ids, tweet_ids)
+        self._cache.set(key, cached, size=_estimate_size(page))
+        if key not in self._cache:
+            return  # не влезла по размеру
+        self._by_viewer.setdefault(viewer_id, set()).add(key)
+        for author_id in author_ids:
+            self._by_author.setdefault(author_id, set()).add(key)
+            if limit is not None:
+                self._paged_by_author.setdefault(author_id, set()).add(key)
+        for tweet_id in tweet_ids:
+            self._by_tweet.setdefault(tweet_id, set()).add(key)
+
+    # ---------- инвалидация ----------
+    def invalidate_viewer(self, viewer_id: int) -> None:
+        self._record(_VIEWER, viewer_id)
+        self._drop(self._by_viewer.get(viewer_id))
+
+    def invalidate_author(self, author_id: int) -> None:
+        self._record(_AUTHOR, author_id)
+        self._drop(self._by_author.get(author_id))
+
+    def invalidate_like(self, tweet_id: int, author_id: Optional[int]) -> None:
+        self._record(_TWEET, tweet_id)
+        self._drop(self._by_tweet.get(tweet_id))
+        if author_id is not None:
+            self._record(_AUTHOR, author_id)
+            self._drop(self._paged_by_author.get(author_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._journal.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._cache.stats(), "invalidations": self.invalidations, "stale": self.stale}
+
+    # ---------- внутреннее ----------
+    def _record(self, kind: str, ident: int) -> None:
+        self._seq += 1
+        self._journal.append((self._seq, kind, ident))
+
+    def _invalidated_since(
+        self,
+        started_seq: int,
+        viewer_id: int,
+        author_ids: FrozenSet[int],
+        tweet_ids: FrozenSet[int],
+    ) -> bool:
+        if started_seq == self._seq:
+            return False
+        if not self._journal or self._journal[0][0] > started_seq + 1:
+            return True  # журнал уже не покрывает интервал — не рискуем
+        for seq, kind, ident in self._journal:
+            if seq <= started_seq:
+                continue
+            if (
+                (kind == _VIEWER and ident == viewer_id)
+                or (kind == _AUTHOR and ident in author_ids)
+                or (kind == _TWEET and ident in tweet_ids)
+            ):
+                return True
+        return False
+
+    def _drop(self, keys: Optional[Set[FeedKey]]) -> None:
+        for key in list(keys or ()):
+            if self._cache.pop(key) is not None:
+                self.invalidations += 1
+
+    def _unindex(self, key: FeedKey, cached: _CachedFeed) -> None:
+        viewer_id, limit, *_ = key
+        _discard(self._by_viewer, viewer_id, key)
+        for author_id in cached.author_ids:
+            _discard(self._by_author, author_id, key)
+            if limit is not None:
+                _discard(self._paged_by_author, author_id, key)
+        for tweet_id in cached.tweet_ids:
+            _discard(self._by_tweet, tweet_id, key)
+
+
+def _discard(index: Dict[int, Set[FeedKey]], ident: int, key: FeedKey) -> None:
+    keys = index.get(ident)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[ident]
+
+
+feed_cache = FeedCache(
+    max_entries=settings.FEED_CACHE_MAX_ENTRIES,
+    max_bytes=settings.FEED_CACHE_MAX_BYTES,
+    ttl=settings.FEED_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,428 @@
+# app/services/follow_graph.py
+# In-process индекс графа подписок (FOLLOW_GRAPH_ENABLED): смежность в компактных
+# отсортированных массивах int (CSR) + небольшой журнал последних изменений.
+import asyncio
+from array import array
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import session as db_session
+from app.models import Follow, User
+
+Edge = Tuple[int, int]  # (follower_id, followee_id)
+Versions = Mapping[int, int]  # user_id → follows_version после изменения (из UPDATE … RETURNING)
+_UNKNOWN = -1  # версия строки неизвестна: граф мог пропустить изменение другого воркера
+
+
+class _CSR:
+    """
+    Неизменяемая смежность: соседи узла n — targets[offsets[n]:offsets[n + 1]],
+    по возрастанию. Узлы — id пользователей (плотные автоинкрементные), поэтому
+    offsets индексируется id напрямую; узлы за концом offsets — без соседей.
+    """
+
+    __slots__ = ("offsets", "targets")
+
+    def __init__(self, offsets: array, targets: array) -> None:
+        self.offsets = offsets  # 'q': 8 байт на узел
+        self.targets = targets  # 'i': 4 байта на ребро (users.id — Integer)
+
+    @classmethod
+    def from_sorted(cls, pairs: Iterable[Edge]) -> "_CSR":
+        """Собрать из пар (узел, сосед), отсортированных по (узел, сосед)."""
+        builder = _CSRBuilder()
+        builder.extend(pairs)
+        return builder.build()
+
+    @property
+    def nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    def bounds(self, node: int) -> Tuple[int, int]:
+        if node < 0 or node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def row(self, node: int) -> array:
+        lo, hi = self.bounds(node)
+        return self.targets[lo:hi]
+
+    def has(self, node: int, target: int) -> bool:
+        lo, hi = self.bounds(node)
+        i = bisect_left(self.targets, target, lo, hi)
+        return i < hi and self.targets[i] == target
+
+    def transposed(self) -> "_CSR":
+        """
+        Обратная смежность (сосед → узлы) сортировкой подсчётом: O(узлы + рёбра),
+        строки сразу по возрастанию — узлы обходятся по порядку.
+        """
+        nodes = (max(self.targets) + 1) if self.targets else 1
+        offsets = array("q", bytes(8 * (nodes + 1)))
+        for target in self.targets:
+            offsets[target + 1] += 1
+        for i in range(nodes):
+            offsets[i + 1] += offsets[i]
+        cursor = array("q", offsets)
+        targets = array("i", bytes(4 * len(self.targets)))
+        src = self.offsets
+        for node in range(self.nodes):
+            for target in self.targets[src[node] : src[node + 1]]:
+                targets[cursor[target]] = node
+                cursor[target] += 1
+        return _CSR(offsets, targets)
+
+    def nbytes(self) -> int:
+        return len(self.offsets) * self.offsets.itemsize + len(self.targets) * self.targets.itemsize
+
+
+class _CSRBuilder:
+    """Сборка CSR потоком отсортированных пар — без промежуточного списка всех рёбер."""
+
+    def __init__(self) -> None:
+        self.offsets, self.targets = array("q", [0]), array("i")
+
+    def extend(self, pairs: Iterable[Edge]) -> None:
+        offsets, targets = self.offsets, self.targets
+        for node, target in pairs:
+            while len(offsets) <= node:
+                offsets.append(len(targets))
+            targets.append(target)
+
+    def build(self) -> _CSR:
+        self.offsets.append(len(self.targets))
+        return _CSR(self.offsets, self.targets)
+
+
+class _Adjacency:
+    """CSR + журнал изменений поверх него (добавленные / удалённые соседи по узлам)."""
+
+    def __init__(self, base: _CSR) -> None:
+        self.base = base
+        self._added: Dict[int, Set[int]] = {}
+        self._removed: Dict[int, Set[int]] = {}
+        self.delta_size = 0
+
+    def get(self, node: int) -> List[int]:
+        row = self.base.row(node)
+        added, removed = self._added.get(node), self._removed.get(node)
+        result = row.tolist()
+        if removed:
+            # в removed только соседи из base; немного удалений — точечно (memmove на C)
+            if len(removed) * 32 < len(result):
+                for target in removed:
+                    del result[bisect_left(result, target)]
+            else:
+                result = [t for t in result if t not in removed]
+        if added:
+            # две отсортированные серии: timsort сливает их за линейное время
+            result.extend(added)
+            result.sort()
+        return result
+
+    def degree(self, node: int) -> int:
+        lo, hi = self.base.bounds(node)
+        return hi - lo + len(self._added.get(node, ())) - len(self._removed.get(node, ()))
+
+    def add(self, node: int, target: int) -> None:
+        if self.base.has(node, target):
+            self._drop(self._removed, node, target)
+        else:
+            self._put(self._added, node, target)
+
+    def discard(self, node: int, target: int) -> None:
+        if self.base.has(node, target):
+            self._put(self._removed, node, target)
+        else:
+            self._drop(self._added, node, target)
+
+    def _put(self, log: Dict[int, Set[int]], node: int, target: int) -> None:
+        targets = log.setdefault(node, set())
+        if target not in targets:
+            targets.add(target)
+            self.delta_size += 1
+
+    def _drop(self, log: Dict[int, Set[int]], node: int, target: int) -> None:
+        targets = log.get(node)
+        if targets and target in targets:
+            targets.discard(target)
+            self.delta_size -= 1
+            if not targets:
+                del log[node]
+
+    def snapshot(self) -> "_Adjacency":
+        """Копия для сборки в потоке: base неизменяем, журнал копируется (он мал)."""
+        copy = _Adjacency(self.base)
+        copy._added = {node: set(t) for node, t in self._added.items()}
+        copy._removed = {node: set(t) for node, t in self._removed.items()}
+        copy.delta_size = self.delta_size
+        return copy
+
+    def compacted(self) -> _CSR:
+        """
+        Новый CSR с влитым журналом (self не меняется). Неизменённые участки targets
+        копируются срезами (на уровне C), пересобираются только строки из журнала.
+        """
+        if not self._added and not self._removed:
+            return self.base
+        offsets, targets = array("q", [0]), array("i")
+        done = 0  # узлы [0, done) уже перенесены: len(offsets) == done + 1
+        for node in sorted(self._added.keys() | self._removed.keys()):
+            self._copy_unchanged(offsets, targets, done, node)
+            targets.extend(array("i", self.get(node)))
+            offsets.append(len(targets))
+            done = node + 1
+        self._copy_unchanged(offsets, targets, done, self.base.nodes)
+        return _CSR(offsets, targets)
+
+    def _copy_unchanged(self, offsets: array, targets: array, start: int, stop: int) -> None:
+        """Перенести узлы [start, stop) из base как есть (offsets — со сдвигом)."""
+        base = self.base
+        end = min(stop, base.nodes)
+        if start < end:
+            lo, hi = base.offsets[start], base.offsets[end]
+            shift = len(targets) - lo
+            targets.extend(base.targets[lo:hi])
+            offsets.extend(o + shift for o in base.offsets[start + 1 : end + 1])
+        empty = stop - max(start, end)
+        if empty > 0:  # новые узлы за концом base без соседей
+            offsets.extend(array("q", [len(targets)]) * empty)
+
+    def nbytes(self) -> int:
+        # журнал маленький (до FOLLOW_GRAPH_COMPACT_THRESHOLD рёбер) — считаем только CSR
+        return self.base.nbytes()
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти процесса: «на кого подписан X» (following) и «кто подписан
+    на X» (followers) — срез массива, без запроса в БД.
+
+    Загружается целиком при старте (load) и дальше ведётся событиями подписки /
+    отписки после COMMIT; журнал изменений вливается в CSR, набрав compact_threshold
+    рёбер. Изменения, сделанные другими воркерами, видны только после перезагрузки
+    (FOLLOW_GRAPH_RELOAD_SECONDS). Чтобы их не принять за актуальные, граф помнит для
+    каждого пользователя follows_version, с которым его подписки совпадают с БД
+    (version): лента сверяет её с версией из БД и при расхождении читает follows.
+
+    Новые массивы (сжатие журнала, обратный CSR при загрузке) строятся в потоке, не
+    в event loop; граф подменяется целиком, а изменения, пришедшие во время сборки,
+    проигрываются поверх. Пересборки идут по одной.
+    """
+
+    def __init__(
+        self,
+        *,
+        compact_threshold: int,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ) -> None:
+        self.compact_threshold = compact_threshold
+        # по умолчанию — основная фабрика (ищется при каждой загрузке, её можно подменить)
+        self.session_factory = session_factory or (lambda: db_session.SessionLocal())
+        self._out = _Adjacency(_CSR.from_sorted(()))  # follower → followees
+        self._in = _Adjacency(_CSR.from_sorted(()))  # followee → followers
+        self._versions = array("q")  # user_id → follows_version строки following (_UNKNOWN)
+        # изменения во время пересборки
+        self._replay: Optional[List[Tuple[bool, Edge, Optional[Versions]]]] = None
+        self._rebuilding = asyncio.Lock()
+        self._compaction: Optional["asyncio.Task[None]"] = None
+        self.loaded = False
+        self.loads = 0
+        self.compactions = 0
+
+    # ---------- чтение ----------
+    def following(self, user_id: int) -> List[int]:
+        """На кого подписан user_id (по возрастанию id)."""
+        return self._out.get(user_id)
+
+    def followers(self, user_id: int) -> List[int]:
+        """Кто подписан на user_id (по возрастанию id)."""
+        return self._in.get(user_id)
+
+    def version(self, user_id: int) -> Optional[int]:
+        """follows_version, при котором following(user_id) совпадает с БД (None — неизвестно)."""
+        version = _get_version(self._versions, user_id)
+        return None if version == _UNKNOWN else version
+
+    def following_count(self, user_id: int) -> int:
+        return self._out.degree(user_id)
+
+    def followers_count(self, user_id: int) -> int:
+        return self._in.degree(user_id)
+
+    # ---------- изменения (после COMMIT, из app/services/events.py) ----------
+    # versions — новые follows_version обоих концов; без них версии концов сбрасываются
+    def add(self, follower_id: int, followee_id: int, versions: Optional[Versions] = None) -> None:
+        self._apply(True, (follower_id, followee_id), versions)
+
+    def remove(
+        self, follower_id: int, followee_id: int, versions: Optional[Versions] = None
+    ) -> None:
+        self._apply(False, (follower_id, followee_id), versions)
+
+    def remove_user(self, user_id: int) -> None:
+        """Пользователь удалён: убрать все его рёбра в обе стороны (версии соседей — сброс)."""
+        for followee_id in self.following(user_id):
+            self.remove(user_id, followee_id)
+        for follower_id in self.followers(user_id):
+            self.remove(follower_id, user_id)
+
+    def _apply(self, added: bool, edge: Edge, versions: Optional[Versions]) -> None:
+        if self._replay is not None:
+            self._replay.append((added, edge, versions))
+        self._apply_to(self._out, self._in, added, edge)
+        self._advance(self._versions, edge, versions)
+        self._maybe_compact()
+
+    @staticmethod
+    def _apply_to(out: _Adjacency, in_: _Adjacency, added: bool, edge: Edge) -> None:
+        follower_id, followee_id = edge
+        if added:
+            out.add(follower_id, followee_id)
+            in_.add(followee_id, follower_id)
+        else:
+            out.discard(follower_id, followee_id)
+            in_.discard(followee_id, follower_id)
+
+    @staticmethod
+    def _advance(known: array, edge: Edge, versions: Optional[Versions]) -> None:
+        """
+        Новая версия конца ребра принимается, только если граф стоял на предыдущей;
+        иначе он пропустил чужое изменение, и строка неизвестна до перезагрузки.
+        """
+        for user_id in edge:
+            new = versions.get(user_id) if versions else None
+            current = _get_version(known, user_id)
+            ok = new is not None and current == new - 1
+            _set_version(known, user_id, new if ok else _UNKNOWN)
+
+    def _maybe_compact(self) -> None:
+        """Журнал перерос порог — сжать в фоне (не в обработчике COMMIT подписки)."""
+        if self._out.delta_size + self._in.delta_size <= self.compact_threshold:
+            return
+        if self._compaction is None and not self._rebuilding.locked():
+            self._compaction = asyncio.get_running_loop().create_task(self.compact())
+            self._compaction.add_done_callback(self._compaction_done)
+
+    def _compaction_done(self, _task: "asyncio.Task[None]") -> None:
+        self._compaction = None
+
+    async def compact(self) -> None:
+        """Влить журналы в новые CSR (в потоке) и подменить граф."""
+
+        def start() -> Awaitable[Tuple[_CSR, _CSR, None]]:
+            out, in_ = self._out.snapshot(), self._in.snapshot()
+            return asyncio.to_thread(lambda: (out.compacted(), in_.compacted(), None))
+
+        await self._rebuild(start)
+        self.compactions += 1
+
+    async def _rebuild(
+        self, start: Callable[[], Awaitable[Tuple[_CSR, _CSR, Optional[array]]]]
+    ) -> None:
+        """
+        Построить новые массивы, пока граф продолжает обслуживать чтения и изменения,
+        и подменить оба направления разом. start() вызывается сразу после включения
+        журнала проигрывания — ни одно изменение не теряется между ними. Версии
+        start() возвращает только при загрузке (при сжатии остаются текущие).
+        """
+        async with self._rebuilding:
+            self._replay = []
+            try:
+                out, in_, versions = await start()
+                replay = self._replay
+            finally:
+                self._replay = None
+            new_out, new_in = _Adjacency(out), _Adjacency(in_)
+            for added, edge, changed in replay:
+                self._apply_to(new_out, new_in, added, edge)
+                if versions is not None:
+                    self._advance(versions, edge, changed)
+            self._out, self._in = new_out, new_in
+            if versions is not None:
+                self._versions = versions
+        self._maybe_compact()
+
+    # ---------- загрузка ----------
+    async def load(self, session: Optional[AsyncSession] = None) -> None:
+        """
+        Прочитать follows целиком (потоком, без ORM-объектов) и подменить
+        граф. Изменения, пришедшие во время чтения, проигрываются поверх нового графа.
+        """
+
+        async def read() -> Tuple[_CSR, _CSR, array]:
+            if session is not None:
+                return await self._read(session)
+            async with self.session_factory() as own:
+                return await self._read(own)
+
+        await self._rebuild(read)
+        self.loaded = True
+        self.loads += 1
+
+    @staticmethod
+    async def _read(session: AsyncSession) -> Tuple[_CSR, _CSR, array]:
+        """
+        Один проход по уникальному индексу (follower_id, followee_id); пачки строк
+        раскладываются и обратный CSR строится в потоке. Версии читаются раньше
+        рёбер: подписка, закоммиченная между запросами, даст версию старше графа
+        (лента прочтёт follows), а не наоборот.
+        """
+        versions = array("q")
+        q = select(User.id, User.follows_version).order_by(User.id)
+        result = await session.stream(q.execution_options(yield_per=10_000))
+        async for chunk in result.partitions():
+            await asyncio.to_thread(_extend_versions, versions, chunk)
+
+        q = select(Follow.follower_id, Follow.followee_id).order_by(
+            Follow.follower_id, Follow.followee_id
+        )
+        builder = _CSRBuilder()
+        result = await session.stream(q.execution_options(yield_per=10_000))
+        async for chunk in result.partitions():
+            await asyncio.to_thread(builder.extend, chunk)
+        out = builder.build()
+        return out, await asyncio.to_thread(out.transposed), versions
+
+    async def run_reloader(self, interval: float) -> None:
+        """Периодически перечитывать граф (видеть подписки, сделанные другими воркерами)."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.load()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "loaded": int(self.loaded),
+            "edges": len(self._out.base.targets) + self._out.delta_size,
+            "delta": self._out.delta_size + self._in.delta_size,
+            "bytes": self._out.nbytes() + self._in.nbytes(),
+            "loads": self.loads,
+            "compactions": self.compactions,
+        }
+
+
+def _get_version(versions: array, user_id: int) -> int:
+    return versions[user_id] if 0 <= user_id < len(versions) else _UNKNOWN
+
+
+def _set_version(versions: array, user_id: int, version: int) -> None:
+    if user_id >= len(versions):
+        if version == _UNKNOWN:
+            return
+        versions.extend(array("q", [_UNKNOWN]) * (user_id + 1 - len(versions)))
+    versions[user_id] = version
+
+
+def _extend_versions(versions: array, rows: Iterable[Tuple[int, int]]) -> None:
+    """Дописать пары (user_id, follows_version), отсортированные по user_id."""
+    for user_id, version in rows:
+        if user_id > len(versions):
+            versions.extend(array("q", [_UNKNOWN]) * (user_id - len(versions)))
+        versions.append(version)
+
+
+follow_graph = FollowGraph(compact_threshold=settings.FOLLOW_GRAPH_COMPACT_THRESHOLD)
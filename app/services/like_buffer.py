@@ -0,0 +1,231 @@
+# app/services/like_buffer.py
+# Write-behind для лайков (LIKES_WRITE_BEHIND): намерения копятся в памяти
+# и пишутся пачкой — одна транзакция и многострочные INSERT/DELETE на всю пачку.
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import session as db_session
+from app.db.dialects import dialect_name
+from app.exceptions import AlreadyExists, EntityNotFound
+from app.models import Like, Tweet, User
+from app.services import events
+
+Pair = Tuple[int, int]  # (user_id, tweet_id)
+
+
+class _Intent(NamedTuple):
+    user_id: int
+    tweet_id: int
+    like: bool  # True — лайк, False — снять лайк
+    result: "asyncio.Future[None]"
+
+
+class LikeBuffer:
+    """
+    Очередь лайков/анлайков с пакетной записью.
+
+    Запрос ставит намерение и ждёт своего future: ответ уходит после COMMIT пачки
+    и с тем же результатом, что дал бы like_tweet / unlike_tweet (AlreadyExists,
+    EntityNotFound, успех). Пачка пишется не позже max_delay после первого
+    намерения в ней (или сразу, набрав max_batch); намерения одной пары
+    (user, tweet) применяются по порядку, и лайк + анлайк в одной пачке
+    не доходят до БД вовсе.
+
+    При гонке с записью в обход буфера (другой воркер) итог в БД верный — INSERT
+    идёт с ON CONFLICT DO NOTHING, а счётчик меняется по реально вставленным
+    и удалённым строкам, — но такой повторный лайк может получить успех вместо
+    AlreadyExists.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_delay: float,
+        max_batch: int,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ) -> None:
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        # по умолчанию — основная фабрика (ищется при каждой пачке, её можно подменить)
+        self.session_factory = session_factory or (lambda: db_session.SessionLocal())
+        self._pending: List[_Intent] = []
+        self._full = asyncio.Event()
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self.intents = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    # ---------- API для роутов ----------
+    async def like(self, *, user_id: int, tweet_id: int) -> None:
+        await self._submit(user_id, tweet_id, True)
+
+    async def unlike(self, *, user_id: int, tweet_id: int) -> None:
+        await self._submit(user_id, tweet_id, False)
+
+    async def close(self) -> None:
+        """Записать всё, что накоплено (shutdown приложения)."""
+        while self._flusher is not None:
+            self._full.set()
+            await asyncio.shield(self._flusher)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "intents": self.intents,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+    # ---------- очередь ----------
+    async def _submit(self, user_id: int, tweet_id: int, like: bool) -> None:
+        loop = asyncio.get_running_loop()
+        intent = _Intent(user_id, tweet_id, like, loop.create_future())
+        self._pending.append(intent)
+        self.intents += 1
+        if self._flusher is None:
+            self._full = asyncio.Event()  # событие — в текущем event loop
+            self._flusher = loop.create_task(self._run())
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        await intent.result
+
+    async def _run(self) -> None:
+        try:
+            while self._pending:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._full.clear()
+                batch, self._pending = (
+                    self._pending[: self.max_batch],
+                    self._pending[self.max_batch :],
+                )
+                if len(self._pending) >= self.max_batch:
+                    self._full.set()
+                await self._flush(batch)
+        finally:
+            self._flusher = None
+
+    async def _flush(self, batch: List[_Intent]) -> None:
+        try:
+            async with self.session_factory() as session:
+                results = await self._apply(session, batch)
+                await session.commit()
+        except Exception as exc:  # пачка не записана — ошибка каждому запросу
+            for intent in batch:
+                if not intent.result.done():
+                    intent.result.set_exception(exc)
+            return
+        self.flushes += 1
+        for intent, error in zip(batch, results):
+            if intent.result.done():
+                continue  # запрос отменён (клиент ушёл) — намерение всё равно записано
+            if error is None:
+                intent.result.set_result(None)
+            else:
+                intent.result.set_exception(error)
+
+    # ---------- запись пачки ----------
+    async def _apply(
+        self, session: AsyncSession, batch: List[_Intent]
+    ) -> List[Optional[Exception]]:
+        tweet_ids = {i.tweet_id for i in batch}
+        user_ids = {i.user_id for i in batch}
+        pairs = {(i.user_id, i.tweet_id) for i in batch}
+
+        # FOR KEY SHARE (Postgres): твит/пользователь не исчезнут до COMMIT пачки
+        authors: Dict[int, int] = {
+            row.id: row.author_id
+            for row in await session.execute(
+                select(Tweet.id, Tweet.author_id)
+                .where(Tweet.id.in_(tweet_ids))
+                .with_for_update(read=True, key_share=True)
+            )
+        }
+        users: Set[int] = set(
+            await session.scalars(
+                select(User.id)
+                .where(User.id.in_(user_ids))
+                .with_for_update(read=True, key_share=True)
+            )
+        )
+        existing: Set[Pair] = {
+            (row.user_id, row.tweet_id)
+            for row in await session.execute(
+                select(Like.user_id, Like.tweet_id).where(
+                    tuple_(Like.user_id, Like.tweet_id).in_(pairs)
+                )
+            )
+        }
+
+        # проигрываем намерения по порядку: итоговое состояние пары + ответ каждому
+        state: Dict[Pair, bool] = {}
+        results: List[Optional[Exception]] = []
+        for intent in batch:
+            key = (intent.user_id, intent.tweet_id)
+            if intent.tweet_id not in authors or intent.user_id not in users:
+                # unlike несуществующего — не ошибка (как unlike_tweet)
+                results.append(EntityNotFound("user or tweet not found") if intent.like else None)
+                continue
+            liked = state.get(key, key in existing)
+            if intent.like and liked:
+                results.append(AlreadyExists("like already exists"))
+                continue
+            state[key] = intent.like
+            results.append(None)
+
+        to_insert = [key for key, liked in state.items() if liked and key not in existing]
+        to_delete = [key for key, liked in state.items() if not liked and key in existing]
+        deltas: Counter[int] = Counter()
+        if to_insert:
+            for _, tweet_id in await self._insert(session, to_insert):
+                deltas[tweet_id] += 1
+        if to_delete:
+            deleted = await session.execute(
+                delete(Like)
+                .where(tuple_(Like.user_id, Like.tweet_id).in_(to_delete))
+                .returning(Like.user_id, Like.tweet_id)
+                .execution_options(synchronize_session=False)
+            )
+            for _, tweet_id in deleted:
+                deltas[tweet_id] -= 1
+
+        deltas = Counter({tweet_id: d for tweet_id, d in deltas.items() if d})
+        if deltas:
+            count = Tweet.likes_count + case(dict(deltas), value=Tweet.id, else_=0)
+            await session.execute(
+                update(Tweet)
+                .where(Tweet.id.in_(deltas))
+                .values(likes_count=case((count < 0, 0), else_=count))
+                .execution_options(synchronize_session=False)
+            )
+            await events.likes_changed(
+                session, authors={tweet_id: authors[tweet_id] for tweet_id in deltas}
+            )
+        self.rows_written += len(to_insert) + len(to_delete)
+        return results
+
+    async def _insert(self, session: AsyncSession, rows: List[Pair]) -> List[Pair]:
+        """Многострочный INSERT … ON CONFLICT DO NOTHING; возвращает реально вставленные пары."""
+        insert = pg_insert if dialect_name(session) == "postgresql" else sqlite_insert
+        q = (
+            insert(Like)
+            .values([{"user_id": u, "tweet_id": t} for u, t in rows])
+            .on_conflict_do_nothing(index_elements=[Like.user_id, Like.tweet_id])
+            .returning(Like.user_id, Like.tweet_id)
+        )
+        return [(row.user_id, row.tweet_id) for row in await session.execute(q)]
+
+
+like_buffer = LikeBuffer(
+    max_delay=settings.LIKES_WRITE_BEHIND_MAX_DELAY_MS / 1000,
+    max_batch=settings.LIKES_WRITE_BEHIND_MAX_BATCH,
+)
@@ -1,27 +1,197 @@
 # app/services/likes.py
 # Лайк / анлайк твитов
-from sqlalchemy import delete
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Select, delete, exists, func, literal, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.db.dialects import dialect_name, is_foreign_key_violation
 from app.exceptions import AlreadyExists, EntityNotFound
 from app.models import Like, Tweet, User
+from app.serialization import LikeWire
+from app.services import events, versions
+from app.services.cursors import decode_cursor, encode_cursor, parse_cursor_int
+
+# сколько твитов склеивать в один UNION ALL (в SQLite потолок — 500 частей)
+_PREVIEW_UNION_SIZE = 200
 
 
 async def like_tweet(session: AsyncSession, *, user_id: int, tweet_id: int) -> None:
-    """Поставить лайк твиту. Дубликат → AlreadyExists, отсутствие сущности → EntityNotFound."""
-    user = await session.get(User, user_id)
-    tweet = await session.get(Tweet, tweet_id)
-    if not user or not tweet:
-        raise EntityNotFound("user or tweet not found")
-    async with session.begin_nested():
-        session.add(Like(user_id=user_id, tweet_id=tweet_id))
-        try:
-            await session.flush()  # получим ошибку тут, если дубликат
-        except IntegrityError:
+    """
+    Поставить лайк твиту. Дубликат → AlreadyExists, отсутствие сущности → EntityNotFound.
+    Postgres — один запрос: INSERT … ON CONFLICT DO NOTHING в CTE и инкремент счётчика
+    по его RETURNING; несуществующий пользователь/твит — нарушение FK.
+    SQLite (FK по умолчанию не проверяются) — INSERT … SELECT под EXISTS и инкремент;
+    причина отказа выясняется отдельным запросом, только если строка не вставилась.
+    """
+    if dialect_name(session) == "postgresql":
+        author_id = await _insert_like_postgres(session, user_id=user_id, tweet_id=tweet_id)
+    else:
+        author_id = await _insert_like_sqlite(session, user_id=user_id, tweet_id=tweet_id)
+    await events.like_changed(session, tweet_id=tweet_id, author_id=author_id)
+
+
+async def _insert_like_postgres(session: AsyncSession, *, user_id: int, tweet_id: int) -> int:
+    new_like = (
+        pg_insert(Like)
+        .values(user_id=user_id, tweet_id=tweet_id)
+        .on_conflict_do_nothing(index_elements=[Like.user_id, Like.tweet_id])
+        .returning(Like.tweet_id)
+        .cte("new_like")
+    )
+    # атомарный инкремент на стороне БД (без read-modify-write), только если лайк вставлен
+    q = (
+        update(Tweet)
+        .where(Tweet.id == new_like.c.tweet_id)
+        .values(likes_count=Tweet.likes_count + 1)
+        .returning(Tweet.author_id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        author_id = await session.scalar(q)
+    except IntegrityError as exc:
+        if is_foreign_key_violation(exc):
+            raise EntityNotFound("user or tweet not found") from exc
+        raise
+    if author_id is None:
+        raise AlreadyExists("like already exists")
+    return author_id
+
+
+async def _insert_like_sqlite(session: AsyncSession, *, user_id: int, tweet_id: int) -> int:
+    both_exist = select(literal(user_id), literal(tweet_id)).where(
+        exists().where(User.id == user_id), exists().where(Tweet.id == tweet_id)
+    )
+    inserted = await session.scalar(
+        sqlite_insert(Like)
+        .from_select([Like.user_id, Like.tweet_id], both_exist)
+        .on_conflict_do_nothing(index_elements=[Like.user_id, Like.tweet_id])
+        .returning(Like.id)
+    )
+    if inserted is None:
+        duplicate = exists().where(Like.user_id == user_id, Like.tweet_id == tweet_id)
+        if await session.scalar(select(duplicate)):
             raise AlreadyExists("like already exists")
+        raise EntityNotFound("user or tweet not found")
+
+    return await session.scalar(
+        update(Tweet)
+        .where(Tweet.id == tweet_id)
+        .values(likes_count=Tweet.likes_count + 1)
+        .returning(Tweet.author_id)
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def unlike_tweet(session: AsyncSession, *, user_id: int, tweet_id: int) -> None:
     """Снять лайк. Идемпотентно: если записи нет — не ошибка."""
-    await session.execute(delete(Like).where(Like.user_id == user_id, Like.tweet_id == tweet_id))
+    res = await session.execute(
+        delete(Like).where(Like.user_id == user_id, Like.tweet_id == tweet_id)
+    )
+    if res.rowcount:
+        author_id = await session.scalar(
+            update(Tweet)
+            .where(Tweet.id == tweet_id, Tweet.likes_count > 0)
+            .values(likes_count=Tweet.likes_count - 1)
+            .returning(Tweet.author_id)
+        )
+        await events.like_changed(session, tweet_id=tweet_id, author_id=author_id)
+
+
+async def recount_likes(session: AsyncSession) -> int:
+    """
+    Пересчитать tweets.likes_count по таблице likes (защита от дрейфа счётчика,
+    например после каскадного удаления пользователя). Возвращает число исправленных твитов.
+    """
+    actual = select(func.count(Like.id)).where(Like.tweet_id == Tweet.id).scalar_subquery()
+    author_ids = list(
+        await session.scalars(
+            update(Tweet)
+            .where(Tweet.likes_count != actual)
+            .values(likes_count=actual)
+            .returning(Tweet.author_id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+    await versions.bump_authors(session, author_ids)
+    return len(author_ids)
+
+
+# -------------------- Чтение лайкнувших --------------------
+def _recent_likers(tweet_id: int) -> Select:
+    """Лайкнувшие твит, от последних к первым: идёт по индексу (tweet_id, id)."""
+    return (
+        select(Like.id.label("like_id"), Like.tweet_id, User.id.label("user_id"), User.username)
+        .join(User, User.id == Like.user_id)
+        .where(Like.tweet_id == tweet_id)
+        .order_by(Like.id.desc())
+    )
+
+
+async def list_likers_page(
+    session: AsyncSession,
+    *,
+    tweet_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[LikeWire], Optional[str]]:
+    """
+    Страница лайкнувших твит (keyset по likes.id ↓): цена запроса не зависит
+    от того, сколько всего у твита лайков. Возвращает (лайкнувшие, next_cursor).
+    """
+    if await session.get(Tweet, tweet_id) is None:
+        raise EntityNotFound("tweet not found")
+    limit = limit or settings.LIKES_PAGE_SIZE
+
+    q = _recent_likers(tweet_id).limit(limit + 1)
+    if cursor is not None:
+        (after_id,) = decode_cursor(cursor, size=1)
+        q = q.where(Like.id < parse_cursor_int(after_id))
+    rows = (await session.execute(q)).all()
+
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].like_id)
+    return [{"user_id": r.user_id, "name": r.username} for r in rows], next_cursor
+
+
+async def fetch_likers_preview(
+    session: AsyncSession, tweet_ids: Sequence[int], size: int
+) -> Dict[int, List[LikeWire]]:
+    """
+    Последние size лайкнувших для каждого твита пачки: tweet_id → [{user_id, name}].
+    Один UNION ALL из запросов с LIMIT на твит — каждый читает не больше size
+    строк индекса, сколько бы лайков у твита ни было (ROW_NUMBER() перебрал бы все).
+    """
+    grouped: Dict[int, List[LikeWire]] = defaultdict(list)
+    if size <= 0:
+        return grouped
+
+    ids = list(tweet_ids)
+    for start in range(0, len(ids), _PREVIEW_UNION_SIZE):
+        parts = [
+            select(sub)
+            for sub in (
+                _recent_likers(tid).limit(size).subquery()
+                for tid in ids[start : start + _PREVIEW_UNION_SIZE]
+            )
+        ]
+        q = parts[0] if len(parts) == 1 else union_all(*parts)
+        rows = sorted((await session.execute(q)).all(), key=lambda r: -r.like_id)
+        for r in rows:
+            grouped[r.tweet_id].append({"user_id": r.user_id, "name": r.username})
+    return grouped
+
+
+async def liked_by(session: AsyncSession, user_id: int, tweet_ids: Sequence[int]) -> Set[int]:
+    """Какие из твитов лайкнул пользователь (по уникальному индексу user_id + tweet_id)."""
+    if not tweet_ids:
+        return set()
+    q = select(Like.tweet_id).where(Like.user_id == user_id, Like.tweet_id.in_(tweet_ids))
+    return set((await session.scalars(q)).all())
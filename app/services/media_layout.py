@@ -0,0 +1,170 @@
+# app/services/media_layout.py
+# Онлайн-перенос файлов из плоского MEDIA_DIR (media/<имя>) в раскладку
+# ab/cd/<sha256>.<ext> (medias.media_relpath), пачками и с возобновлением.
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import session as db_session
+from app.models import Media, Tweet
+from app.models.media import tweet_media
+from app.services import events, medias
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+def _hash_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as src:
+        while chunk := src.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _place(src: Path, dst: Path) -> bool:
+    """
+    Сделать файл доступным и по новому пути, не убирая старый: жёсткая ссылка
+    (без копирования), где её нет — копия через .part. False — файл уже на месте
+    (то же содержимое загружено заново или перенесено раньше).
+    """
+    if dst.exists():
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        return False
+    except OSError:  # другая ФС / ссылки не поддерживаются
+        part = dst.with_name(f"{dst.name}.{uuid.uuid4().hex}.part")
+        shutil.copyfile(src, part)
+        os.replace(part, dst)
+    if settings.MEDIA_FSYNC == "full":
+        medias._sync_dir(dst.parent)
+    return True
+
+
+async def migrate_layout(
+    *, batch_size: Optional[int] = None, session_factory: Optional[SessionFactory] = None
+) -> Dict[str, int]:
+    """
+    Перенести строки Media со старым плоским путём в раскладку по хэшу.
+
+    Работает при живом приложении: пачка из batch_size строк (по возрастанию id) —
+    своя короткая транзакция. Сначала файл появляется по новому пути (старый
+    остаётся), потом в той же транзакции меняется Media.path и сдвигаются версии
+    лент авторов твитов с этими медиа (events.media_changed) — клиенты по ETag
+    перечитают ленты с новыми ссылками. В любой момент оба пути отдаются /media.
+    Старые файлы убирает remove_flat_files отдельно, когда ленты перечитаны.
+    Прерванный перенос продолжается с начала: перенесённые строки под выборку
+    больше не попадают.
+
+    Старым файлам считается SHA-256 и записывается в content_hash; если то же
+    содержимое уже есть у другой строки, строка указывает на её файл, а content_hash
+    остаётся NULL (уникальный индекс; id медиа, выданные клиентам, не меняются).
+    """
+    batch_size = batch_size or settings.MEDIA_MIGRATION_BATCH_SIZE
+    factory = session_factory or db_session.SessionLocal
+    prefix = medias.MEDIA_URL_PREFIX
+    report = {"moved": 0, "deduplicated": 0, "missing": 0, "batches": 0}
+    last_id = 0
+    while True:
+        async with factory() as session:
+            rows = (
+                await session.execute(
+                    select(Media.id, Media.path, Media.content_hash)
+                    .where(Media.id > last_id, Media.path.not_like(f"{prefix}%/%"))
+                    .order_by(Media.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not rows:
+                return report
+
+            planned: List[tuple] = []
+            for row in rows:
+                src = medias.MEDIA_DIR / row.path.removeprefix(prefix)
+                if not await medias._on_disk(src.is_file):
+                    report["missing"] += 1  # строка остаётся как есть
+                    continue
+                digest = row.content_hash or await medias._on_disk(_hash_file, src)
+                planned.append((row, src, digest))
+
+            new_hashes = {digest for row, _, digest in planned if row.content_hash is None}
+            taken = set(
+                await session.scalars(
+                    select(Media.content_hash).where(Media.content_hash.in_(new_hashes))
+                )
+            )
+            moved_ids: List[int] = []
+            deduplicated = 0
+            for row, src, digest in planned:
+                relpath = medias.media_relpath(f"{digest}{src.suffix.lower()}")
+                await medias._on_disk(_place, src, medias.MEDIA_DIR / relpath)
+                values = {"path": prefix + relpath}
+                if row.content_hash is None:
+                    if digest in taken:
+                        deduplicated += 1
+                    else:
+                        values["content_hash"] = digest
+                        taken.add(digest)
+                # path в условии: строку могли изменить, пока шла пачка
+                await session.execute(
+                    update(Media).where(Media.id == row.id, Media.path == row.path).values(values)
+                )
+                moved_ids.append(row.id)
+            if moved_ids:
+                # attachments в лентах сменились — ETag тоже должен (как у производных медиа)
+                author_ids = await session.scalars(
+                    select(Tweet.author_id)
+                    .join(tweet_media, tweet_media.c.tweet_id == Tweet.id)
+                    .where(tweet_media.c.media_id.in_(moved_ids))
+                    .distinct()
+                )
+                await events.media_changed(session, author_ids=list(author_ids))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # параллельная загрузка заняла тот же content_hash — пачка заново
+                await session.rollback()
+                continue
+        last_id = rows[-1].id
+        report["moved"] += len(moved_ids)
+        report["deduplicated"] += deduplicated
+        report["batches"] += 1
+
+
+def _flat_files() -> List[Path]:
+    return sorted(
+        p for p in medias.MEDIA_DIR.iterdir() if p.is_file() and not p.name.startswith(".")
+    )
+
+
+async def remove_flat_files(
+    *, batch_size: Optional[int] = None, session_factory: Optional[SessionFactory] = None
+) -> int:
+    """
+    Удалить файлы верхнего уровня MEDIA_DIR, на которые больше не ссылается ни одна
+    строка Media (оставшиеся после migrate_layout). Возвращает число удалённых.
+    """
+    batch_size = batch_size or settings.MEDIA_MIGRATION_BATCH_SIZE
+    factory = session_factory or db_session.SessionLocal
+    prefix = medias.MEDIA_URL_PREFIX
+    files = await medias._on_disk(_flat_files)
+    removed = 0
+    async with factory() as session:
+        for start in range(0, len(files), batch_size):
+            batch = {prefix + p.name: p for p in files[start : start + batch_size]}
+            used = set(await session.scalars(select(Media.path).where(Media.path.in_(batch))))
+            for path, disk_path in batch.items():
+                if path not in used:
+                    await medias._on_disk(disk_path.unlink, True)
+                    removed += 1
+    return removed
@@ -0,0 +1,329 @@
+# app/services/media_variants.py
+# Производные картинок (MEDIA_VARIANTS_ENABLED): превью, WebP для ленты и копия без
+# EXIF. Кодирование — в пуле процессов: не занимает ни event loop, ни GIL воркера.
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import session as db_session
+from app.db.dialects import dialect_name
+from app.models import Media, MediaVariant, Tweet
+from app.models.media import tweet_media
+from app.services import events, medias
+
+try:  # Pillow — необязательная зависимость: без неё производные не строятся
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = ImageOps = None  # type: ignore[assignment]
+
+VARIANT_KINDS = ("clean", "feed", "thumb")
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+class _Spec(NamedTuple):
+    kind: str
+    dst: str  # путь на диске
+    max_side: Optional[int]  # None — исходный размер
+    format: Optional[str]  # None — формат оригинала
+    quality: int
+
+
+class _Rendered(NamedTuple):
+    kind: str
+    dst: str
+    width: int
+    height: int
+    size_bytes: int
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def _variant_specs(src: Path) -> List[_Spec]:
+    """Что строить из <sha256>.<ext>: файлы ложатся рядом с оригиналом."""
+    stem = src.name[: -len(src.suffix)]
+    return [
+        _Spec("clean", str(src.with_name(f"{stem}.clean{src.suffix}")), None, None, 95),
+        _Spec(
+            "feed",
+            str(src.with_name(f"{stem}.feed.webp")),
+            settings.MEDIA_FEED_SIZE,
+            "WEBP",
+            settings.MEDIA_WEBP_QUALITY,
+        ),
+        _Spec(
+            "thumb",
+            str(src.with_name(f"{stem}.thumb.webp")),
+            settings.MEDIA_THUMB_SIZE,
+            "WEBP",
+            settings.MEDIA_WEBP_QUALITY,
+        ),
+    ]
+
+
+def _for_format(im: "Image.Image", fmt: str) -> "Image.Image":
+    if fmt == "WEBP" and im.mode not in ("RGB", "RGBA"):
+        return im.convert("RGBA" if im.has_transparency_data else "RGB")
+    if fmt == "JPEG" and im.mode not in ("RGB", "L", "CMYK"):
+        return im.convert("RGB")
+    return im
+
+
+def render_variants(src: str, specs: List[_Spec]) -> Tuple[List[_Rendered], float]:
+    """
+    Выполняется в дочернем процессе. Картинка декодируется один раз; размеры идут
+    по убыванию, и каждый следующий уменьшается из предыдущего, а не из оригинала.
+    EXIF не переносится ни в один файл (поворот из него применяется заранее).
+    Возвращает построенное и время работы, с.
+    """
+    started = time.monotonic()
+    rendered = []
+    with Image.open(src) as original:
+        source_format = original.format
+        icc_profile = original.info.get("icc_profile")
+        current = ImageOps.exif_transpose(original)
+    for spec in sorted(specs, key=lambda s: -(s.max_side or 1 << 30)):
+        if spec.max_side is not None:
+            current.thumbnail((spec.max_side, spec.max_side), reducing_gap=3.0)
+        fmt = spec.format or source_format
+        image = _for_format(current, fmt)
+        part = f"{spec.dst}.{uuid.uuid4().hex}.part"
+        try:
+            image.save(part, format=fmt, quality=spec.quality, icc_profile=icc_profile)
+            os.replace(part, spec.dst)
+        finally:
+            if os.path.exists(part):
+                os.unlink(part)
+        rendered.append(
+            _Rendered(spec.kind, spec.dst, image.width, image.height, os.path.getsize(spec.dst))
+        )
+    return rendered, time.monotonic() - started
+
+
+class VariantPipeline:
+    """
+    Фоновая очередь производных: задание ставится после COMMIT загрузки (schedule),
+    картинка кодируется в ProcessPoolExecutor, результат пишется в media_variants,
+    и ленты авторов твитов с этим медиа сбрасываются (ETag / кэш ленты).
+
+    Задания разбирают processes воркеров (по одному на процесс пула) из
+    asyncio.Queue(max_queue): больше processes сессий БД пайплайн не держит, и
+    всплеск загрузок не выбирает пул соединений API. При переполнении очереди
+    задание отбрасывается, а не копится в памяти, — недостроенное добирает
+    build_missing. Воркеры и пул процессов (forkserver / spawn) поднимаются
+    при первом задании.
+    """
+
+    def __init__(
+        self,
+        *,
+        processes: int,
+        max_queue: int,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ) -> None:
+        self.processes = processes
+        self.max_queue = max_queue
+        # по умолчанию — основная фабрика (ищется при каждом задании, её можно подменить)
+        self.session_factory = session_factory or (lambda: db_session.SessionLocal())
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional["asyncio.Queue[Tuple[int, float]]"] = None  # (media_id, поставлено)
+        self._workers: List["asyncio.Task[None]"] = []
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.wait_seconds = 0.0  # от постановки до начала кодирования (очередь пула)
+        self.render_seconds = 0.0
+        self.max_render_seconds = 0.0
+
+    # ---------- постановка ----------
+    def schedule(self, session: AsyncSession, media_id: int) -> None:
+        """Поставить задание после COMMIT сессии загрузки (до него строки Media не видно)."""
+        event.listen(
+            session.sync_session, "after_commit", lambda _s: self.submit(media_id), once=True
+        )
+
+    def submit(self, media_id: int) -> bool:
+        if not available():
+            self.dropped += 1
+            return False
+        try:
+            self._started().put_nowait((media_id, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def build_missing(self, *, batch_size: Optional[int] = None) -> int:
+        """
+        Достроить производные всем картинкам, у которых их нет (загруженным до
+        включения или отброшенным при переполнении). Задания идут через ту же
+        очередь, но ждут места в ней, а не отбрасываются. Возвращает число построенных.
+        """
+        batch_size = batch_size or settings.MEDIA_MIGRATION_BATCH_SIZE
+        done_before, last_id = self.done, 0
+        built = select(func.count()).where(MediaVariant.media_id == Media.id).scalar_subquery()
+        # видео и прочее отсекаются в запросе — иначе каждый запуск перебирал бы их заново
+        is_image = or_(*(func.lower(Media.path).like(f"%{suffix}") for suffix in IMAGE_SUFFIXES))
+        while True:
+            async with self.session_factory() as session:
+                ids = list(
+                    await session.scalars(
+                        select(Media.id)
+                        .where(Media.id > last_id, is_image, built < len(VARIANT_KINDS))
+                        .order_by(Media.id)
+                        .limit(batch_size)
+                    )
+                )
+            if not ids:
+                break
+            last_id = ids[-1]
+            queue = self._started()
+            for media_id in ids:
+                await queue.put((media_id, time.monotonic()))
+        await self._started().join()
+        return self.done - done_before
+
+    async def close(self) -> None:
+        """Дождаться поставленных заданий и остановить воркеры и пул (shutdown приложения)."""
+        if self._queue is not None:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue, self._workers = None, []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def stats(self) -> Dict[str, float]:
+        finished = self.done or 1
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "avg_wait_ms": round(self.wait_seconds / finished * 1000, 2),
+            "avg_render_ms": round(self.render_seconds / finished * 1000, 2),
+            "max_render_ms": round(self.max_render_seconds * 1000, 2),
+        }
+
+    # ---------- задание ----------
+    def _started(self) -> "asyncio.Queue[Tuple[int, float]]":
+        """Очередь и её воркеры (создаются в текущем event loop при первом задании)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            loop = asyncio.get_running_loop()
+            self._workers = [
+                loop.create_task(self._work(self._queue)) for _ in range(self.processes)
+            ]
+        return self._queue
+
+    async def _work(self, queue: "asyncio.Queue[Tuple[int, float]]") -> None:
+        while True:
+            media_id, queued_at = await queue.get()
+            try:
+                await self._run(media_id, queued_at)
+            finally:
+                queue.task_done()
+
+    async def _run(self, media_id: int, queued_at: float) -> None:
+        try:
+            src, specs = await self._pending_specs(media_id)
+            if not specs:
+                self.skipped += 1  # не картинка, нет файла или всё уже построено
+                return
+            rendered, render_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._executor(), render_variants, str(src), specs
+            )
+            await self._record(media_id, rendered)
+        except Exception:
+            # битая картинка, DecompressionBombError, упавший процесс — медиа остаётся без
+            # производных, лента отдаёт оригинал
+            self.failed += 1
+            return
+        self.done += 1
+        self.render_seconds += render_seconds
+        self.max_render_seconds = max(self.max_render_seconds, render_seconds)
+        self.wait_seconds += max(0.0, time.monotonic() - queued_at - render_seconds)
+
+    async def _pending_specs(self, media_id: int) -> Tuple[Optional[Path], List[_Spec]]:
+        """Файл оригинала и недостающие производные (пусто — строить нечего)."""
+        async with self.session_factory() as session:
+            path = await session.scalar(select(Media.path).where(Media.id == media_id))
+            done = set(
+                await session.scalars(
+                    select(MediaVariant.kind).where(MediaVariant.media_id == media_id)
+                )
+            )
+        if path is None:
+            return None, []
+        src = medias.MEDIA_DIR / path.removeprefix(medias.MEDIA_URL_PREFIX)
+        if src.suffix.lower() not in IMAGE_SUFFIXES or not await medias._on_disk(src.is_file):
+            return src, []
+        return src, [s for s in _variant_specs(src) if s.kind not in done]
+
+    async def _record(self, media_id: int, rendered: List[_Rendered]) -> None:
+        async with self.session_factory() as session:
+            insert = pg_insert if dialect_name(session) == "postgresql" else sqlite_insert
+            await session.execute(
+                insert(MediaVariant)
+                .values(
+                    [
+                        {
+                            "media_id": media_id,
+                            "kind": r.kind,
+                            "path": medias.MEDIA_URL_PREFIX
+                            + Path(r.dst).relative_to(medias.MEDIA_DIR).as_posix(),
+                            "width": r.width,
+                            "height": r.height,
+                            "size_bytes": r.size_bytes,
+                        }
+                        for r in rendered
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[MediaVariant.media_id, MediaVariant.kind])
+            )
+            # медиа уже могло попасть в твиты: их ленты отдавали оригинал
+            author_ids = await session.scalars(
+                select(Tweet.author_id)
+                .join(tweet_media, tweet_media.c.tweet_id == Tweet.id)
+                .where(tweet_media.c.media_id == media_id)
+                .distinct()
+            )
+            await events.media_changed(session, author_ids=list(author_ids))
+            await session.commit()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=_mp_context())
+        return self._pool
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """
+    Дочерние процессы — не fork: к первому заданию в воркере уже работают потоки
+    (пул media-write, aiosqlite), и fork унаследовал бы захваченные ими блокировки
+    и открытые соединения с БД. forkserver (где есть) или spawn стартуют с чистого
+    интерпретатора и импортируют только этот модуль.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+variant_pipeline = VariantPipeline(
+    processes=settings.MEDIA_VARIANT_PROCESSES, max_queue=settings.MEDIA_VARIANT_MAX_QUEUE
+)
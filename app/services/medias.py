@@ -1,45 +1,194 @@
 # Загрузка одного файла медиа
-import shutil
+import asyncio
+import hashlib
+import os
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional, Tuple
 
 from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.db.dialects import dialect_name
 from app.exceptions import DomainValidation
 from app.models import Media
 
 MEDIA_DIR = Path(__file__).resolve().parent.parent / "media"
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+MEDIA_URL_PREFIX = "media/"  # Media.path = MEDIA_URL_PREFIX + путь внутри MEDIA_DIR
 
 ALLOWED_MIME = {"image/jpeg", "image/png", "image/webp", "video/mp4", "image/x-icon"}
 
+# диск — только в этих потоках: event loop не ждёт write/fsync, а число
+# одновременных дисковых операций ограничено (не размывается по общему пулу)
+_disk_pool = ThreadPoolExecutor(
+    max_workers=settings.MEDIA_WRITE_THREADS, thread_name_prefix="media-write"
+)
+
+
+async def _on_disk(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(_disk_pool, fn, *args)
+
+
+def _sync(out: BinaryIO) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def _sync_dir(path: Path) -> None:
+    """fsync каталога: переименование (запись в каталоге) переживёт сбой питания."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def media_relpath(name: str) -> str:
+    """
+    Путь файла внутри MEDIA_DIR: два уровня каталогов по первым символам имени
+    (ab/cd/abcd….png) — по 256 подкаталогов на уровень вместо одного плоского каталога.
+    """
+    return f"{name[:2]}/{name[2:4]}/{name}"
+
+
+def _make_dirs(path: Path) -> bool:
+    """Создать каталог (с родителями); True, если хоть что-то создано."""
+    if path.is_dir():
+        return False
+    path.mkdir(parents=True, exist_ok=True)
+    return True
+
+
+def _discard(out: BinaryIO, part: Path) -> None:
+    out.close()
+    part.unlink(missing_ok=True)
+
+
+async def _pump(file: UploadFile, sink: Callable[[bytes], Any]) -> int:
+    """
+    Прочитать UploadFile кусками по MEDIA_UPLOAD_CHUNK_SIZE и отдать каждый sink-у
+    в _disk_pool (следующий кусок читается, пока обрабатывается предыдущий; порядок
+    сохраняется). Возвращает размер в байтах.
+    """
+    size = 0
+    pending: Optional["Future[Any]"] = None
+    try:
+        while chunk := await file.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+            if pending is not None:
+                await asyncio.wrap_future(pending)
+            pending = _disk_pool.submit(sink, chunk)
+            size += len(chunk)
+        if pending is not None:
+            await asyncio.wrap_future(pending)
+    except BaseException:
+        # ошибка чтения или отмена запроса: вызывающий сейчас закроет и удалит файл
+        # (_discard) — только когда кусок, уже отданный потоку, допишется
+        if pending is not None:
+            await _settle(pending)
+        raise
+    return size
+
+
+async def _settle(job: "Future[Any]") -> None:
+    """Снять задание пула, если оно ещё не началось, иначе дождаться его (даже при отмене)."""
+    if job.cancel():
+        return
+    waiter = asyncio.wrap_future(job)
+    while not job.done():
+        with suppress(Exception, asyncio.CancelledError):  # повторная отмена / ошибка sink
+            await asyncio.shield(waiter)
+
+
+async def _hash_upload(file: UploadFile) -> Tuple[str, int]:
+    """SHA-256 содержимого и размер (hashlib на больших кусках отпускает GIL)."""
+    hasher = hashlib.sha256()
+    size = await _pump(file, hasher.update)
+    await file.seek(0)
+    return hasher.hexdigest(), size
+
+
+async def _save_upload(file: UploadFile, disk_path: Path) -> int:
+    """
+    Записать загрузку на диск, не блокируя event loop (запись — в _disk_pool).
+    Пишем во временный .part (своё имя у каждой загрузки) и переименовываем:
+    недописанный файл не виден под итоговым именем. Возвращает размер в байтах.
+    """
+    created = await _on_disk(_make_dirs, disk_path.parent)
+    part = disk_path.with_name(f"{disk_path.name}.{uuid.uuid4().hex}.part")
+    out: BinaryIO = await _on_disk(part.open, "wb")
+    try:
+        size = await _pump(file, out.write)
+        if size and settings.MEDIA_FSYNC != "off":
+            await _on_disk(_sync, out)
+    except BaseException:
+        await _on_disk(_discard, out, part)
+        raise
+    await _on_disk(out.close)
+
+    if size == 0:
+        await _on_disk(part.unlink)
+        return 0
+    await _on_disk(os.replace, part, disk_path)
+    if settings.MEDIA_FSYNC == "full":
+        await _on_disk(_sync_dir, disk_path.parent)
+        if created:  # новые каталоги шардов — тоже записи в родительских каталогах
+            for parent in disk_path.parent.parents:
+                await _on_disk(_sync_dir, parent)
+                if parent == MEDIA_DIR:
+                    break
+    return size
+
+
+async def _insert_media(session: AsyncSession, *, path: str, content_hash: str) -> int:
+    """
+    Строка Media для нового содержимого. Параллельная загрузка того же файла могла
+    успеть раньше: INSERT … ON CONFLICT DO NOTHING по content_hash, тогда — её id.
+    """
+    insert = pg_insert if dialect_name(session) == "postgresql" else sqlite_insert
+    media_id = await session.scalar(
+        insert(Media)
+        .values(path=path, content_hash=content_hash)
+        .on_conflict_do_nothing(index_elements=[Media.content_hash])
+        .returning(Media.id)
+    )
+    if media_id is None:
+        media_id = await session.scalar(select(Media.id).where(Media.content_hash == content_hash))
+    return media_id
+
 
 async def upload_media(session: AsyncSession, *, file: UploadFile) -> int:
-    """Сохранить ОДИН медиафайл и вернуть его id (контракт ТЗ)."""
+    """
+    Сохранить ОДИН медиафайл и вернуть его id (контракт ТЗ). Хранилище адресуется
+    содержимым: файл называется по SHA-256 и лежит в ab/cd/ (media_relpath), повторная загрузка того же содержимого
+    возвращает уже существующий Media — без записи на диск и без новой строки.
+    """
     if not getattr(file, "filename", None):
         raise DomainValidation("file has no filename")
 
     if file.content_type and ALLOWED_MIME and file.content_type not in ALLOWED_MIME:
         raise DomainValidation(f"unsupported media type: {file.content_type}")
 
-    name = file.filename or ""
-    ext = (Path(name).suffix or ".bin").lower()
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    disk_path = MEDIA_DIR / unique_name
-
-    # стриминговая запись на диск (без загрузки всего файла в память)
-    with disk_path.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
+    # сначала хэш (читаем уже принятую Starlette загрузку), и только новое — на диск
+    content_hash, size = await _hash_upload(file)
+    if size == 0:
+        raise DomainValidation("empty file")
+    existing = await session.scalar(select(Media.id).where(Media.content_hash == content_hash))
+    if existing is not None:
+        return existing
 
-    # если файл пустой — удаляем и кидаем доменную ошибку
-    if disk_path.stat().st_size == 0:
-        try:
-            disk_path.unlink(missing_ok=True)
-        finally:
+    ext = (Path(file.filename or "").suffix or ".bin").lower()
+    relpath = media_relpath(f"{content_hash}{ext}")
+    disk_path = MEDIA_DIR / relpath
+    # файл мог остаться от загрузки, чья транзакция не закоммитилась, — содержимое то же
+    if not await _on_disk(disk_path.exists):
+        # стриминговая запись (без загрузки всего файла в память и без блокировки loop)
+        if await _save_upload(file, disk_path) == 0:
             raise DomainValidation("empty file")
-
-    media = Media(path=f"media/{unique_name}")
-    session.add(media)
-    await session.flush()  # получим media.id
-    return media.id
+    return await _insert_media(session, path=MEDIA_URL_PREFIX + relpath, content_hash=content_hash)
@@ -0,0 +1,106 @@
+# app/services/timeline.py
+# Материализованная домашняя лента: fan-out при записи, чтение готового списка.
+# Стратегия задаётся FEED_STRATEGY:
+#   pull   — home_timeline не ведётся, лента собирается при чтении по подпискам;
+#   push   — каждый твит раскладывается по лентам всех подписчиков;
+#   hybrid — как push, но твиты «знаменитостей» (подписчиков ≥ FEED_CELEBRITY_FOLLOWERS)
+#            не раскладываются, а дочитываются при чтении ленты.
+from typing import Collection, Set
+
+from sqlalchemy import Select, delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Follow, HomeTimeline, Tweet, User
+from app.services import versions
+
+_TIMELINE_COLUMNS = ["user_id", "tweet_id", "author_id", "created_at"]
+
+
+async def celebrity_ids(session: AsyncSession, author_ids: Collection[int]) -> Set[int]:
+    """Авторы из списка, у которых подписчиков не меньше FEED_CELEBRITY_FOLLOWERS."""
+    if not author_ids:
+        return set()
+    # денормализованный users.followers_count: поиск по PK вместо COUNT по follows
+    q = select(User.id).where(
+        User.id.in_(list(author_ids)), User.followers_count >= settings.FEED_CELEBRITY_FOLLOWERS
+    )
+    return set((await session.scalars(q)).all())
+
+
+async def _pushes_to_followers(session: AsyncSession, author_id: int) -> bool:
+    if settings.FEED_STRATEGY == "push":
+        return True
+    if settings.FEED_STRATEGY == "hybrid":
+        return author_id not in await celebrity_ids(session, [author_id])
+    return False
+
+
+async def fan_out_tweet(session: AsyncSession, *, tweet_id: int, author_id: int) -> None:
+    """Разложить новый твит по лентам автора и подписчиков (один INSERT … SELECT)."""
+    if settings.FEED_STRATEGY == "pull":
+        return
+
+    recipients = select(literal(author_id).label("user_id"))
+    if await _pushes_to_followers(session, author_id):
+        recipients = recipients.union_all(
+            select(Follow.follower_id.label("user_id")).where(Follow.followee_id == author_id)
+        )
+    recipients_sq = recipients.subquery()
+    rows = (
+        select(recipients_sq.c.user_id, Tweet.id, Tweet.author_id, Tweet.created_at)
+        .select_from(recipients_sq)
+        .join(Tweet, Tweet.id == tweet_id)
+    )
+    await session.execute(insert(HomeTimeline).from_select(_TIMELINE_COLUMNS, rows))
+
+
+async def remove_tweet(session: AsyncSession, *, tweet_id: int) -> None:
+    """Убрать удалённый твит из всех лент."""
+    await session.execute(delete(HomeTimeline).where(HomeTimeline.tweet_id == tweet_id))
+
+
+async def backfill_follow(session: AsyncSession, *, follower_id: int, followee_id: int) -> None:
+    """Новая подписка: добавить в ленту читателя последние твиты автора."""
+    if not await _pushes_to_followers(session, followee_id):
+        return  # знаменитость (hybrid) или pull: твиты автора дочитываются при чтении
+
+    rows = _backfill_rows(follower_id=follower_id, followee_id=followee_id)
+    await session.execute(insert(HomeTimeline).from_select(_TIMELINE_COLUMNS, rows))
+
+
+def _backfill_rows(*, follower_id: int, followee_id: int) -> Select:
+    """Последние твиты автора — по индексу (author_id, created_at DESC, id DESC), без сортировки."""
+    return (
+        select(literal(follower_id), Tweet.id, Tweet.author_id, Tweet.created_at)
+        .where(Tweet.author_id == followee_id)
+        .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+        .limit(settings.TIMELINE_BACKFILL_LIMIT)
+    )
+
+
+async def prune_follow(session: AsyncSession, *, follower_id: int, followee_id: int) -> None:
+    """Отписка: убрать из ленты читателя все твиты автора."""
+    await session.execute(
+        delete(HomeTimeline).where(
+            HomeTimeline.user_id == follower_id,
+            HomeTimeline.author_id == followee_id,
+        )
+    )
+
+
+async def rebuild_all(session: AsyncSession) -> int:
+    """
+    Пересобрать home_timeline целиком по follows + tweets (после смены стратегии
+    с pull или если автор перестал быть знаменитостью). Возвращает число строк.
+    """
+    await session.execute(delete(HomeTimeline))
+    own = select(Tweet.author_id, Tweet.id, Tweet.author_id, Tweet.created_at)
+    followed = select(Follow.follower_id, Tweet.id, Tweet.author_id, Tweet.created_at).join(
+        Tweet, Tweet.author_id == Follow.followee_id
+    )
+    await session.execute(
+        insert(HomeTimeline).from_select(_TIMELINE_COLUMNS, own.union_all(followed))
+    )
+    await versions.bump_all_feeds(session)
+    return await session.scalar(select(func.count()).select_from(HomeTimeline)) or 0
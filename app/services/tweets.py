@@ -1,14 +1,30 @@
 # app/services/tweets.py
 # CRUD и бизнес-логика для твитов строго по ТЗ
-from typing import List
+import heapq
+from collections import defaultdict
+from datetime import datetime
+from itertools import groupby, islice
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import func, select
+from sqlalchemy import ColumnElement, Select, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
+from app.config import settings
 from app.exceptions import DomainValidation, EntityNotFound, ForbiddenAction
-from app.models import Follow, Like, Media, Tweet, User
-from app.schemas import LikeUser, TweetOut, UserPublic
+from app.models import Follow, HomeTimeline, Like, Media, MediaVariant, Tweet, User
+from app.schemas import TweetOut, UserPublic
+from app.serialization import LikeWire, TweetWire
+from app.services import events, likes, timeline, versions
+from app.services.cursors import (
+    decode_cursor,
+    encode_cursor,
+    parse_cursor_datetime,
+    parse_cursor_int,
+)
+from app.services.feed_cache import feed_cache
+from app.services.follow_graph import follow_graph
+from app.services.versions import FeedVersion
 
 
 # -------------------- Вспомогательные функции --------------------
@@ -17,24 +33,111 @@ def _user_public(u: User) -> UserPublic:
     return UserPublic(id=u.id, username=u.username)
 
 
-async def _fetch_likers(session: AsyncSession, tweet_id: int) -> List[User]:
-    q = (
-        select(User)
-        .join(Like, Like.user_id == User.id)
-        .where(Like.tweet_id == tweet_id)
-        .order_by(User.username.asc())
+async def _fetch_likers_batch(
+    session: AsyncSession, tweet_ids: Sequence[int]
+) -> Dict[int, List[LikeWire]]:
+    """
+    Лайкнувшие для пачки твитов одним запросом: tweet_id → [{user_id, name}].
+    Внутри твита — сортировка по username, как и раньше.
+    """
+    grouped: Dict[int, List[LikeWire]] = defaultdict(list)
+    if not tweet_ids:
+        return grouped
+
+    for tweet_id, user_id, username in (await session.execute(_likers_query(tweet_ids))).all():
+        grouped[tweet_id].append({"user_id": user_id, "name": username})
+    return grouped
+
+
+def _likers_query(tweet_ids: Sequence[int]) -> Select:
+    """Лайкнувшие: likes читается только из индекса (tweet_id, user_id), имя — по PK users."""
+    return (
+        select(Like.tweet_id, User.id, User.username)
+        .join(User, User.id == Like.user_id)
+        .where(Like.tweet_id.in_(tweet_ids))
+        .order_by(Like.tweet_id, User.username.asc())
     )
-    return list((await session.execute(q)).scalars().all())
 
 
-def _tweet_to_dto(t: Tweet, *, likers: List[User]) -> TweetOut:
-    return TweetOut(
-        id=t.id,
-        content=t.content,
-        attachments=[m.path for m in t.attachments],
-        author=_user_public(t.author),  # <<< ТОЛЬКО {id, name}
-        likes=[LikeUser(user_id=u.id, name=u.username) for u in likers],
+async def _fetch_variant_paths(
+    session: AsyncSession, tweets: Sequence[Tweet], kind: str
+) -> Dict[int, str]:
+    """media_id → путь производной kind для всех вложений пачки, одним запросом."""
+    media_ids = {m.id for t in tweets for m in t.attachments}
+    if not media_ids:
+        return {}
+    q = select(MediaVariant.media_id, MediaVariant.path).where(
+        MediaVariant.media_id.in_(media_ids), MediaVariant.kind == kind
     )
+    return {media_id: path for media_id, path in await session.execute(q)}
+
+
+def _tweet_to_wire(
+    t: Tweet, *, likers: List[LikeWire], variants: Optional[Dict[int, str]] = None
+) -> TweetWire:
+    """
+    Твит в формате TweetOut, но сразу dict: строки из БД уже корректны, а сборка
+    и валидация pydantic-моделей на каждом твите/лайке — основная цена ответа.
+    variants — пути производных вложений (нет производной — оригинал).
+    """
+    return {
+        "id": t.id,
+        "content": t.content,
+        "attachments": [variants.get(m.id, m.path) if variants else m.path for m in t.attachments],
+        "author": {"id": t.author.id, "name": t.author.username},  # <<< ТОЛЬКО {id, name}
+        "likes": likers,
+    }
+
+
+async def _tweets_to_wire(
+    session: AsyncSession,
+    tweets: Sequence[Tweet],
+    *,
+    compact_for: Optional[int] = None,
+    media: Optional[str] = None,
+) -> List[TweetWire]:
+    """
+    Собрать страницу твитов: лайкнувшие грузятся одним запросом на всю пачку.
+    compact_for — id читателя для компактного режима лайков: вместо полного списка
+    последние LIKES_PREVIEW_SIZE лайкнувших, likes_count и liked_by_me.
+    media — вид производной для вложений (thumb / feed / clean), None — оригиналы.
+    """
+    ids = [t.id for t in tweets]
+    variants = await _fetch_variant_paths(session, tweets, media) if media else None
+    if compact_for is None:
+        likers = await _fetch_likers_batch(session, ids)
+        return [_tweet_to_wire(t, likers=likers.get(t.id, []), variants=variants) for t in tweets]
+
+    preview = await likes.fetch_likers_preview(session, ids, settings.LIKES_PREVIEW_SIZE)
+    mine = await likes.liked_by(session, compact_for, ids)
+    items = []
+    for t in tweets:
+        item = _tweet_to_wire(t, likers=preview.get(t.id, []), variants=variants)
+        item["likes_count"] = t.likes_count
+        item["liked_by_me"] = t.id in mine
+        items.append(item)
+    return items
+
+
+async def _stream_wire(
+    session: AsyncSession,
+    q: Select,
+    *,
+    compact_for: Optional[int] = None,
+    media: Optional[str] = None,
+) -> AsyncIterator[TweetWire]:
+    """
+    Твиты по мере чтения серверного курсора: строки приходят пачками по
+    FEED_STREAM_CHUNK_SIZE, на пачку — один selectinload автора/медиа и один
+    запрос лайкнувших. В памяти одновременно живёт только текущая пачка.
+    """
+    result = await session.stream(q.execution_options(yield_per=settings.FEED_STREAM_CHUNK_SIZE))
+    try:
+        async for chunk in result.scalars().partitions():
+            for item in await _tweets_to_wire(session, chunk, compact_for=compact_for, media=media):
+                yield item
+    finally:
+        await result.close()  # клиент мог отключиться посреди выдачи
 
 
 # -------------------- Публичные функции сервиса --------------------
@@ -76,6 +179,10 @@ async def create_tweet(
     session.add(tweet)
     await session.flush()  # получили tweet.id
 
+    # fan-out: твит сразу попадает в ленты автора и подписчиков
+    await timeline.fan_out_tweet(session, tweet_id=tweet.id, author_id=author_id)
+    await events.tweet_changed(session, author_id=author_id)
+
     # КОНСТРУИРУЕМ DTO БЕЗ ЛЕНИВОГО ДОСТУПА:
     # attachments берём из media_objs (они уже в памяти),
     # author берём из `author` (тоже в памяти),
@@ -102,14 +209,24 @@ async def delete_tweet(session: AsyncSession, *, author_id: int, tweet_id: int)
     if tweet.author_id != author_id:
         raise ForbiddenAction("cannot delete another user's tweet")
 
+    await timeline.remove_tweet(session, tweet_id=tweet.id)
     await session.delete(tweet)
+    await events.tweet_changed(session, author_id=tweet.author_id)
 
 
-async def list_tweets(session: AsyncSession, *, author_id: int | None = None) -> List[TweetOut]:
+async def list_tweets(session: AsyncSession, *, author_id: int | None = None) -> List[TweetWire]:
     """
     Список твитов (опционально только автора).
     Формат строго по ТЗ: без created_at; author = {id, name}; likes = [{user_id, name}].
     """
+    tweets = (await session.execute(_tweets_query(author_id))).scalars().all()
+    if not tweets:
+        return []
+
+    return await _tweets_to_wire(session, tweets)
+
+
+def _tweets_query(author_id: int | None) -> Select:
     q = (
         select(Tweet)
         .options(
@@ -120,58 +237,312 @@ async def list_tweets(session: AsyncSession, *, author_id: int | None = None) ->
     )
     if author_id is not None:
         q = q.where(Tweet.author_id == author_id)
-
-    tweets = (await session.execute(q)).scalars().all()
-    if not tweets:
-        return []
-
-    dtos: List[TweetOut] = []
-    for t in tweets:
-        likers = await _fetch_likers(session, t.id)
-        dtos.append(_tweet_to_dto(t, likers=likers))
-    return dtos
+    return q
 
 
-async def list_feed_for_user(session: AsyncSession, *, viewer_id: int) -> List[TweetOut]:
+async def list_feed_for_user(session: AsyncSession, *, viewer_id: int) -> List[TweetWire]:
     """
     Лента: мои твиты + тех, на кого я подписан.
     Сортировка: по количеству лайков ↓, затем по дате ↓.
     """
-    # авторы ленты
-    followees_q = select(Follow.followee_id).where(Follow.follower_id == viewer_id)
-    followee_ids = [row[0] for row in (await session.execute(followees_q)).all()]
-    author_ids = followee_ids + [viewer_id] if followee_ids else [viewer_id]
+    items, _ = await list_feed_page(session, viewer_id=viewer_id)
+    return items
+
+
+async def list_feed_page(
+    session: AsyncSession,
+    *,
+    viewer_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    media: Optional[str] = None,
+    version: Optional[FeedVersion] = None,
+) -> Tuple[List[TweetWire], Optional[str]]:
+    """
+    Страница ленты с keyset-пагинацией по (лайки ↓, created_at ↓, id ↓).
+    Без limit — вся лента целиком (прежнее поведение), курсор не выдаётся.
+    compact — компактный режим лайков (превью + likes_count + liked_by_me).
+    media — вложения как производные этого вида (thumb / feed / clean).
+    version — версия ленты, под которой уйдёт ответ (feed_version); без неё подписки
+    читаются из follows.
+    Возвращает (твиты, курсор следующей страницы или None).
+    При FEED_CACHE_ENABLED страницы берутся из in-process кэша (см. feed_cache)
+    только той же версии: изменение из другого воркера — промах, а не старое тело.
+    """
+    if not settings.FEED_CACHE_ENABLED:
+        return await _load_feed_page(
+            session,
+            viewer_id=viewer_id,
+            limit=limit,
+            cursor=cursor,
+            compact=compact,
+            media=media,
+            version=version,
+        )
+
+    if version is None:
+        version = await feed_version(session, viewer_id=viewer_id)
+    cached = feed_cache.get(viewer_id, limit, cursor, compact=compact, media=media, version=version)
+    if cached is not None:
+        return cached
+
+    started_seq = feed_cache.seq
+    page = await _load_feed_page(
+        session,
+        viewer_id=viewer_id,
+        limit=limit,
+        cursor=cursor,
+        compact=compact,
+        media=media,
+        version=version,
+    )
+    author_ids = frozenset(await _followee_ids(session, viewer_id, version)) | {viewer_id}
+    feed_cache.put(
+        viewer_id,
+        limit,
+        cursor,
+        page,
+        compact=compact,
+        media=media,
+        version=version,
+        author_ids=author_ids,
+        started_seq=started_seq,
+    )
+    return page
+
+
+async def stream_feed(
+    session: AsyncSession,
+    *,
+    viewer_id: int,
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    media: Optional[str] = None,
+    version: Optional[FeedVersion] = None,
+) -> AsyncIterator[TweetWire]:
+    """
+    Вся лента (или её хвост после cursor) потоком, в том же порядке, что и
+    list_feed_page. Кэш ленты не используется: потоком отдают именно большие ленты.
+    Курсор разбирается и запрос строится сразу — ошибка придёт до начала ответа.
+    version — как у list_feed_page (подписки читателя, сверенные с БД).
+    """
+    after = _decode_feed_cursor(cursor) if cursor is not None else None
+    if settings.FEED_STRATEGY == "pull":
+        author_ids = await _followee_ids(session, viewer_id, version) + [viewer_id]
+        q = _feed_query(after).where(Tweet.author_id.in_(author_ids))
+    elif settings.FEED_STRATEGY == "hybrid":
+        q = await _hybrid_stream_query(session, viewer_id=viewer_id, after=after, version=version)
+    else:  # push
+        q = _timeline_query(viewer_id, after)
+    return _stream_wire(session, q, compact_for=viewer_id if compact else None, media=media)
 
-    # агрегат лайков
-    likes_agg = (
-        select(Like.tweet_id, func.count(Like.id).label("likes_cnt"))
-        .group_by(Like.tweet_id)
-        .subquery()
+
+async def feed_version(session: AsyncSession, *, viewer_id: int) -> FeedVersion:
+    """
+    Версия ленты для условного GET (ETag — version.etag(limit, cursor, *режим)): один
+    запрос по строкам users вместо сборки ленты. Меняется при любом твите/лайке
+    авторов ленты и при (от)писке читателя — в том числе сделанных другим воркером.
+
+    Подписки берутся из графа в памяти, если он на той же follows_version, что и БД;
+    иначе (граф пропустил чужую подписку) версия пересчитывается по follows. Сверенные
+    подписки едут в version.followee_ids — тело ленты строится по тем же авторам.
+    """
+    if settings.FOLLOW_GRAPH_ENABLED and follow_graph.loaded:
+        # версия и подписки — синхронно, без await между ними: одно состояние графа
+        known, followee_ids = follow_graph.version(viewer_id), follow_graph.following(viewer_id)
+        version = await versions.feed_version(session, viewer_id, followee_ids)
+        if known is not None and version.follows == known:
+            return version
+    return await versions.feed_version(session, viewer_id)
+
+
+async def _load_feed_page(
+    session: AsyncSession,
+    *,
+    viewer_id: int,
+    limit: Optional[int],
+    cursor: Optional[str],
+    compact: bool = False,
+    media: Optional[str] = None,
+    version: Optional[FeedVersion] = None,
+) -> Tuple[List[TweetWire], Optional[str]]:
+    """Собрать страницу ленты стратегией FEED_STRATEGY (pull / push / hybrid)."""
+    after = _decode_feed_cursor(cursor) if cursor is not None else None
+    fetch = limit + 1 if limit is not None else None  # +1 строка — есть ли следующая страница
+
+    if settings.FEED_STRATEGY == "pull":
+        author_ids = await _followee_ids(session, viewer_id, version) + [viewer_id]
+        q = _feed_query(after).where(Tweet.author_id.in_(author_ids))
+        tweets = await _fetch_feed(session, q, fetch)
+    elif settings.FEED_STRATEGY == "hybrid":
+        tweets = await _hybrid_feed(
+            session, viewer_id=viewer_id, after=after, fetch=fetch, version=version
+        )
+    else:  # push
+        tweets = await _fetch_feed(session, _timeline_query(viewer_id, after), fetch)
+
+    next_cursor: Optional[str] = None
+    if limit is not None and len(tweets) > limit:
+        tweets = tweets[:limit]
+        last = tweets[-1]
+        next_cursor = encode_cursor(last.likes_count, last.created_at, last.id)
+
+    if not tweets:
+        return [], None
+
+    # лайкнувшие (одним запросом) + DTO
+    items = await _tweets_to_wire(
+        session, tweets, compact_for=viewer_id if compact else None, media=media
     )
+    return items, next_cursor
 
-    # выборка твитов + сортировка
+
+# -------------------- Лента: стратегии чтения --------------------
+FeedAfter = Tuple[int, datetime, int]  # ключ последней строки предыдущей страницы
+
+
+def _decode_feed_cursor(cursor: str) -> FeedAfter:
+    after_likes, after_created, after_id = decode_cursor(cursor, size=3)
+    return (
+        parse_cursor_int(after_likes),
+        parse_cursor_datetime(after_created),
+        parse_cursor_int(after_id),
+    )
+
+
+def _feed_sort_key(t: Tweet) -> Tuple[int, datetime, int]:
+    return (t.likes_count, t.created_at, t.id)
+
+
+def _feed_query(after: Optional[FeedAfter]) -> Select:
+    """Твиты в порядке ленты (лайки ↓, created_at ↓, id ↓), начиная после курсора."""
     q = (
-        select(Tweet, func.coalesce(likes_agg.c.likes_cnt, 0).label("likes_cnt"))
-        .where(Tweet.author_id.in_(author_ids))
-        .outerjoin(likes_agg, likes_agg.c.tweet_id == Tweet.id)
+        select(Tweet)
         .options(
             selectinload(Tweet.author),
             selectinload(Tweet.attachments),
         )
+        .order_by(Tweet.likes_count.desc(), Tweet.created_at.desc(), Tweet.id.desc())
+    )
+    if after is not None:
+        q = q.where(_after_cursor(after))
+    return q
+
+
+def _after_cursor(after: FeedAfter) -> ColumnElement[bool]:
+    after_likes, after_created, after_id = after
+    # created_at берём из строки-якоря в БД: значение, прошедшее через Python,
+    # в SQLite не равно хранимому (другой строковый формат), и ничьи по дате
+    # сравнивались бы неверно. Если якорь уже удалён — берём дату из курсора.
+    anchor = aliased(Tweet)
+    anchor_created = func.coalesce(
+        select(anchor.created_at).where(anchor.id == after_id).scalar_subquery(),
+        after_created,
+    )
+    return tuple_(Tweet.likes_count, Tweet.created_at, Tweet.id) < tuple_(
+        after_likes, anchor_created, after_id
+    )
+
+
+def _timeline_query(viewer_id: int, after: Optional[FeedAfter]) -> Select:
+    """push: готовая лента читателя из home_timeline."""
+    return (
+        _feed_query(after)
+        .join(HomeTimeline, HomeTimeline.tweet_id == Tweet.id)
+        .where(HomeTimeline.user_id == viewer_id)
+    )
+
+
+async def _fetch_feed(session: AsyncSession, q: Select, fetch: Optional[int]) -> List[Tweet]:
+    if fetch is not None:
+        q = q.limit(fetch)
+    return list((await session.execute(q)).scalars().all())
+
+
+async def _followee_ids(
+    session: AsyncSession, viewer_id: int, version: Optional[FeedVersion]
+) -> List[int]:
+    if version is not None and version.followee_ids is not None:
+        return version.followee_ids  # из графа, сверены с БД по follows_version — без запроса
+    q = select(Follow.followee_id).where(Follow.follower_id == viewer_id)
+    return list((await session.scalars(q)).all())
+
+
+async def _hybrid_feed(
+    session: AsyncSession,
+    *,
+    viewer_id: int,
+    after: Optional[FeedAfter],
+    fetch: Optional[int],
+    version: Optional[FeedVersion] = None,
+) -> List[Tweet]:
+    """
+    hybrid: обычные авторы приходят из home_timeline (push), «знаменитости»
+    (подписчиков ≥ FEED_CELEBRITY_FOLLOWERS) дочитываются при чтении (pull).
+    Каждый поток уже отсортирован в порядке ленты, итог — k-way heap merge.
+    Твиты знаменитостей берутся одним запросом: ROW_NUMBER() по автору
+    отрезает каждому потоку не больше fetch строк.
+    """
+    followee_ids = await _followee_ids(session, viewer_id, version)
+    celebs = await timeline.celebrity_ids(session, followee_ids)
+
+    pushed_q = _timeline_query(viewer_id, after)
+    if celebs:
+        # строки, разложенные до того, как автор стал знаменитостью, придут из pull-потока
+        pushed_q = pushed_q.where(HomeTimeline.author_id.notin_(sorted(celebs)))
+    pushed = await _fetch_feed(session, pushed_q, fetch)
+    if not celebs:
+        return pushed
+
+    ranked_q = select(
+        Tweet.id,
+        func.row_number()
+        .over(
+            partition_by=Tweet.author_id,
+            order_by=(Tweet.likes_count.desc(), Tweet.created_at.desc(), Tweet.id.desc()),
+        )
+        .label("rn"),
+    ).where(Tweet.author_id.in_(sorted(celebs)))
+    if after is not None:
+        ranked_q = ranked_q.where(_after_cursor(after))
+    ranked = ranked_q.subquery()
+
+    pulled_q = (
+        _feed_query(None)
+        .join(ranked, ranked.c.id == Tweet.id)
+        .order_by(None)
         .order_by(
-            func.coalesce(likes_agg.c.likes_cnt, 0).desc(),
-            Tweet.created_at.desc(),
+            Tweet.author_id, Tweet.likes_count.desc(), Tweet.created_at.desc(), Tweet.id.desc()
         )
     )
+    if fetch is not None:
+        pulled_q = pulled_q.where(ranked.c.rn <= fetch)
+    pulled = await _fetch_feed(session, pulled_q, None)
 
-    rows = (await session.execute(q)).all()
-    tweets = [row[0] for row in rows]
-    if not tweets:
-        return []
+    # строки идут блоками по автору, внутри блока — уже в порядке ленты
+    streams: List[List[Tweet]] = [pushed]
+    for _, group in groupby(pulled, key=lambda t: t.author_id):
+        streams.append(list(group))
+    merged = heapq.merge(*streams, key=_feed_sort_key, reverse=True)
+    return list(islice(merged, fetch))
 
-    # лайкнувшие + DTO
-    dtos: List[TweetOut] = []
-    for t in tweets:
-        likers = await _fetch_likers(session, t.id)
-        dtos.append(_tweet_to_dto(t, likers=likers))
-    return dtos
+
+async def _hybrid_stream_query(
+    session: AsyncSession,
+    *,
+    viewer_id: int,
+    after: Optional[FeedAfter],
+    version: Optional[FeedVersion] = None,
+) -> Select:
+    """
+    hybrid без limit: слияние потоков целиком — это просто их объединение в
+    порядке ленты, поэтому хватает одного запроса, который можно читать курсором.
+    """
+    followee_ids = await _followee_ids(session, viewer_id, version)
+    celebs = sorted(await timeline.celebrity_ids(session, followee_ids))
+    pushed_ids = select(HomeTimeline.tweet_id).where(HomeTimeline.user_id == viewer_id)
+    if not celebs:
+        return _feed_query(after).where(Tweet.id.in_(pushed_ids))
+    pushed_ids = pushed_ids.where(HomeTimeline.author_id.notin_(celebs))
+    return _feed_query(after).where(or_(Tweet.id.in_(pushed_ids), Tweet.author_id.in_(celebs)))
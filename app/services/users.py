@@ -1,14 +1,34 @@
 # app/services/users.py
 # CRUD и бизнес-логика для пользователей
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import delete, select
+from sqlalchemy import (
+    Select,
+    Update,
+    case,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.db.dialects import dialect_name, is_foreign_key_violation
 from app.exceptions import AlreadyExists, EntityNotFound, ForbiddenAction
-from app.models import Follow, User
-from app.schemas import UserProfile, UserPublic
+from app.models import Follow, HomeTimeline, Like, Tweet, User
+from app.models.media import tweet_media
+from app.serialization import ProfileWire, UserWire
+from app.services import events, timeline
+from app.services.auth_cache import Principal
+from app.services.cursors import decode_cursor, encode_cursor, parse_cursor_int, parse_cursor_str
 
 
 # ===== Внутренние хелперы (возвращают ORM) =====
@@ -23,75 +43,304 @@ async def _get_user_by_api_key(session: AsyncSession, api_key: str) -> Optional[
     return result_user.scalar_one_or_none()
 
 
-async def list_followers(session: AsyncSession, user_id: int) -> list[User]:
-    """Список подписчиков user_id (возвращает ORM-объекты)."""
-    followers_query = (
-        select(User)
+async def get_principal_by_api_key(session: AsyncSession, api_key: str) -> Optional[Principal]:
+    """Лёгкий поиск по API-ключу: только id и username, без ORM-объекта в identity map."""
+    query = select(User.id, User.username).where(User.api_key == api_key).limit(1)
+    row = (await session.execute(query)).first()
+    return Principal(row.id, row.username) if row is not None else None
+
+
+def _followers_query(user_id: int) -> Select:
+    """Подписчики: follows читается только из индекса (followee_id, follower_id)."""
+    return (
+        select(User.id, User.username)
         .join(Follow, Follow.follower_id == User.id)
         .where(Follow.followee_id == user_id)
-        .order_by(User.username.asc())
+        .order_by(User.username.asc(), User.id.asc())
     )
-    followers_result = await session.execute(followers_query)
-    return list(followers_result.scalars().all())
 
 
-async def list_following(session: AsyncSession, user_id: int) -> list[User]:
-    """Список пользователей, на кого подписан user_id (возвращает ORM-объекты)."""
-    following_query = (
-        select(User)
+def _following_query(user_id: int) -> Select:
+    """Подписки: follows читается из уникального индекса (follower_id, followee_id)."""
+    return (
+        select(User.id, User.username)
         .join(Follow, Follow.followee_id == User.id)
         .where(Follow.follower_id == user_id)
-        .order_by(User.username.asc())
+        .order_by(User.username.asc(), User.id.asc())
     )
-    following_result = await session.execute(following_query)
-    return list(following_result.scalars().all())
+
+
+async def _follows_page(
+    session: AsyncSession, query: Select, *, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[UserWire], Optional[str]]:
+    """Страница списка подписок (keyset по (username, id)) и next_cursor."""
+    q = query.limit(limit + 1)
+    if cursor is not None:
+        after_name, after_id = decode_cursor(cursor, size=2)
+        q = q.where(
+            tuple_(User.username, User.id)
+            > tuple_(parse_cursor_str(after_name), parse_cursor_int(after_id))
+        )
+    rows = (await session.execute(q)).all()
+
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].username, rows[-1].id)
+    return [{"id": r.id, "name": r.username} for r in rows], next_cursor
 
 
 # ===== Публичные функции сервиса (контракты совпадают с роутами) =====
-async def get_public_profile(session: AsyncSession, user_id: int) -> UserProfile:
+async def get_public_profile(session: AsyncSession, user_id: int) -> ProfileWire:
     """Публичный профиль пользователя (для /api/users/{id})."""
     user = await _get_user_by_id(session, user_id)
     if not user:
         raise EntityNotFound("user not found")
 
-    followers = await list_followers(session, user_id)
-    following = await list_following(session, user_id)
+    # списки в профиле ограничены: у популярного автора их тянуть целиком дорого
+    size = settings.PROFILE_FOLLOWS_PREVIEW_SIZE
+    followers, _ = await _follows_page(session, _followers_query(user_id), limit=size)
+    following, _ = await _follows_page(session, _following_query(user_id), limit=size)
+
+    # формат UserProfile сразу dict-ом (см. app/serialization.py)
+    return {
+        "id": user.id,
+        "name": user.username,
+        "followers": followers,
+        "following": following,
+        "followers_count": user.followers_count,
+        "following_count": user.following_count,
+    }
+
+
+async def list_followers_page(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[UserWire], Optional[str]]:
+    """Страница подписчиков user_id по имени. Возвращает (пользователи, next_cursor)."""
+    if await _get_user_by_id(session, user_id) is None:
+        raise EntityNotFound("user not found")
+    return await _follows_page(
+        session,
+        _followers_query(user_id),
+        limit=limit or settings.FOLLOWS_PAGE_SIZE,
+        cursor=cursor,
+    )
+
 
-    return UserProfile(
-        id=user.id,
-        username=user.username,
-        followers=[UserPublic(id=u.id, username=u.username) for u in followers],
-        following=[UserPublic(id=u.id, username=u.username) for u in following],
+async def list_following_page(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[UserWire], Optional[str]]:
+    """Страница подписок user_id по имени. Возвращает (пользователи, next_cursor)."""
+    if await _get_user_by_id(session, user_id) is None:
+        raise EntityNotFound("user not found")
+    return await _follows_page(
+        session,
+        _following_query(user_id),
+        limit=limit or settings.FOLLOWS_PAGE_SIZE,
+        cursor=cursor,
     )
 
 
 async def follow(session: AsyncSession, *, follower_id: int, followee_id: int) -> None:
     """
     Оформить подписку follower_id -> followee_id. Запрещаем самоподписку
-    и дубли (AlreadyExists).
+    и дубли (AlreadyExists). Вставка — один INSERT … ON CONFLICT DO NOTHING
+    (как в likes.like_tweet): на Postgres несуществующий пользователь — нарушение FK,
+    на SQLite — EXISTS-условия в INSERT … SELECT.
     """
     if follower_id == followee_id:
         raise ForbiddenAction("cannot follow yourself")
 
-    # оба пользователя должны существовать
-    if not await _get_user_by_id(session, follower_id) or not await _get_user_by_id(
-        session, followee_id
-    ):
-        raise EntityNotFound("user not found")
+    if dialect_name(session) == "postgresql":
+        insert = _insert_follow_postgres
+    else:
+        insert = _insert_follow_sqlite
+    versions = await insert(session, follower_id=follower_id, followee_id=followee_id)
+
+    await timeline.backfill_follow(session, follower_id=follower_id, followee_id=followee_id)
+    events.follow_changed(
+        session, follower_id=follower_id, followee_id=followee_id, followed=True, versions=versions
+    )
+
+
+async def _insert_follow_postgres(
+    session: AsyncSession, *, follower_id: int, followee_id: int
+) -> Dict[int, int]:
+    new_follow = (
+        pg_insert(Follow)
+        .values(follower_id=follower_id, followee_id=followee_id)
+        .on_conflict_do_nothing(index_elements=[Follow.follower_id, Follow.followee_id])
+        .returning(Follow.id)
+        .cte("new_follow")
+    )
+    # счётчики меняются в том же запросе, только если подписка вставлена
+    q = _shift_follow_counts(follower_id=follower_id, followee_id=followee_id, delta=1).where(
+        exists(select(new_follow.c.id))
+    )
+    try:
+        updated = dict((await session.execute(q)).tuples().all())
+    except IntegrityError as exc:
+        if is_foreign_key_violation(exc):
+            raise EntityNotFound("user not found") from exc
+        raise
+    if not updated:
+        raise AlreadyExists("subscription already exists")
+    return updated
 
-    async with session.begin_nested():  # SAVEPOINT
-        session.add(Follow(follower_id=follower_id, followee_id=followee_id))
-        try:
-            await session.flush()  # нарушит UNIQUE -> IntegrityError
-        except IntegrityError:
+
+async def _insert_follow_sqlite(
+    session: AsyncSession, *, follower_id: int, followee_id: int
+) -> Dict[int, int]:
+    both_exist = select(literal(follower_id), literal(followee_id)).where(
+        exists().where(User.id == follower_id), exists().where(User.id == followee_id)
+    )
+    inserted = await session.scalar(
+        sqlite_insert(Follow)
+        .from_select([Follow.follower_id, Follow.followee_id], both_exist)
+        .on_conflict_do_nothing(index_elements=[Follow.follower_id, Follow.followee_id])
+        .returning(Follow.id)
+    )
+    if inserted is None:
+        duplicate = exists().where(
+            Follow.follower_id == follower_id, Follow.followee_id == followee_id
+        )
+        if await session.scalar(select(duplicate)):
             raise AlreadyExists("subscription already exists")
+        raise EntityNotFound("user not found")
+    q = _shift_follow_counts(follower_id=follower_id, followee_id=followee_id, delta=1)
+    return dict((await session.execute(q)).tuples().all())
+
+
+def _shift_follow_counts(*, follower_id: int, followee_id: int, delta: int) -> Update:
+    """
+    Атомарно сдвинуть following_count подписчика и followers_count автора на delta
+    (одним UPDATE на стороне БД, без read-modify-write; ниже нуля не опускаем).
+    Тем же UPDATE растёт follows_version обоих — версия профиля и ленты (ETag);
+    RETURNING отдаёт (id, новая follows_version) для графа подписок в памяти.
+    """
+    following = User.following_count + delta
+    followers = User.followers_count + delta
+    return (
+        update(User)
+        .where(User.id.in_((follower_id, followee_id)))
+        .values(
+            following_count=case(
+                (User.id == follower_id, case((following < 0, 0), else_=following)),
+                else_=User.following_count,
+            ),
+            followers_count=case(
+                (User.id == followee_id, case((followers < 0, 0), else_=followers)),
+                else_=User.followers_count,
+            ),
+            follows_version=User.follows_version + 1,
+        )
+        .returning(User.id, User.follows_version)
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def unfollow(session: AsyncSession, *, follower_id: int, followee_id: int) -> None:
     """Отписка follower_id от followee_id. Идемпотентно: если записи нет — ок."""
-    await session.execute(
+    res = await session.execute(
         delete(Follow).where(
             Follow.follower_id == follower_id,
             Follow.followee_id == followee_id,
         )
     )
+    versions: Dict[int, int] = {}
+    if res.rowcount:
+        q = _shift_follow_counts(follower_id=follower_id, followee_id=followee_id, delta=-1)
+        versions = dict((await session.execute(q)).tuples().all())
+    await timeline.prune_follow(session, follower_id=follower_id, followee_id=followee_id)
+    events.follow_changed(
+        session, follower_id=follower_id, followee_id=followee_id, followed=False, versions=versions
+    )
+
+
+async def delete_user(session: AsyncSession, user_id: int) -> None:
+    """
+    Удалить пользователя. Счётчики второй стороны его подписок и likes_count твитов,
+    которые он лайкал, уменьшаем до DELETE (по одному UPDATE, как при отписке/анлайке).
+    Зависимые строки — подписки, лайки, его твиты с вложениями и строки home_timeline —
+    удаляем явно, не полагаясь на каскад по FK (в SQLite он работает только при
+    PRAGMA foreign_keys=ON).
+    """
+    if await _get_user_by_id(session, user_id) is None:
+        raise EntityNotFound("user not found")
+
+    await session.execute(
+        update(User)
+        .where(User.id.in_(select(Follow.followee_id).where(Follow.follower_id == user_id)))
+        .values(
+            followers_count=case((User.followers_count > 0, User.followers_count - 1), else_=0),
+            follows_version=User.follows_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    follower_ids = list(
+        await session.scalars(
+            update(User)
+            .where(User.id.in_(select(Follow.follower_id).where(Follow.followee_id == user_id)))
+            .values(
+                following_count=case((User.following_count > 0, User.following_count - 1), else_=0),
+                follows_version=User.follows_version + 1,
+            )
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+    liked = (
+        await session.execute(
+            update(Tweet)
+            .where(
+                Tweet.id.in_(select(Like.tweet_id).where(Like.user_id == user_id)),
+                Tweet.author_id != user_id,
+            )
+            .values(likes_count=case((Tweet.likes_count > 0, Tweet.likes_count - 1), else_=0))
+            .returning(Tweet.id, Tweet.author_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+
+    own_tweets = select(Tweet.id).where(Tweet.author_id == user_id)
+    for q in (
+        delete(HomeTimeline).where(
+            or_(HomeTimeline.user_id == user_id, HomeTimeline.author_id == user_id)
+        ),
+        delete(Like).where(or_(Like.user_id == user_id, Like.tweet_id.in_(own_tweets))),
+        delete(tweet_media).where(tweet_media.c.tweet_id.in_(own_tweets)),
+        delete(Tweet).where(Tweet.author_id == user_id),
+        delete(Follow).where(or_(Follow.follower_id == user_id, Follow.followee_id == user_id)),
+        delete(User).where(User.id == user_id),
+    ):
+        await session.execute(q.execution_options(synchronize_session=False))
+    await events.likes_changed(session, authors=dict(liked))
+    events.user_deleted(session, user_id=user_id, follower_ids=follower_ids)
+
+
+async def recount_follows(session: AsyncSession) -> int:
+    """
+    Пересчитать users.followers_count / following_count по таблице follows (защита
+    от дрейфа, например после удаления в обход delete_user). Возвращает число исправленных.
+    """
+    followers = select(func.count(Follow.id)).where(Follow.followee_id == User.id).scalar_subquery()
+    following = select(func.count(Follow.id)).where(Follow.follower_id == User.id).scalar_subquery()
+    res = await session.execute(
+        update(User)
+        .where(or_(User.followers_count != followers, User.following_count != following))
+        .values(
+            followers_count=followers,
+            following_count=following,
+            follows_version=User.follows_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount
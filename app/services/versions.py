@@ -0,0 +1,93 @@
+# app/services/versions.py
+# Версии (ETag) ленты и профилей. Счётчики лежат в строках users и растут в той же
+# транзакции, что и само изменение: ETag одинаков у всех воркеров и реплик, а запись
+# в обход приложения (служебные команды) сдвигает его так же, как обычный запрос.
+import hashlib
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Follow, User
+
+# меняется вместе с форматом ответов: старые ETag клиентов не должны дать 304 на новый формат
+_FORMAT = "2"
+
+
+async def bump_authors(session: AsyncSession, author_ids: Iterable[int]) -> None:
+    """Твиты авторов изменились (созданы/удалены, лайки, производные медиа)."""
+    author_ids = sorted(set(author_ids))
+    if author_ids:
+        await session.execute(
+            update(User)
+            .where(User.id.in_(author_ids))
+            .values(tweets_version=User.tweets_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def bump_all_feeds(session: AsyncSession) -> None:
+    """Ленты всех читателей (home_timeline пересобрана целиком)."""
+    await session.execute(
+        update(User)
+        .values(tweets_version=User.tweets_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _token(*parts: object) -> str:
+    raw = ":".join(str(p) for p in (_FORMAT, *parts))
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=12).hexdigest() + '"'
+
+
+class FeedVersion(NamedTuple):
+    """
+    Версия ленты читателя: follows_version читателя фиксирует состав авторов, сумма
+    их tweets_version (счётчики только растут) — любое изменение их твитов.
+    followee_ids — подписки, по которым считалась сумма, если они пришли из графа
+    в памяти и совпали с БД по follows_version (None — взяты подзапросом к follows).
+    """
+
+    viewer_id: int
+    follows: Optional[int]
+    tweets: Optional[int]
+    followee_ids: Optional[List[int]] = None
+
+    def etag(self, *parts: object) -> str:
+        """ETag представления ленты. parts — параметры запроса (limit, cursor, режим)."""
+        return _token("feed", self.viewer_id, self.follows, self.tweets, *parts)
+
+
+async def feed_version(
+    session: AsyncSession, viewer_id: int, followee_ids: Optional[List[int]] = None
+) -> FeedVersion:
+    """
+    Версия ленты — один запрос по строкам users. followee_ids — подписки читателя
+    из графа в памяти (None — подзапрос к follows); совпадают ли они с БД, вызывающий
+    проверяет по возвращённому follows.
+    """
+    if followee_ids is None:
+        authors = or_(
+            User.id == viewer_id,
+            User.id.in_(select(Follow.followee_id).where(Follow.follower_id == viewer_id)),
+        )
+    else:
+        authors = User.id.in_([viewer_id, *followee_ids])
+    row = (
+        await session.execute(
+            select(
+                select(User.follows_version).where(User.id == viewer_id).scalar_subquery(),
+                select(func.sum(User.tweets_version)).where(authors).scalar_subquery(),
+            )
+        )
+    ).one()
+    return FeedVersion(viewer_id, row[0], row[1], followee_ids)
+
+
+async def profile_etag(session: AsyncSession, user_id: int, *parts: object) -> str:
+    """
+    Версия профиля пользователя (followers/following). parts — для страниц
+    списков подписок: какой список, limit, cursor.
+    """
+    version = await session.scalar(select(User.follows_version).where(User.id == user_id))
+    return _token("profile", user_id, version, *parts)
@@ -2,13 +2,15 @@
 import asyncio
 import os
 import tempfile
-from typing import AsyncGenerator, Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AsyncGenerator, Callable, ContextManager, Generator, Iterator, List
 
 import httpx
 import pytest
 import pytest_asyncio
 from fastapi import FastAPI
-from sqlalchemy import delete
+from sqlalchemy import delete, event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -17,9 +19,12 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from app.db.base import Base
-from app.db.session import get_session
+from app.db.session import get_read_session, get_session
 from app.main import create_app
-from app.models import Follow, Like, Tweet, User
+from app.models import Follow, HomeTimeline, Like, Tweet, User
+from app.models.media import tweet_media
+from app.services import medias
+from app.services.auth_cache import auth_cache
 
 
 # ---------- синхронные фикстуры ----------
@@ -68,6 +73,33 @@ async def engine(test_database_url: str) -> AsyncGenerator[AsyncEngine, None]:
         await eng.dispose()
 
 
+@pytest.fixture
+def count_queries(engine: AsyncEngine) -> Callable[[], ContextManager[List[str]]]:
+    """SQL-запросы, ушедшие в БД внутри блока: `with count_queries() as queries: ...`."""
+
+    @contextmanager
+    def _count() -> Iterator[List[str]]:
+        queries: List[str] = []
+
+        def _on_execute(conn, cursor, statement, *args) -> None:
+            queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _on_execute)
+        try:
+            yield queries
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _on_execute)
+
+    return _count
+
+
+@pytest.fixture(autouse=True)
+def media_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """MEDIA_DIR теста — временный каталог: загрузки и /media не трогают app/media."""
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    return tmp_path
+
+
 @pytest.fixture(scope="session")
 def SessionLocal(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
     """Фабрика async-сессий."""
@@ -85,13 +117,14 @@ async def session(
 
 @pytest_asyncio.fixture
 async def app_overridden(session: AsyncSession) -> FastAPI:
-    """FastAPI-приложение с переопределённой зависимостью get_session."""
+    """FastAPI-приложение: get_session и get_read_session отдают одну тестовую сессию."""
     app = create_app()
 
     async def _override_get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
     app.dependency_overrides[get_session] = _override_get_session
+    app.dependency_overrides[get_read_session] = _override_get_session
     return app
 
 
@@ -107,11 +140,14 @@ async def client(app_overridden: FastAPI) -> AsyncGenerator[httpx.AsyncClient, N
 async def seed_users(session: AsyncSession) -> dict[str, dict[str, int | str]]:
     """Чистим БД и добавляем трёх пользователей."""
     # Чистка (важен порядок FK)
+    await session.execute(delete(HomeTimeline))
     await session.execute(delete(Like))
+    await session.execute(delete(tweet_media))  # id твитов переиспользуются SQLite
     await session.execute(delete(Follow))
     await session.execute(delete(Tweet))
     await session.execute(delete(User))
     await session.commit()
+    auth_cache.clear()  # id пользователей меняются от теста к тесту, ключи — нет
 
     users = [
         User(username="alice", api_key="alice-key-123"),
@@ -0,0 +1,74 @@
+# app/tests/test_auth_cache.py
+"""
+Тесты кэша аутентификации (api_key → Principal):
+- повторный запрос с тем же ключом не ходит в БД, неверный ключ — тоже (негативный кэш)
+- events.user_changed сбрасывает ключ после смены/отзыва
+- put() с устаревшим поколением ничего не кладёт
+"""
+
+import pytest
+from sqlalchemy import update
+
+from app.config import settings
+from app.models import User
+from app.services import events
+from app.services.auth_cache import AuthCache, Principal, auth_cache
+
+ME_PATH = "/api/users/me"
+
+
+def test_auth_cache_put_get_and_invalidate():
+    cache = AuthCache(max_entries=10, ttl=60, negative_max_entries=10, negative_ttl=10)
+    gen = cache.generation
+    cache.put("k1", Principal(1, "alice"), generation=gen)
+    cache.put("k2", Principal(1, "alice"), generation=gen)
+    cache.put("nope", None, generation=gen)
+    assert cache.get("k1") == Principal(1, "alice")
+    assert cache.is_unknown("nope") and not cache.is_unknown("k1")
+
+    cache.invalidate_user(1)  # все ключи пользователя
+    assert cache.get("k1") is None and cache.get("k2") is None
+
+    cache.invalidate_key("nope")  # ключ выдали — негативная запись снимается
+    assert not cache.is_unknown("nope")
+
+    # результат, прочитанный до инвалидации, в кэш не попадает
+    stale = cache.generation
+    cache.invalidate_user(1)
+    cache.put("k1", Principal(1, "alice"), generation=stale)
+    assert cache.get("k1") is None
+
+
+@pytest.mark.asyncio
+async def test_known_and_unknown_keys_skip_db(client, seed_users, count_queries, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_CACHE_ENABLED", True)
+    h = {"api-key": seed_users["alice"]["api_key"]}
+    assert (await client.get(ME_PATH, headers=h)).status_code == 200
+    assert (await client.get(ME_PATH, headers={"api-key": "guess"})).status_code == 401
+
+    with count_queries() as queries:
+        assert (await client.post("/api/tweets", headers=h, json={"tweet_data": "x"})).is_success
+        for _ in range(3):
+            r = await client.get(ME_PATH, headers={"api-key": "guess"})
+            assert r.status_code == 401
+            assert r.json()["detail"] == "Invalid api-key"
+    assert not any("WHERE users.api_key" in s for s in queries)
+
+
+@pytest.mark.asyncio
+async def test_user_changed_drops_revoked_key(client, session, seed_users, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_CACHE_ENABLED", True)
+    alice = seed_users["alice"]
+    old = {"api-key": alice["api_key"]}
+    assert (await client.get(ME_PATH, headers=old)).status_code == 200
+    assert (await client.get(ME_PATH, headers={"api-key": "rotated"})).status_code == 401
+
+    await session.execute(update(User).where(User.id == alice["id"]).values(api_key="rotated"))
+    events.user_changed(session, user_id=alice["id"], api_key="rotated")
+    await session.commit()
+
+    assert (await client.get(ME_PATH, headers=old)).status_code == 401
+    r = await client.get(ME_PATH, headers={"api-key": "rotated"})
+    assert r.status_code == 200
+    assert r.json()["user"]["id"] == alice["id"]
+    assert auth_cache.stats()["entries"] == 1
@@ -0,0 +1,120 @@
+# app/tests/test_db_session.py
+"""
+Настройки движка из Settings (пул, asyncpg statement cache, PRAGMA для SQLite),
+read-only сессии GET-роутов, распознавание нарушений FK.
+"""
+
+import os
+import tempfile
+
+import httpx
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.db import session as db_session
+from app.db.base import Base
+from app.db.dialects import is_foreign_key_violation
+from app.db.session import engine_options, make_engine, read_only_sessionmaker
+from app.main import create_app
+from app.models import Like, User
+
+
+def test_engine_options_follow_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_STATEMENT_CACHE_SIZE", 0)
+    pg = engine_options("postgresql+asyncpg://u:p@localhost/db")
+    assert pg["pool_size"] == 7
+    assert pg["echo"] is False
+    assert pg["connect_args"] == {"statement_cache_size": 0}
+    assert "connect_args" not in engine_options("sqlite+aiosqlite:///./x.db")
+    # in-memory SQLite — один StaticPool, параметры пула неприменимы
+    assert "pool_size" not in engine_options("sqlite+aiosqlite://")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_applied_on_connect(monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_CACHE_SIZE", -2000)
+    monkeypatch.setattr(settings, "SQLITE_MMAP_SIZE", None)  # None — не трогать
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    eng = make_engine(f"sqlite+aiosqlite:///{path}", pool_size=2)
+    try:
+        async with eng.connect() as conn:
+            assert (await conn.scalar(text("PRAGMA journal_mode"))) == "wal"
+            assert (await conn.scalar(text("PRAGMA synchronous"))) == 1  # NORMAL
+            assert (await conn.scalar(text("PRAGMA cache_size"))) == -2000
+            assert (await conn.scalar(text("PRAGMA mmap_size"))) == 0
+        assert eng.pool.size() == 2
+    finally:
+        await eng.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def test_read_sessions_are_read_only_on_postgres():
+    pg = create_async_engine("postgresql+asyncpg://u:p@localhost/db")
+    maker = read_only_sessionmaker(pg)
+    assert maker.kw["bind"].get_execution_options()["postgresql_readonly"] is True
+    assert "postgresql_readonly" not in pg.get_execution_options()
+    # у SQLite read-only транзакций нет — движок тот же
+    lite = create_async_engine("sqlite+aiosqlite://")
+    assert read_only_sessionmaker(lite).kw["bind"] is lite
+
+
+@pytest.mark.asyncio
+async def test_read_connection_released_before_response(monkeypatch):
+    """GET-роут отдаёт соединение в пул до отправки ответа, а не после."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    eng = make_engine(f"sqlite+aiosqlite:///{path}")
+    async with eng.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "alice", "api_key": "k"}])
+    monkeypatch.setattr(db_session, "read_router", db_session.ReadRouter(eng, []))
+
+    app = create_app()
+    checked_out = []
+
+    async def spy(scope, receive, send):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                checked_out.append(eng.pool.checkedout())
+            await send(message)
+
+        await app(scope, receive, wrapped)
+
+    try:
+        transport = httpx.ASGITransport(app=spy)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path_ in ("/api/users/me", "/api/users/1", "/api/tweets"):
+                r = await client.get(path_, headers={"api-key": "k"})
+                assert r.status_code == 200, r.text
+        assert checked_out == [0, 0, 0]
+    finally:
+        await eng.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+@pytest.mark.asyncio
+async def test_foreign_key_violation_is_recognized():
+    eng = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with eng.connect() as conn:
+            await conn.execute(text("PRAGMA foreign_keys=ON"))
+            await conn.run_sync(Base.metadata.create_all)
+            with pytest.raises(IntegrityError) as missing:
+                await conn.execute(insert(Like).values(user_id=1, tweet_id=1))
+            assert is_foreign_key_violation(missing.value)
+
+            await conn.execute(insert(User).values(id=1, username="a", api_key="k"))
+            with pytest.raises(IntegrityError) as duplicate:
+                await conn.execute(insert(User).values(id=2, username="a", api_key="k2"))
+            assert not is_foreign_key_violation(duplicate.value)
+    finally:
+        await eng.dispose()
@@ -0,0 +1,153 @@
+# app/tests/test_feed_cache.py
+"""
+Тесты in-process кэша ленты:
+- LRUTTLCache: TTL, вытеснение по числу записей и по байтам, счётчики
+- FeedCache: попадание без запросов к БД, инвалидация на твит/лайк/подписку
+- запись другой версии ленты (изменение из другого воркера) — промах, не старое тело
+- счётчики доступны через /api/metrics (только с api-key)
+"""
+
+import pytest
+import pytest_asyncio
+
+from app.cache import LRUTTLCache
+from app.config import settings
+from app.services.feed_cache import feed_cache
+
+TWEETS_PATH = "/api/tweets"
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# ---------- LRUTTLCache ----------
+def test_lru_ttl_cache_expires_and_evicts():
+    """Запись живёт ttl секунд; сверх лимитов вытесняется самая давняя по использованию."""
+    clock = _Clock()
+    removed = []
+    cache = LRUTTLCache(
+        max_entries=2,
+        max_bytes=100,
+        ttl=10,
+        clock=clock,
+        on_remove=lambda k, v: removed.append(k),
+    )
+
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    assert cache.get("a") == 1  # "a" теперь свежее "b"
+    cache.set("c", 3, size=10)  # лимит записей → вытесняем "b"
+    assert "b" not in cache and cache.get("c") == 3
+
+    cache.set("big", 4, size=95)  # лимит байт → вытесняем всё остальное
+    assert len(cache) == 1 and cache.get("big") == 4
+
+    clock.now = 11
+    assert cache.get("big") is None  # TTL истёк
+
+    assert removed == ["b", "a", "c", "big"]
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"]) == (3, 1)
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+    assert stats["bytes"] == 0
+
+
+# ---------- FeedCache ----------
+@pytest_asyncio.fixture
+async def cache_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "FEED_CACHE_ENABLED", True)
+    feed_cache.clear()
+    yield feed_cache
+    feed_cache.clear()
+
+
+async def _feed_ids(client, headers):
+    r = await client.get(TWEETS_PATH, headers=headers)
+    assert r.status_code == 200, r.text
+    return [t["id"] for t in r.json()["tweets"]]
+
+
+@pytest.mark.asyncio
+async def test_feed_cache_hit_skips_feed_queries(client, seed_users, count_queries, cache_enabled):
+    """
+    Повторное чтение ленты обслуживается из кэша: в БД уходит только запрос версии
+    для ETag (auth тоже в кэше), ни одного запроса за самой лентой.
+    """
+    h = {"api-key": seed_users["alice"]["api_key"]}
+    await client.post(TWEETS_PATH, headers=h, json={"tweet_data": "cached"})
+    await _feed_ids(client, h)
+
+    with count_queries() as queries:
+        await _feed_ids(client, h)
+
+    assert len(queries) == 1 and "tweets_version" in queries[0]
+    assert cache_enabled.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_feed_cache_invalidated_by_mutations(client, seed_users, cache_enabled):
+    """Новый твит автора, лайк и подписка читателя сбрасывают закэшированную ленту."""
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": bob["api_key"]}
+
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    r1 = await client.post(TWEETS_PATH, headers=h_bob, json={"tweet_data": "b1"})
+    id1 = r1.json()["tweet_id"]
+    assert await _feed_ids(client, h_alice) == [id1]
+
+    # новый твит followee
+    id2 = (await client.post(TWEETS_PATH, headers=h_bob, json={"tweet_data": "b2"})).json()[
+        "tweet_id"
+    ]
+    assert await _feed_ids(client, h_alice) == [id2, id1]
+
+    # лайк меняет порядок
+    await client.post(f"{TWEETS_PATH}/{id1}/likes", headers=h_bob)
+    assert await _feed_ids(client, h_alice) == [id1, id2]
+
+    # отписка читателя
+    await client.delete(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    assert await _feed_ids(client, h_alice) == []
+
+    stats = (await client.get("/api/metrics", headers=h_alice)).json()["metrics"]["feed_cache"]
+    assert stats["invalidations"] >= 3
+    assert stats["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_feed_cache_ignores_page_of_other_version(
+    client, seed_users, cache_enabled, monkeypatch
+):
+    """
+    Лайк из другого воркера в этот кэш не приходит, но сдвигает версию ленты в БД:
+    закэшированная страница не уходит под новым ETag (и не закрепляется 304-ми).
+    """
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice, h_bob = {"api-key": alice["api_key"]}, {"api-key": bob["api_key"]}
+    tweet_id = (await client.post(TWEETS_PATH, headers=h_alice, json={"tweet_data": "a"})).json()[
+        "tweet_id"
+    ]
+    await _feed_ids(client, h_alice)
+
+    with monkeypatch.context() as m:  # «другой воркер»: инвалидации до этого кэша не доходят
+        m.setattr(cache_enabled, "invalidate_like", lambda *args, **kwargs: None)
+        await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers=h_bob)
+
+    r = await client.get(TWEETS_PATH, headers=h_alice)
+    assert [like["user_id"] for like in r.json()["tweets"][0]["likes"]] == [bob["id"]]
+    assert cache_enabled.stats()["stale"] == 1
+    r304 = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": r.headers["etag"]})
+    assert r304.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_metrics_require_api_key(client, seed_users):
+    assert (await client.get("/api/metrics")).status_code == 401
+    h = {"api-key": seed_users["alice"]["api_key"]}
+    assert (await client.get("/api/metrics", headers=h)).status_code == 200
@@ -0,0 +1,165 @@
+# app/tests/test_follow_graph.py
+"""
+Тесты in-process графа подписок (FOLLOW_GRAPH_ENABLED):
+- CSR + журнал изменений совпадают с эталонным dict[set] при любых add/remove/compact
+- load() читает follows, подписка/отписка через API меняют граф после COMMIT
+- лента в режиме pull берёт подписки из графа, без запроса к follows, — пока версия
+  подписок в графе совпадает с БД; подписка из другого воркера читается из follows
+"""
+
+import asyncio
+import random
+
+import pytest
+import pytest_asyncio
+
+from app.config import settings
+from app.services.follow_graph import _CSR, FollowGraph, follow_graph
+
+TWEETS_PATH = "/api/tweets"
+
+
+# ---------- структура ----------
+def test_csr_rows_and_membership():
+    csr = _CSR.from_sorted([(1, 2), (1, 5), (3, 1), (3, 2), (3, 9)])
+    assert csr.row(1).tolist() == [2, 5]
+    assert csr.row(2).tolist() == []
+    assert csr.row(3).tolist() == [1, 2, 9]
+    assert csr.row(100).tolist() == []  # за концом offsets
+    assert csr.has(3, 9) and not csr.has(3, 5) and not csr.has(0, 1)
+
+    back = csr.transposed()
+    assert [back.row(n).tolist() for n in range(10)] == [
+        [],
+        [3],
+        [1, 3],
+        [],
+        [],
+        [1],
+        [],
+        [],
+        [],
+        [3],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_graph_matches_reference_through_compactions():
+    """
+    Случайные подписки/отписки (в т.ч. новые id за концом массивов) против dict[set].
+    Сжатие идёт в фоне (в потоке), изменения продолжают приходить во время него.
+    """
+    rnd = random.Random(7)
+    graph = FollowGraph(compact_threshold=25)
+    out_ref: dict[int, set[int]] = {}
+    in_ref: dict[int, set[int]] = {}
+    for step in range(2000):
+        a, b = rnd.randint(1, 60 + step // 20), rnd.randint(1, 60 + step // 20)
+        if rnd.random() < 0.6:
+            graph.add(a, b)
+            out_ref.setdefault(a, set()).add(b)
+            in_ref.setdefault(b, set()).add(a)
+        else:
+            graph.remove(a, b)
+            out_ref.get(a, set()).discard(b)
+            in_ref.get(b, set()).discard(a)
+        if step % 7 == 0:
+            await asyncio.sleep(0)  # дать фоновому сжатию стартовать посреди изменений
+        if step % 500 == 0:
+            assert graph.following(a) == sorted(out_ref.get(a, ()))
+    while graph._compaction is not None:
+        await graph._compaction
+    assert graph.compactions > 0
+    for user_id in range(0, 170):
+        assert graph.following(user_id) == sorted(out_ref.get(user_id, ()))
+        assert graph.followers(user_id) == sorted(in_ref.get(user_id, ()))
+        assert graph.following_count(user_id) == len(out_ref.get(user_id, ()))
+
+    graph.remove_user(5)
+    assert graph.following(5) == [] and graph.followers(5) == []
+    assert all(5 not in graph.following(u) for u in range(170))
+
+
+# ---------- интеграция ----------
+@pytest_asyncio.fixture
+async def graph_enabled(monkeypatch, session, seed_users):
+    monkeypatch.setattr(settings, "FOLLOW_GRAPH_ENABLED", True)
+    await follow_graph.load(session)
+    yield follow_graph
+    follow_graph.loaded = False
+
+
+@pytest.mark.asyncio
+async def test_graph_loads_and_follows_api_changes(client, session, seed_users, graph_enabled):
+    alice, bob, jack = seed_users["alice"], seed_users["bob"], seed_users["jack"]
+    h_alice = {"api-key": alice["api_key"]}
+
+    for target in (bob, jack):
+        await client.post(f"/api/users/{target['id']}/follow", headers=h_alice)
+    # тестовая сессия общая и не коммитится зависимостью: граф меняется только после COMMIT
+    assert graph_enabled.following(alice["id"]) == []
+    await session.commit()
+    assert graph_enabled.following(alice["id"]) == sorted([bob["id"], jack["id"]])
+    assert graph_enabled.followers(bob["id"]) == [alice["id"]]
+
+    await client.delete(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    await session.commit()
+    assert graph_enabled.following(alice["id"]) == [jack["id"]]
+
+    # перезагрузка из БД даёт то же состояние
+    await graph_enabled.load(session)
+    assert graph_enabled.following(alice["id"]) == [jack["id"]]
+    assert graph_enabled.followers(bob["id"]) == []
+
+    r = await client.get("/api/metrics", headers=h_alice)
+    assert r.json()["metrics"]["follow_graph"]["edges"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pull_feed_reads_followees_from_graph(
+    client, session, seed_users, count_queries, graph_enabled, monkeypatch
+):
+    monkeypatch.setattr(settings, "FEED_STRATEGY", "pull")
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice, h_bob = {"api-key": alice["api_key"]}, {"api-key": bob["api_key"]}
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    await session.commit()
+    tweet_id = (await client.post(TWEETS_PATH, headers=h_bob, json={"tweet_data": "b"})).json()[
+        "tweet_id"
+    ]
+
+    with count_queries() as queries:
+        r = await client.get(TWEETS_PATH, headers=h_alice)
+
+    assert [t["id"] for t in r.json()["tweets"]] == [tweet_id]
+    assert queries and not any("FROM follows" in q for q in queries)
+
+
+@pytest.mark.asyncio
+async def test_pull_feed_sees_follow_missed_by_graph(
+    client, session, seed_users, graph_enabled, monkeypatch
+):
+    """Подписка из другого воркера до графа не дошла: лента и ETag берут follows из БД."""
+    monkeypatch.setattr(settings, "FEED_STRATEGY", "pull")
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice, h_bob = {"api-key": alice["api_key"]}, {"api-key": bob["api_key"]}
+    tweet_id = (await client.post(TWEETS_PATH, headers=h_bob, json={"tweet_data": "b"})).json()[
+        "tweet_id"
+    ]
+    assert (await client.get(TWEETS_PATH, headers=h_alice)).json()["tweets"] == []
+
+    with monkeypatch.context() as m:  # «другой воркер»: событие подписки графу не приходит
+        m.setattr(graph_enabled, "add", lambda *args, **kwargs: None)
+        await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+        await session.commit()
+    assert graph_enabled.following(alice["id"]) == []
+
+    r = await client.get(TWEETS_PATH, headers=h_alice)
+    assert [t["id"] for t in r.json()["tweets"]] == [tweet_id]
+    r304 = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": r.headers["etag"]})
+    assert r304.status_code == 304
+
+    # после перезагрузки граф снова сверен с БД
+    await graph_enabled.load(session)
+    assert graph_enabled.version(alice["id"]) is not None
+    assert graph_enabled.following(alice["id"]) == [bob["id"]]
@@ -1,9 +1,17 @@
 # app/tests/test_follows.py
 import pytest
+from sqlalchemy import func, select, update
+
+from app.models import Follow, HomeTimeline, Like, Tweet, User
+from app.services.likes import recount_likes
+from app.services.users import delete_user, recount_follows
 
 FOLLOW_POST = "/api/users/{user_id}/follow"
 FOLLOW_DEL = "/api/users/{user_id}/follow"
 PROFILE_GET = "/api/users/{user_id}"
+FOLLOWERS_GET = "/api/users/{user_id}/followers"
+FOLLOWING_GET = "/api/users/{user_id}/following"
+TWEETS_POST = "/api/tweets"
 
 
 @pytest.mark.asyncio
@@ -190,3 +198,166 @@ async def test_profile_lists_followers_and_following_consistently(client, seed_u
     # followers у Alice: bob
     follower_names = sorted([u.get("name") for u in profile["followers"]])
     assert "bob" in follower_names
+
+    assert profile["followers_count"] == 1
+    assert profile["following_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_follows_pages_walk_whole_list_by_name(client, seed_users, monkeypatch):
+    """Списки подписок постранично по имени; профиль встраивает только первые N."""
+    from app.config import settings
+
+    alice, bob, jack = seed_users["alice"], seed_users["bob"], seed_users["jack"]
+    for follower in (bob, jack):
+        r = await client.post(
+            FOLLOW_POST.format(user_id=alice["id"]), headers={"api-key": follower["api_key"]}
+        )
+        assert r.status_code == 200, r.text
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        r = await client.get(FOLLOWERS_GET.format(user_id=alice["id"]), params=params)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        names += [u["name"] for u in body["users"]]
+        cursor = body.get("next_cursor")
+        if cursor is None:
+            break
+    assert names == ["bob", "jack"]
+
+    r = await client.get(FOLLOWING_GET.format(user_id=bob["id"]))
+    assert r.json() == {"result": True, "users": [{"id": alice["id"], "name": "alice"}]}
+
+    monkeypatch.setattr(settings, "PROFILE_FOLLOWS_PREVIEW_SIZE", 1)
+    profile = (await client.get(PROFILE_GET.format(user_id=alice["id"]))).json()["user"]
+    assert [u["name"] for u in profile["followers"]] == ["bob"]
+    assert profile["followers_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_follows_page_rejects_bad_cursor_and_unknown_user(client, seed_users):
+    alice_id = seed_users["alice"]["id"]
+    r = await client.get(FOLLOWING_GET.format(user_id=alice_id), params={"cursor": "garbage"})
+    assert r.status_code == 400, r.text
+    assert r.json()["error_type"] == "DomainValidation"
+
+    r = await client.get(FOLLOWERS_GET.format(user_id=alice_id + 1000))
+    assert r.status_code == 404, r.text
+
+
+@pytest.mark.asyncio
+async def test_feed_follows_subscription_changes(client, seed_users):
+    """
+    Материализованная лента живёт вместе с подписками:
+      - старые твиты Bob появляются у Alice сразу после подписки (backfill)
+      - новый твит Bob попадает в ленту подписчика (fan-out)
+      - после отписки твиты Bob из ленты Alice пропадают, её собственные остаются
+    """
+    alice = seed_users["alice"]
+    bob = seed_users["bob"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": bob["api_key"]}
+
+    async def _post(headers, text):
+        r = await client.post("/api/tweets", headers=headers, json={"tweet_data": text})
+        return r.json()["tweet_id"]
+
+    async def _feed_ids():
+        return {
+            t["id"] for t in (await client.get("/api/tweets", headers=h_alice)).json()["tweets"]
+        }
+
+    old_id = await _post(h_bob, "before follow")
+    own_id = await _post(h_alice, "mine")
+    assert await _feed_ids() == {own_id}
+
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers=h_alice)
+    new_id = await _post(h_bob, "after follow")
+    assert await _feed_ids() == {own_id, old_id, new_id}
+
+    await client.delete(FOLLOW_DEL.format(user_id=bob["id"]), headers=h_alice)
+    assert await _feed_ids() == {own_id}
+
+
+async def _counts(session, user_id):
+    row = (
+        await session.execute(
+            select(User.followers_count, User.following_count).where(User.id == user_id)
+        )
+    ).one()
+    return tuple(row)
+
+
+@pytest.mark.asyncio
+async def test_follow_counters_follow_writes(client, session, seed_users):
+    """followers_count / following_count меняются только реальной подпиской/отпиской."""
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice = {"api-key": alice["api_key"]}
+
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers=h_alice)
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers=h_alice)  # дубль
+    assert await _counts(session, alice["id"]) == (0, 1)
+    assert await _counts(session, bob["id"]) == (1, 0)
+
+    await client.delete(FOLLOW_DEL.format(user_id=bob["id"]), headers=h_alice)
+    await client.delete(FOLLOW_DEL.format(user_id=bob["id"]), headers=h_alice)  # повтор
+    assert await _counts(session, alice["id"]) == (0, 0)
+    assert await _counts(session, bob["id"]) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_delete_user_releases_counterpart_counters(client, session, seed_users):
+    """Подписки удалённого уходят каскадом, а счётчики второй стороны — вместе с ними."""
+    alice, bob, jack = seed_users["alice"], seed_users["bob"], seed_users["jack"]
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers={"api-key": alice["api_key"]})
+    await client.post(FOLLOW_POST.format(user_id=jack["id"]), headers={"api-key": bob["api_key"]})
+
+    await delete_user(session, bob["id"])
+    await session.commit()
+
+    assert await _counts(session, alice["id"]) == (0, 0)
+    assert await _counts(session, jack["id"]) == (0, 0)
+    assert await recount_follows(session) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_user_releases_likes_and_leaves_no_orphans(client, session, seed_users):
+    """Лайки удалённого снимаются со счётчиков, его твиты и строки лент уходят без каскада FK."""
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice, h_bob = {"api-key": alice["api_key"]}, {"api-key": bob["api_key"]}
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers=h_alice)
+    await client.post(FOLLOW_POST.format(user_id=alice["id"]), headers=h_bob)
+    alice_tweet = (await client.post(TWEETS_POST, headers=h_alice, json={"tweet_data": "a"})).json()
+    bob_tweet = (await client.post(TWEETS_POST, headers=h_bob, json={"tweet_data": "b"})).json()
+    await client.post(f"{TWEETS_POST}/{alice_tweet['tweet_id']}/likes", headers=h_bob)
+    await client.post(f"{TWEETS_POST}/{bob_tweet['tweet_id']}/likes", headers=h_alice)
+
+    await delete_user(session, bob["id"])
+    await session.commit()
+
+    likes_count = await session.scalar(
+        select(Tweet.likes_count).where(Tweet.id == alice_tweet["tweet_id"])
+    )
+    assert likes_count == 0
+    assert await recount_likes(session) == 0
+    for column in (Tweet.author_id, Like.user_id, HomeTimeline.author_id, HomeTimeline.user_id):
+        assert await session.scalar(select(func.count()).where(column == bob["id"])) == 0, column
+    assert await session.scalar(select(func.count()).select_from(Like)) == 0  # лайк его твита
+    r = await client.get("/api/tweets", headers=h_alice)
+    assert [t["id"] for t in r.json()["tweets"]] == [alice_tweet["tweet_id"]]
+
+
+@pytest.mark.asyncio
+async def test_recount_follows_repairs_drift(client, session, seed_users):
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    await client.post(FOLLOW_POST.format(user_id=bob["id"]), headers={"api-key": alice["api_key"]})
+
+    await session.execute(update(User).values(followers_count=42))
+    await session.execute(
+        Follow.__table__.insert().values(follower_id=bob["id"], followee_id=alice["id"])
+    )
+    assert await recount_follows(session) == 3
+    assert await _counts(session, alice["id"]) == (1, 1)
+    assert await _counts(session, bob["id"]) == (1, 1)
@@ -0,0 +1,44 @@
+# app/tests/test_indexes.py
+"""
+Планы запросов (SQLite, EXPLAIN QUERY PLAN): составные индексы из миграции
+a96611d0c2cf используются реальными запросами сервисов, без полного скана
+и без сортировки во временном B-дереве там, где порядок даёт индекс.
+"""
+
+import pytest
+from sqlalchemy import Select, text
+
+from app.services.timeline import _backfill_rows
+from app.services.tweets import _likers_query, _tweets_query
+from app.services.users import _followers_query
+
+
+async def _plan(session, q: Select) -> str:
+    sql = q.compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    rows = await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_author_tweets_use_author_created_at_index(session):
+    for q in (_tweets_query(1), _backfill_rows(follower_id=2, followee_id=1)):
+        plan = await _plan(session, q)
+        assert "INDEX ix_tweets_author_id_created_at (author_id=?)" in plan  # backfill — COVERING
+        assert "TEMP B-TREE" not in plan  # ORDER BY created_at DESC берётся из индекса
+
+
+@pytest.mark.asyncio
+async def test_likers_read_likes_from_covering_index(session):
+    plan = await _plan(session, _likers_query([1, 2, 3]))
+    assert "SEARCH likes USING COVERING INDEX ix_likes_tweet_id_user_id (tweet_id=?)" in plan
+    assert "SEARCH users USING INTEGER PRIMARY KEY (rowid=?)" in plan
+
+
+@pytest.mark.asyncio
+async def test_followers_read_follows_from_covering_index(session):
+    plan = await _plan(session, _followers_query(1))
+    assert (
+        "SEARCH follows USING COVERING INDEX ix_follows_followee_id_follower_id (followee_id=?)"
+        in plan
+    )
+    assert "SCAN follows" not in plan
@@ -0,0 +1,119 @@
+# app/tests/test_like_buffer.py
+"""
+Тесты write-behind лайков (LIKES_WRITE_BEHIND):
+- пачка даёт каждому запросу тот же ответ, что и прямая запись (успех / AlreadyExists / EntityNotFound)
+- лайк + анлайк одной пары в пачке до БД не доходят, счётчик likes_count верный
+- close() дописывает накопленное (shutdown)
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.exceptions import AlreadyExists
+from app.models import Like, Tweet
+from app.services.like_buffer import LikeBuffer, like_buffer
+
+TWEETS_PATH = "/api/tweets"
+
+
+async def _make_tweets(session, author_id: int, n: int) -> list[int]:
+    tweets = [Tweet(author_id=author_id, content=f"t{i}") for i in range(n)]
+    session.add_all(tweets)
+    await session.commit()
+    return [t.id for t in tweets]
+
+
+async def _likes_state(SessionLocal, tweet_id: int) -> tuple[list[int], int]:
+    async with SessionLocal() as s:
+        users = (await s.scalars(select(Like.user_id).where(Like.tweet_id == tweet_id))).all()
+        count = await s.scalar(select(Tweet.likes_count).where(Tweet.id == tweet_id))
+    return sorted(users), count
+
+
+@pytest.mark.asyncio
+async def test_batch_gives_per_request_results(session, SessionLocal, seed_users):
+    alice, bob, jack = (seed_users[n]["id"] for n in ("alice", "bob", "jack"))
+    t1, t2 = await _make_tweets(session, alice, 2)
+    buffer = LikeBuffer(max_delay=0.01, max_batch=100, session_factory=SessionLocal)
+
+    results = await asyncio.gather(
+        buffer.like(user_id=bob, tweet_id=t1),
+        buffer.like(user_id=bob, tweet_id=t1),  # повтор в той же пачке
+        buffer.like(user_id=jack, tweet_id=t1),
+        buffer.unlike(user_id=jack, tweet_id=t1),  # лайк + анлайк — взаимно гасятся
+        buffer.like(user_id=alice, tweet_id=t2),
+        buffer.like(user_id=bob, tweet_id=999_999),
+        buffer.unlike(user_id=bob, tweet_id=999_999),  # анлайк несуществующего — не ошибка
+        return_exceptions=True,
+    )
+    assert [type(r).__name__ for r in results] == [
+        "NoneType",
+        "AlreadyExists",
+        "NoneType",
+        "NoneType",
+        "NoneType",
+        "EntityNotFound",
+        "NoneType",
+    ]
+    assert buffer.stats()["flushes"] == 1
+    assert buffer.stats()["rows_written"] == 2  # лайк jack не записывался вовсе
+    assert await _likes_state(SessionLocal, t1) == ([bob], 1)
+    assert await _likes_state(SessionLocal, t2) == ([alice], 1)
+
+    # следующая пачка видит записанное: повторный лайк — AlreadyExists, анлайк снимает
+    with pytest.raises(AlreadyExists):
+        await buffer.like(user_id=bob, tweet_id=t1)
+    await buffer.unlike(user_id=bob, tweet_id=t1)
+    assert await _likes_state(SessionLocal, t1) == ([], 0)
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending(session, SessionLocal, seed_users):
+    alice, bob = seed_users["alice"]["id"], seed_users["bob"]["id"]
+    (tweet_id,) = await _make_tweets(session, alice, 1)
+    buffer = LikeBuffer(max_delay=60, max_batch=100, session_factory=SessionLocal)
+
+    pending = [
+        asyncio.ensure_future(buffer.like(user_id=uid, tweet_id=tweet_id)) for uid in (alice, bob)
+    ]
+    await asyncio.sleep(0)
+    assert buffer.stats()["pending"] == 2 and not any(p.done() for p in pending)
+
+    await buffer.close()  # не ждёт max_delay
+    assert all(p.done() and p.exception() is None for p in pending)
+    assert await _likes_state(SessionLocal, tweet_id) == ([alice, bob], 2)
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped(session, SessionLocal, seed_users):
+    alice = seed_users["alice"]["id"]
+    tweet_ids = await _make_tweets(session, alice, 5)
+    buffer = LikeBuffer(max_delay=60, max_batch=2, session_factory=SessionLocal)
+    await asyncio.gather(*(buffer.like(user_id=alice, tweet_id=t) for t in tweet_ids))
+    assert buffer.stats()["flushes"] == 3
+    async with SessionLocal() as s:
+        assert await s.scalar(select(func.count()).select_from(Like)) == 5
+
+
+@pytest.mark.asyncio
+async def test_like_routes_use_buffer(client, session, SessionLocal, seed_users, monkeypatch):
+    monkeypatch.setattr(settings, "LIKES_WRITE_BEHIND", True)
+    monkeypatch.setattr(like_buffer, "session_factory", SessionLocal)
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    (tweet_id,) = await _make_tweets(session, alice["id"], 1)
+    h = {"api-key": bob["api_key"]}
+
+    r = await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers=h)
+    assert r.status_code == 200, r.text
+    r = await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers=h)
+    assert r.status_code in (400, 409)
+    assert r.json()["error_type"] == "AlreadyExists"
+    r = await client.post(f"{TWEETS_PATH}/999999/likes", headers=h)
+    assert r.json()["error_type"] == "EntityNotFound"
+    r = await client.delete(f"{TWEETS_PATH}/{tweet_id}/likes", headers=h)
+    assert r.status_code == 200
+    assert await _likes_state(SessionLocal, tweet_id) == ([], 0)
+    assert like_buffer.stats()["pending"] == 0
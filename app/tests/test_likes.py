@@ -1,5 +1,13 @@
 # app/tests/test_likes.py
 import pytest
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.exceptions import AlreadyExists, EntityNotFound
+from app.models import Tweet
+from app.services.likes import _insert_like_postgres, recount_likes
 
 TWEETS_PATH = "/api/tweets"
 
@@ -110,3 +118,154 @@ async def test_likes_reflected_in_feed(client, seed_users):
     # в лайкерах есть Bob
     assert bob_id in liker_ids
     assert "bob" in liker_names
+
+
+@pytest.mark.asyncio
+async def test_likes_count_tracks_like_and_unlike(client, session, seed_users):
+    """tweets.likes_count растёт на лайк, не меняется на дубль, падает на анлайк."""
+    alice = seed_users["alice"]["api_key"]
+    tweet_id = await _create_tweet(client, api_key=alice, text="counter")
+
+    async def _count() -> int:
+        return await session.scalar(select(Tweet.likes_count).where(Tweet.id == tweet_id))
+
+    for key in (seed_users["bob"]["api_key"], seed_users["jack"]["api_key"]):
+        await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": key})
+    assert await _count() == 2
+
+    first = await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": alice})
+    assert first.status_code == 200
+    dup = await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": alice})
+    assert dup.status_code == 409
+    assert await _count() == 3
+
+    await client.delete(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": alice})
+    await client.delete(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": alice})
+    assert await _count() == 2
+
+
+@pytest.mark.asyncio
+async def test_recount_likes_repairs_drift(client, session, seed_users):
+    """recount_likes возвращает счётчик к фактическому числу лайков."""
+    alice = seed_users["alice"]["api_key"]
+    tweet_id = await _create_tweet(client, api_key=alice, text="drift")
+    await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": alice})
+
+    await session.execute(update(Tweet).where(Tweet.id == tweet_id).values(likes_count=42))
+    assert await recount_likes(session) == 1
+    assert await session.scalar(select(Tweet.likes_count).where(Tweet.id == tweet_id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_feed_compact_likes(client, seed_users, monkeypatch):
+    """likes=compact: likes_count, liked_by_me и только последние лайкнувшие."""
+    monkeypatch.setattr(settings, "LIKES_PREVIEW_SIZE", 1)
+    alice, bob, jack = (seed_users[n]["api_key"] for n in ("alice", "bob", "jack"))
+    liked = await _create_tweet(client, api_key=alice, text="popular")
+    quiet = await _create_tweet(client, api_key=alice, text="quiet")
+    for key in (bob, jack):
+        await client.post(f"{TWEETS_PATH}/{liked}/likes", headers={"api-key": key})
+
+    async def compact_feed():
+        r = await client.get(TWEETS_PATH, headers={"api-key": alice}, params={"likes": "compact"})
+        assert r.status_code == 200, r.text
+        return {t["id"]: t for t in r.json()["tweets"]}
+
+    feed = await compact_feed()
+    assert feed[liked]["likes"] == [{"user_id": seed_users["jack"]["id"], "name": "jack"}]
+    assert (feed[liked]["likes_count"], feed[liked]["liked_by_me"]) == (2, False)
+    assert (feed[quiet]["likes"], feed[quiet]["likes_count"]) == ([], 0)
+
+    await client.post(f"{TWEETS_PATH}/{liked}/likes", headers={"api-key": alice})
+    feed = await compact_feed()
+    assert [u["name"] for u in feed[liked]["likes"]] == ["alice"]
+    assert (feed[liked]["likes_count"], feed[liked]["liked_by_me"]) == (3, True)
+
+    # обычный режим не изменился: полный список, без новых полей
+    full = (await client.get(TWEETS_PATH, headers={"api-key": alice})).json()["tweets"]
+    assert "likes_count" not in full[0]
+    assert sorted(u["name"] for u in full[0]["likes"]) == ["alice", "bob", "jack"]
+
+
+@pytest.mark.asyncio
+async def test_list_likes_paginated(client, seed_users):
+    """GET /api/tweets/{id}/likes: от последних к первым, keyset-курсор."""
+    alice, bob, jack = (seed_users[n]["api_key"] for n in ("alice", "bob", "jack"))
+    tweet_id = await _create_tweet(client, api_key=alice, text="likers")
+    for key in (jack, bob, alice):
+        await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": key})
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        r = await client.get(
+            f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": bob}, params=params
+        )
+        assert r.status_code == 200, r.text
+        names.extend(u["name"] for u in r.json()["likes"])
+        cursor = r.json().get("next_cursor")
+        if cursor is None:
+            break
+    assert names == ["alice", "bob", "jack"]
+
+    r = await client.get(f"{TWEETS_PATH}/999999/likes", headers={"api-key": bob})
+    assert r.status_code == 404
+    r = await client.get(
+        f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": bob}, params={"cursor": "bad"}
+    )
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_like_writes_without_lookups(client, seed_users, count_queries):
+    """
+    Лайк — INSERT … ON CONFLICT, инкремент счётчика и версии автора (ETag),
+    без предварительных SELECT-ов.
+    """
+    alice, bob = seed_users["alice"]["api_key"], seed_users["bob"]["api_key"]
+    tweet_id = await _create_tweet(client, api_key=alice, text="cheap like")
+    await client.get("/api/users/me", headers={"api-key": bob})  # api-key → в кэш
+
+    with count_queries() as queries:
+        r = await client.post(f"{TWEETS_PATH}/{tweet_id}/likes", headers={"api-key": bob})
+    assert r.status_code == 200, r.text
+    assert [q.split(None, 1)[0] for q in queries] == ["INSERT", "UPDATE", "UPDATE"]
+
+
+class _CapturingSession:
+    """Подставная сессия: запоминает запрос и отвечает заданным результатом/ошибкой."""
+
+    def __init__(self, result=None, error=None) -> None:
+        self.result, self.error, self.statements = result, error, []
+
+    async def scalar(self, statement):
+        self.statements.append(statement)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _PgError(Exception):
+    def __init__(self, sqlstate: str) -> None:
+        self.sqlstate = sqlstate
+
+
+@pytest.mark.asyncio
+async def test_postgres_like_is_one_statement():
+    """Postgres: одна команда (CTE с ON CONFLICT + UPDATE); дубль и FK — в прежние исключения."""
+    s = _CapturingSession(result=None)
+    with pytest.raises(AlreadyExists):
+        await _insert_like_postgres(s, user_id=1, tweet_id=2)
+    (statement,) = s.statements
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH new_like AS")
+    assert "ON CONFLICT (user_id, tweet_id) DO NOTHING" in sql
+    assert "RETURNING tweets.author_id" in sql
+
+    fk = IntegrityError("INSERT", {}, _PgError("23503"))
+    with pytest.raises(EntityNotFound):
+        await _insert_like_postgres(_CapturingSession(error=fk), user_id=1, tweet_id=2)
+    other = IntegrityError("INSERT", {}, _PgError("23502"))  # not_null_violation
+    with pytest.raises(IntegrityError):
+        await _insert_like_postgres(_CapturingSession(error=other), user_id=1, tweet_id=2)
+    assert await _insert_like_postgres(_CapturingSession(result=7), user_id=1, tweet_id=2) == 7
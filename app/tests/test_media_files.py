@@ -0,0 +1,90 @@
+# app/tests/test_media_files.py
+"""
+Тесты раздачи /media (MediaFiles):
+- immutable-кэш и сильный ETag из имени файла, If-None-Match → 304
+- Range / If-Range для перемотки видео
+- MEDIA_ACCEL_REDIRECT: тело отдаёт nginx, приложение — только заголовки
+- /media берёт каталог при запросе: подменённый MEDIA_DIR раздаётся тем же mount
+"""
+
+import io
+import os
+
+import pytest
+
+from app.config import settings
+from app.routes.media_files import IMMUTABLE
+
+
+async def _upload(client, seed_users, data: bytes, name: str, mime: str) -> str:
+    """Загрузить файл и вернуть его URL (путь из вложения твита)."""
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+    files = {"file": (name, io.BytesIO(data), mime)}
+    media_id = (await client.post("/api/medias", headers=headers, files=files)).json()["media_id"]
+    r = await client.post(
+        "/api/tweets", headers=headers, json={"tweet_data": "m", "tweet_media_ids": [media_id]}
+    )
+    tweet_id = r.json()["tweet_id"]
+    feed = (await client.get("/api/tweets", headers=headers)).json()["tweets"]
+    (path,) = next(t for t in feed if t["id"] == tweet_id)["attachments"]
+    return "/" + path
+
+
+@pytest.mark.asyncio
+async def test_media_is_cached_forever_with_strong_etag(client, seed_users, media_dir):
+    data = os.urandom(5000)
+    url = await _upload(client, seed_users, data, "pic.png", "image/png")
+    assert (media_dir / url.removeprefix("/media/")).read_bytes() == data
+
+    r = await client.get(url)
+    assert r.status_code == 200 and r.content == data
+    assert r.headers["cache-control"] == IMMUTABLE
+    assert r.headers["etag"] == f'"{url.rsplit("/", 1)[1]}"'
+    assert r.headers["content-type"] == "image/png"
+    assert r.headers["x-content-type-options"] == "nosniff"
+
+    r304 = await client.get(url, headers={"If-None-Match": r.headers["etag"]})
+    assert r304.status_code == 304 and r304.content == b""
+    assert r304.headers["etag"] == r.headers["etag"]
+    assert r304.headers["cache-control"] == IMMUTABLE
+
+    head = await client.head(url)
+    assert head.status_code == 200 and head.headers["content-length"] == str(len(data))
+
+
+@pytest.mark.asyncio
+async def test_video_byte_ranges(client, seed_users):
+    data = os.urandom(300_000)
+    url = await _upload(client, seed_users, data, "clip.mp4", "video/mp4")
+
+    r = await client.get(url, headers={"Range": "bytes=100000-100099"})
+    assert r.status_code == 206 and r.content == data[100000:100100]
+    assert r.headers["content-range"] == f"bytes 100000-100099/{len(data)}"
+    assert r.headers["content-type"] == "video/mp4"
+
+    tail = await client.get(url, headers={"Range": "bytes=-10"})
+    assert tail.status_code == 206 and tail.content == data[-10:]
+
+    etag = (await client.head(url)).headers["etag"]
+    same = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert same.status_code == 206 and same.content == data[:10]
+    other = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert other.status_code == 200 and other.content == data  # файл «сменился» — целиком
+
+    bad = await client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert bad.status_code == 416
+
+
+@pytest.mark.asyncio
+async def test_accel_redirect_leaves_body_to_proxy(client, seed_users, monkeypatch):
+    url = await _upload(client, seed_users, os.urandom(1000), "a.png", "image/png")
+    monkeypatch.setattr(settings, "MEDIA_ACCEL_REDIRECT", "/_media/")
+
+    r = await client.get(url)
+    assert r.status_code == 200 and r.content == b""
+    assert r.headers["x-accel-redirect"] == "/_media/" + url.removeprefix("/media/")
+    assert r.headers["content-type"] == "image/png"
+    assert r.headers["cache-control"] == IMMUTABLE and r.headers["etag"]
+
+    r304 = await client.get(url, headers={"If-None-Match": r.headers["etag"]})
+    assert r304.status_code == 304 and "x-accel-redirect" not in r304.headers
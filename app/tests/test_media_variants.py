@@ -0,0 +1,115 @@
+# app/tests/test_media_variants.py
+"""
+Тесты производных картинок (MEDIA_VARIANTS_ENABLED):
+- render_variants: поворот по EXIF, размеры по длинной стороне, EXIF в файлах нет
+- после COMMIT загрузки задание уходит в пул процессов, строки — в media_variants
+- ?media=thumb отдаёт производные, появление производной меняет ETag ленты
+- build_missing выбирает только картинки: видео не перебираются при каждом запуске
+"""
+
+import io
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import Media, MediaVariant
+from app.services import media_variants, medias
+from app.services.media_variants import render_variants, variant_pipeline
+
+Image = pytest.importorskip("PIL.Image")
+
+TWEETS_PATH = "/api/tweets"
+
+
+def _jpeg(width: int, height: int, *, orientation: int = 1) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = orientation  # Orientation
+    exif[0x010F] = "SecretCam"  # Make — не должен попасть в производные
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, "JPEG", exif=exif)
+    return buf.getvalue()
+
+
+def test_render_applies_orientation_and_strips_exif(tmp_path):
+    src = tmp_path / "abcd.jpg"
+    src.write_bytes(_jpeg(2000, 1000, orientation=6))  # повёрнут на 90°: 1000×2000
+
+    rendered, seconds = render_variants(str(src), media_variants._variant_specs(src))
+
+    sizes = {r.kind: (r.width, r.height) for r in rendered}
+    assert sizes == {"clean": (1000, 2000), "feed": (640, 1280), "thumb": (160, 320)}
+    assert seconds > 0
+    for r in rendered:
+        with Image.open(r.dst) as im:
+            assert (im.width, im.height) == sizes[r.kind]
+            assert im.format == ("JPEG" if r.kind == "clean" else "WEBP")
+            assert not im.getexif()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "abcd.clean.jpg",
+        "abcd.feed.webp",
+        "abcd.jpg",
+        "abcd.thumb.webp",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upload_builds_variants_and_feed_points_to_them(
+    client, session, SessionLocal, seed_users, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(settings, "MEDIA_VARIANTS_ENABLED", True)
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    monkeypatch.setattr(variant_pipeline, "session_factory", SessionLocal)
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+
+    files = {"file": ("photo.jpg", io.BytesIO(_jpeg(1600, 900)), "image/jpeg")}
+    media_id = (await client.post("/api/medias", headers=headers, files=files)).json()["media_id"]
+    await client.post(
+        TWEETS_PATH, headers=headers, json={"tweet_data": "фото", "tweet_media_ids": [media_id]}
+    )
+    # задание ставится только после COMMIT загрузки; до него — оригинал
+    r = await client.get(f"{TWEETS_PATH}?media=thumb", headers=headers)
+    (original,) = r.json()["tweets"][0]["attachments"]
+    assert original.endswith(".jpg") and ".thumb." not in original
+    etag = r.headers["etag"]
+
+    done_before = variant_pipeline.done
+    await session.commit()
+    await variant_pipeline.close()  # дождаться фонового задания
+    assert variant_pipeline.done == done_before + 1
+
+    kinds = (
+        await session.scalars(select(MediaVariant.kind).where(MediaVariant.media_id == media_id))
+    ).all()
+    assert sorted(kinds) == ["clean", "feed", "thumb"]
+
+    r = await client.get(f"{TWEETS_PATH}?media=thumb", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200  # производная появилась — ETag другой
+    (thumb,) = r.json()["tweets"][0]["attachments"]
+    assert thumb == original.removesuffix(".jpg") + ".thumb.webp"
+    assert (tmp_path / thumb.removeprefix("media/")).is_file()
+    r = await client.get(TWEETS_PATH, headers=headers)
+    assert r.json()["tweets"][0]["attachments"] == [original]
+
+    stats = (await client.get("/api/metrics", headers=headers)).json()["metrics"]["media_variants"]
+    assert stats["queued"] == 0 and stats["avg_render_ms"] > 0
+
+    # повторное задание для того же медиа ничего не строит
+    assert await variant_pipeline.build_missing() == 0
+
+
+@pytest.mark.asyncio
+async def test_build_missing_selects_only_images(session, SessionLocal, tmp_path, monkeypatch):
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    monkeypatch.setattr(variant_pipeline, "session_factory", SessionLocal)
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / "clip.mp4").write_bytes(b"\0" * 100)
+    (tmp_path / "ab" / "pic.JPG").write_bytes(_jpeg(300, 200))
+    session.add_all([Media(path="media/ab/clip.mp4"), Media(path="media/ab/pic.JPG")])
+    await session.commit()
+
+    skipped_before = variant_pipeline.skipped
+    assert await variant_pipeline.build_missing() == 1
+    assert await variant_pipeline.build_missing() == 0
+    assert variant_pipeline.skipped == skipped_before  # видео ни разу не выбрано
+    await variant_pipeline.close()
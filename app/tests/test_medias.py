@@ -1,7 +1,17 @@
 # app/tests/test_medias.py
+import asyncio
+import hashlib
 import io
+import os
+import threading
+import time
 
 import pytest
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.models import Media
+from app.services import media_layout, medias
 
 
 @pytest.mark.asyncio
@@ -59,3 +69,208 @@ async def test_upload_media_invalid_type_returns_400(client, seed_users):
     assert data["result"] is False
     assert data["error_type"] == "DomainValidation"
     assert "unsupported media type" in data["error_message"]
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_chunks_off_the_event_loop(client, seed_users, tmp_path, monkeypatch):
+    """Файл пишется кусками в пуле media-write, с fsync, без остатков .part."""
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    monkeypatch.setattr(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 1000)
+    monkeypatch.setattr(settings, "MEDIA_FSYNC", "full")
+    fsyncs = []
+    real_fsync = os.fsync
+
+    def _fsync(fd):
+        fsyncs.append(threading.current_thread().name)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", _fsync)
+
+    payload = os.urandom(4500)
+    files = {"file": ("clip.mp4", io.BytesIO(payload), "video/mp4")}
+    r = await client.post(
+        "/api/medias", headers={"api-key": seed_users["alice"]["api_key"]}, files=files
+    )
+    assert r.status_code == 200, r.text
+
+    (saved,) = [p for p in tmp_path.rglob("*") if p.is_file()]
+    digest = hashlib.sha256(payload).hexdigest()
+    assert saved.relative_to(tmp_path).as_posix() == f"{digest[:2]}/{digest[2:4]}/{digest}.mp4"
+    assert saved.read_bytes() == payload
+    assert len(fsyncs) == 4  # файл, его каталог и два новых уровня до MEDIA_DIR
+    assert all(name.startswith("media-write") for name in fsyncs)
+
+
+class _Upload:
+    """
+    Заглушка UploadFile: отдаёт кусок, а когда его запись в потоке началась —
+    падает на чтении или зависает (клиент замолчал, запрос отменят).
+    """
+
+    def __init__(self, *, then: str, writing: threading.Event) -> None:
+        self.then, self.writing, self.reads = then, writing, 0
+
+    async def read(self, _size: int) -> bytes:
+        self.reads += 1
+        if self.reads == 1:
+            return b"x" * 100
+        await asyncio.to_thread(self.writing.wait)
+        if self.then == "error":
+            raise OSError("connection reset")
+        await asyncio.sleep(60)
+        return b""
+
+
+@pytest.mark.parametrize("then", ["error", "cancel"])
+@pytest.mark.asyncio
+async def test_pump_waits_for_chunk_in_flight_before_failing(then):
+    """Ошибка чтения или отмена не обгоняют запись куска в потоке (файл потом закроют)."""
+    writing, written = threading.Event(), []
+
+    def slow_sink(chunk: bytes) -> None:
+        writing.set()
+        time.sleep(0.2)
+        written.append(len(chunk))
+
+    task = asyncio.ensure_future(medias._pump(_Upload(then=then, writing=writing), slow_sink))
+    if then == "cancel":
+        await asyncio.to_thread(writing.wait)
+        await asyncio.sleep(0.01)
+        task.cancel()
+    with pytest.raises((OSError, asyncio.CancelledError)):
+        await task
+    assert written == [100]  # к моменту ошибки кусок дописан, а не оборван закрытием файла
+
+
+@pytest.mark.asyncio
+async def test_upload_empty_file_leaves_nothing(client, seed_users, tmp_path, monkeypatch):
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    files = {"file": ("empty.png", io.BytesIO(b""), "image/png")}
+    r = await client.post(
+        "/api/medias", headers={"api-key": seed_users["alice"]["api_key"]}, files=files
+    )
+    assert r.status_code == 400, r.text
+    assert r.json()["error_message"] == "empty file"
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_same_content_is_stored_once(client, seed_users, tmp_path, monkeypatch):
+    """Повторная загрузка того же содержимого → тот же media_id, файл не пишется заново."""
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    writes = []
+    real_save = medias._save_upload
+
+    async def _counting_save(file, disk_path):
+        writes.append(disk_path.name)
+        return await real_save(file, disk_path)
+
+    monkeypatch.setattr(medias, "_save_upload", _counting_save)
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+    content = os.urandom(2048)
+
+    async def _upload(data, name):
+        files = {"file": (name, io.BytesIO(data), "image/png")}
+        r = await client.post("/api/medias", headers=headers, files=files)
+        assert r.status_code == 200, r.text
+        return r.json()["media_id"]
+
+    first = await _upload(content, "a.png")
+    again = await _upload(content, "copy-of-a.png")
+    other = await _upload(content + b"!", "b.png")
+
+    assert first == again != other
+    assert writes == [
+        hashlib.sha256(content).hexdigest() + ".png",
+        hashlib.sha256(content + b"!").hexdigest() + ".png",
+    ]
+    assert sorted(p.name for p in tmp_path.rglob("*.png")) == sorted(writes)
+
+
+@pytest.mark.asyncio
+async def test_uploaded_file_is_served_from_sharded_path(client, seed_users, media_dir):
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+    content = b"\x89PNG\r\n\x1a\n" + os.urandom(64)
+    files = {"file": ("s.png", io.BytesIO(content), "image/png")}
+    media_id = (await client.post("/api/medias", headers=headers, files=files)).json()["media_id"]
+    rt = await client.post(
+        "/api/tweets", headers=headers, json={"tweet_data": "x", "tweet_media_ids": [media_id]}
+    )
+    digest = hashlib.sha256(content).hexdigest()
+    path = f"media/{digest[:2]}/{digest[2:4]}/{digest}.png"
+    feed = (await client.get("/api/tweets", headers=headers)).json()["tweets"]
+    assert next(t for t in feed if t["id"] == rt.json()["tweet_id"])["attachments"] == [path]
+
+    assert (media_dir / path.removeprefix("media/")).read_bytes() == content
+
+    r = await client.get(f"/{path}")
+    assert r.status_code == 200 and r.content == content
+
+
+@pytest.mark.asyncio
+async def test_migrate_flat_layout_in_batches(session, SessionLocal, tmp_path, monkeypatch):
+    """Старые плоские файлы → ab/cd/<sha256>; строки — пачками, перенос можно повторить."""
+    monkeypatch.setattr(medias, "MEDIA_DIR", tmp_path)
+    await session.execute(delete(Media))
+    same, other = os.urandom(100), os.urandom(100)
+    legacy = {"a1.png": same, "b2.PNG": same, "c3.jpg": other}
+    for name, data in legacy.items():
+        (tmp_path / name).write_bytes(data)
+    session.add_all([Media(path=f"media/{name}") for name in legacy])
+    session.add(Media(path="media/lost.png"))  # файла нет — строка остаётся как была
+    await session.commit()
+
+    report = await media_layout.migrate_layout(batch_size=2, session_factory=SessionLocal)
+    assert report == {"moved": 3, "deduplicated": 1, "missing": 1, "batches": 2}
+
+    def sharded(data, ext):
+        digest = hashlib.sha256(data).hexdigest()
+        return f"media/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    rows = (await session.execute(select(Media.path, Media.content_hash).order_by(Media.id))).all()
+    assert [r.path for r in rows] == [
+        sharded(same, ".png"),
+        sharded(same, ".png"),  # тот же файл, content_hash занят первой строкой
+        sharded(other, ".jpg"),
+        "media/lost.png",
+    ]
+    assert [r.content_hash is not None for r in rows] == [True, False, True, False]
+    for path, data in [(rows[0].path, same), (rows[2].path, other)]:
+        assert (tmp_path / path.removeprefix("media/")).read_bytes() == data
+    # старые файлы ещё отдаются (закэшированные ссылки), пока их не убрали отдельно
+    assert all((tmp_path / name).exists() for name in legacy)
+
+    again = await media_layout.migrate_layout(batch_size=2, session_factory=SessionLocal)
+    assert again["moved"] == 0 and again["missing"] == 1
+
+    (tmp_path / "lost.png").write_bytes(b"found")  # на этот файл строка ещё ссылается
+    assert await media_layout.remove_flat_files(session_factory=SessionLocal) == 3
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == ["lost.png"]
+
+
+@pytest.mark.asyncio
+async def test_migrate_layout_changes_feed_etag(
+    client, session, SessionLocal, seed_users, media_dir
+):
+    """Новый путь вложения меняет ETag ленты: клиент не держит 304-м ссылку на старый файл."""
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+    (media_dir / "old.png").write_bytes(b"legacy")
+    media = Media(path="media/old.png")
+    session.add(media)
+    await session.flush()
+    await client.post(
+        "/api/tweets", headers=headers, json={"tweet_data": "m", "tweet_media_ids": [media.id]}
+    )
+    r = await client.get("/api/tweets", headers=headers)
+    assert r.json()["tweets"][0]["attachments"] == ["media/old.png"]
+    await session.commit()
+
+    assert (await media_layout.migrate_layout(session_factory=SessionLocal))["moved"] == 1
+    session.expire_all()  # сессия запросов в тесте общая: Media.path из другой транзакции
+
+    r = await client.get("/api/tweets", headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 200
+    digest = hashlib.sha256(b"legacy").hexdigest()
+    assert r.json()["tweets"][0]["attachments"] == [
+        f"media/{digest[:2]}/{digest[2:4]}/{digest}.png"
+    ]
@@ -0,0 +1,139 @@
+# app/tests/test_replicas.py
+"""
+Чтение с реплик: две SQLite-базы (primary и «отстающая» реплика).
+GET-роуты читают с реплики, X-Read-Primary и cookie после записи — с primary.
+ETag описывает данные той базы, с которой прочитано тело.
+"""
+
+import os
+import tempfile
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.db import session as db_session
+from app.db.base import Base
+from app.main import create_app
+from app.models import HomeTimeline, Tweet, User
+from app.services import tweets as tweet_service
+
+ALICE_KEY = "alice-replica-key"
+
+
+def _url(path: str) -> str:
+    return f"sqlite+aiosqlite:///{path}"
+
+
+@pytest_asyncio.fixture
+async def two_databases(monkeypatch):
+    """primary и реплика с одинаковой схемой и пользователем; твит есть только на primary."""
+    paths = []
+    for suffix in ("-primary.db", "-replica.db"):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        paths.append(path)
+    primary_engine = create_async_engine(_url(paths[0]))
+    replica_engine = create_async_engine(_url(paths[1]))
+    for eng in (primary_engine, replica_engine):
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{"id": 1, "username": "alice", "api_key": ALICE_KEY}])
+
+    primary = async_sessionmaker(primary_engine, expire_on_commit=False, class_=AsyncSession)
+    async with primary() as s:
+        await tweet_service.create_tweet(s, author_id=1, content="only on primary")
+        await s.commit()
+
+    router = db_session.ReadRouter(primary_engine, [_url(paths[1])])
+    monkeypatch.setattr(db_session, "SessionLocal", primary)
+    monkeypatch.setattr(db_session, "read_router", router)
+    try:
+        yield router
+    finally:
+        await router.dispose()
+        await primary_engine.dispose()
+        await replica_engine.dispose()
+        for path in paths:
+            os.remove(path)
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_client_writes(two_databases):
+    transport = httpx.ASGITransport(app=create_app())
+    headers = {"api-key": ALICE_KEY}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/api/tweets", headers=headers)
+        assert r.status_code == 200, r.text
+        assert r.json()["tweets"] == []  # реплика «отстаёт»
+
+        r = await client.get("/api/tweets", headers={**headers, "X-Read-Primary": "1"})
+        assert [t["content"] for t in r.json()["tweets"]] == ["only on primary"]
+
+        r = await client.post("/api/tweets", headers=headers, json={"tweet_data": "fresh"})
+        assert r.status_code == 200, r.text
+        assert db_session.READ_PRIMARY_COOKIE in r.cookies
+
+        # cookie из ответа на запись → следующее чтение идёт на primary
+        r = await client.get("/api/tweets", headers=headers)
+        assert sorted(t["content"] for t in r.json()["tweets"]) == ["fresh", "only on primary"]
+
+
+@pytest.mark.asyncio
+async def test_etag_comes_from_the_replica_that_served_the_body(two_databases):
+    transport = httpx.ASGITransport(app=create_app())
+    headers = {"api-key": ALICE_KEY}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        stale = await client.get("/api/tweets", headers=headers)
+        fresh = await client.get("/api/tweets", headers={**headers, "X-Read-Primary": "1"})
+        assert stale.json()["tweets"] == [] and len(fresh.json()["tweets"]) == 1
+        assert stale.headers["etag"] != fresh.headers["etag"]
+
+        # пока реплика отстаёт, её ETag не меняется — и пустое тело под свежим ETag не отдаётся
+        r = await client.get(
+            "/api/tweets", headers={**headers, "If-None-Match": stale.headers["etag"]}
+        )
+        assert r.status_code == 304
+
+        # «репликация» догнала primary: тот же твит и та же версия автора
+        async with db_session.SessionLocal() as primary:
+            tweet = (await primary.scalars(select(Tweet))).one()
+            version = await primary.scalar(select(User.tweets_version).where(User.id == 1))
+        async with two_databases.replicas[0]() as replica:
+            await replica.execute(
+                insert(Tweet).values(
+                    id=tweet.id, author_id=1, content=tweet.content, created_at=tweet.created_at
+                )
+            )
+            await replica.execute(
+                insert(HomeTimeline).values(
+                    user_id=1, tweet_id=tweet.id, author_id=1, created_at=tweet.created_at
+                )
+            )
+            await replica.execute(update(User).where(User.id == 1).values(tweets_version=version))
+            await replica.commit()
+
+        r = await client.get(
+            "/api/tweets", headers={**headers, "If-None-Match": stale.headers["etag"]}
+        )
+        assert r.status_code == 200 and r.json() == fresh.json()
+        assert r.headers["etag"] == fresh.headers["etag"]  # версии общие для всех баз
+
+
+def test_replicas_are_picked_round_robin():
+    replicas = ["sqlite+aiosqlite:///:memory:"] * 2
+    router = db_session.ReadRouter(db_session.engine, replicas)
+    picked = [
+        router.pick(Request({"type": "http", "method": "GET", "headers": []})) for _ in range(4)
+    ]
+    assert picked == [router.replicas[0], router.replicas[1]] * 2
+
+    # внутри одного запроса выбор не меняется
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    assert router.pick(request) is router.pick(request)
+
+    stale = Request({"type": "http", "method": "GET", "headers": [(b"x-read-primary", b"1")]})
+    assert router.pick(stale) is router.primary
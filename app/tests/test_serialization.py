@@ -0,0 +1,63 @@
+# app/tests/test_serialization.py
+"""
+Быстрый путь сериализации (app/serialization.py): dict-ы из сервисов проходят
+валидацию схем и дают те же байты, что и pydantic через response_model —
+и с orjson, и на stdlib json.
+"""
+
+import pytest
+
+from app import serialization
+from app.schemas import TweetOut, TweetsResponse, UserProfile, UserProfileResponse
+
+TRICKY = 'кавычки " и \\ слэш / таб\t перевод\n \x01 эмодзи 🚀   <b>&amp;</b>'
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_tweets_body_is_byte_identical(backend):
+    items = [
+        {
+            "id": 1,
+            "content": TRICKY,
+            "attachments": ["media/a b.png", "media/ё.jpg"],
+            "author": {"id": 2, "name": "ünï"},
+            "likes": [{"user_id": 3, "name": TRICKY}, {"user_id": 4, "name": "bob"}],
+        },
+        {"id": 5, "content": "x", "attachments": [], "author": {"id": 2, "name": "a"}, "likes": []},
+        {  # компактный режим лайков
+            "id": 6,
+            "content": "y",
+            "attachments": [],
+            "author": {"id": 2, "name": "a"},
+            "likes": [{"user_id": 3, "name": "c"}],
+            "likes_count": 200000,
+            "liked_by_me": False,
+        },
+    ]
+    models = [TweetOut.model_validate(t) for t in items]
+    for cursor in (None, "eyJhIjoxfQ=="):
+        expected = TweetsResponse(tweets=models, next_cursor=cursor).model_dump_json(
+            by_alias=True, exclude_none=True
+        )
+        assert serialization.tweets_body(items, cursor) == expected.encode()
+
+
+def test_profile_body_is_byte_identical(backend):
+    profile = {
+        "id": 1,
+        "name": TRICKY,
+        "followers": [{"id": 2, "name": "bob"}],
+        "following": [],
+        "followers_count": 1,
+        "following_count": 0,
+    }
+    expected = UserProfileResponse(user=UserProfile.model_validate(profile)).model_dump_json(
+        by_alias=True
+    )
+    assert serialization.profile_body(profile) == expected.encode()
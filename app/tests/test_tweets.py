@@ -6,11 +6,22 @@
 - удаление: своё (ок), чужое → 403, несуществующее → 404
 - сортировка ленты: likes ↓, затем created_at ↓
 - attachments: относительные пути "media/<...>"
+- число SQL-запросов ленты не зависит от её длины
+- постраничная лента (limit + cursor)
+- стратегии ленты pull / push / hybrid дают одинаковый результат
+- ETag / If-None-Match → 304
+- потоковая выдача ленты (NDJSON / chunked JSON)
 """
 
 import io
+import json
 
 import pytest
+from sqlalchemy import update
+
+from app.config import settings
+from app.models import Tweet
+from app.services import likes as like_service
 
 TWEETS_PATH = "/api/tweets"
 MEDIAS_PATH = "/api/medias"
@@ -198,3 +209,207 @@ async def test_attachments_paths_echo_back(client, seed_users):
     tw = next(t for t in feed if t["id"] == tid)
     assert tw["attachments"], "attachments must not be empty"
     assert any(p.endswith(".png") and p.startswith("media/") for p in tw["attachments"])
+
+
+# --------- число запросов ---------
+@pytest.mark.asyncio
+async def test_feed_query_count_is_constant(client, seed_users, count_queries):
+    """Лента из 2 и из 12 твитов (с лайками) стоит одинакового числа запросов."""
+    alice = seed_users["alice"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": seed_users["bob"]["api_key"]}
+    h_jack = {"api-key": seed_users["jack"]["api_key"]}
+
+    await client.post(f"/api/users/{seed_users['bob']['id']}/follow", headers=h_alice)
+
+    async def _post_liked(n: int) -> None:
+        for i in range(n):
+            tid = (await _create_tweet(client, h_bob, text=f"tweet {i}")).json()["tweet_id"]
+            await client.post(f"{TWEETS_PATH}/{tid}/likes", headers=h_alice)
+            await client.post(f"{TWEETS_PATH}/{tid}/likes", headers=h_jack)
+
+    await _post_liked(2)
+    with count_queries() as small:
+        r_small = await client.get(TWEETS_PATH, headers=h_alice)
+    assert len(r_small.json()["tweets"]) == 2
+
+    await _post_liked(10)
+    with count_queries() as big:
+        r_big = await client.get(TWEETS_PATH, headers=h_alice)
+    feed = r_big.json()["tweets"]
+    assert len(feed) == 12
+    assert all([u["name"] for u in t["likes"]] == ["alice", "jack"] for t in feed)
+
+    assert len(big) == len(small)
+
+
+# --------- пагинация ленты ---------
+@pytest.mark.asyncio
+async def test_feed_pages_match_full_feed(client, seed_users):
+    """Страницы по limit=2, склеенные по next_cursor, совпадают с полной лентой."""
+    alice = seed_users["alice"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": seed_users["bob"]["api_key"]}
+
+    await client.post(f"/api/users/{seed_users['bob']['id']}/follow", headers=h_alice)
+    ids = [(await _create_tweet(client, h_bob, text=f"p{i}")).json()["tweet_id"] for i in range(5)]
+    await _create_tweet(client, h_alice, text="own")
+    for tid in ids[1:3]:
+        await client.post(f"{TWEETS_PATH}/{tid}/likes", headers=h_alice)
+
+    full = (await client.get(TWEETS_PATH, headers=h_alice)).json()
+    assert "next_cursor" not in full  # без limit — прежний формат ответа
+
+    paged, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        r = await client.get(TWEETS_PATH, headers=h_alice, params=params)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert len(body["tweets"]) <= 2
+        paged.extend(t["id"] for t in body["tweets"])
+        cursor = body.get("next_cursor")
+        if cursor is None:
+            break
+
+    assert paged == [t["id"] for t in full["tweets"]]
+
+
+@pytest.mark.asyncio
+async def test_feed_invalid_cursor_returns_400(client, seed_users):
+    """Мусор в cursor → 400 DomainValidation."""
+    h = {"api-key": seed_users["alice"]["api_key"]}
+    r = await client.get(TWEETS_PATH, headers=h, params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400, r.text
+    assert r.json()["error_type"] == "DomainValidation"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", ["pull", "push", "hybrid"])
+async def test_feed_strategies_agree(client, seed_users, monkeypatch, strategy):
+    """
+    Все стратегии отдают одну и ту же ленту, целиком и постранично.
+    Порог знаменитости = 2: у Bob два подписчика, в hybrid его твиты дочитываются при чтении,
+    а твиты Jack (один подписчик) раскладываются по лентам.
+    """
+    monkeypatch.setattr(settings, "FEED_STRATEGY", strategy)
+    monkeypatch.setattr(settings, "FEED_CELEBRITY_FOLLOWERS", 2)
+    alice, bob, jack = seed_users["alice"], seed_users["bob"], seed_users["jack"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": bob["api_key"]}
+    h_jack = {"api-key": jack["api_key"]}
+
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_jack)
+    await client.post(f"/api/users/{jack['id']}/follow", headers=h_alice)
+
+    bob_ids = [
+        (await _create_tweet(client, h_bob, text=f"b{i}")).json()["tweet_id"] for i in range(3)
+    ]
+    jack_ids = [
+        (await _create_tweet(client, h_jack, text=f"j{i}")).json()["tweet_id"] for i in range(2)
+    ]
+    own_id = (await _create_tweet(client, h_alice, text="own")).json()["tweet_id"]
+    await client.post(f"{TWEETS_PATH}/{bob_ids[0]}/likes", headers=h_jack)
+    await client.post(f"{TWEETS_PATH}/{bob_ids[0]}/likes", headers=h_alice)
+    await client.post(f"{TWEETS_PATH}/{jack_ids[0]}/likes", headers=h_alice)
+
+    expected = [bob_ids[0], jack_ids[0], own_id, jack_ids[1], bob_ids[2], bob_ids[1]]
+    full = (await client.get(TWEETS_PATH, headers=h_alice)).json()["tweets"]
+    assert [t["id"] for t in full] == expected
+
+    paged, cursor = [], None
+    while True:
+        params = {"limit": 4} if cursor is None else {"limit": 4, "cursor": cursor}
+        body = (await client.get(TWEETS_PATH, headers=h_alice, params=params)).json()
+        paged.extend(t["id"] for t in body["tweets"])
+        cursor = body.get("next_cursor")
+        if cursor is None:
+            break
+    assert paged == expected
+
+    r = await client.get(TWEETS_PATH, headers=h_alice, params={"stream": "ndjson"})
+    assert [json.loads(line)["id"] for line in r.text.splitlines()] == expected
+
+
+@pytest.mark.asyncio
+async def test_feed_stream_formats(client, seed_users, monkeypatch):
+    """Поток (пачками по 2 строки) отдаёт ту же ленту, что и обычный ответ."""
+    monkeypatch.setattr(settings, "FEED_STREAM_CHUNK_SIZE", 2)
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice = {"api-key": alice["api_key"]}
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    ids = [
+        (await _create_tweet(client, {"api-key": bob["api_key"]}, text=f"потоком {i}")).json()[
+            "tweet_id"
+        ]
+        for i in range(5)
+    ]
+    await client.post(f"{TWEETS_PATH}/{ids[2]}/likes", headers=h_alice)
+    plain = await client.get(TWEETS_PATH, headers=h_alice)
+
+    r = await client.get(TWEETS_PATH, headers={**h_alice, "Accept": "application/x-ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in r.text.splitlines()] == plain.json()["tweets"]
+    assert r.headers["etag"] != plain.headers["etag"]
+
+    r = await client.get(TWEETS_PATH, headers=h_alice, params={"stream": "json"})
+    assert r.json() == plain.json()
+
+    r = await client.get(TWEETS_PATH, headers=h_alice, params={"stream": "ndjson", "limit": 2})
+    assert r.status_code == 400
+    r = await client.get(TWEETS_PATH, headers=h_alice, params={"stream": "ndjson", "cursor": "x"})
+    assert r.status_code == 400
+
+
+# --------- условный GET ---------
+@pytest.mark.asyncio
+async def test_feed_etag_not_modified_until_change(client, seed_users):
+    """Повтор с If-None-Match → 304 без тела; лайк твита из ленты меняет ETag."""
+    alice, bob = seed_users["alice"], seed_users["bob"]
+    h_alice = {"api-key": alice["api_key"]}
+    h_bob = {"api-key": bob["api_key"]}
+    await client.post(f"/api/users/{bob['id']}/follow", headers=h_alice)
+    tid = (await _create_tweet(client, h_bob, text="poll me")).json()["tweet_id"]
+
+    r1 = await client.get(TWEETS_PATH, headers=h_alice)
+    etag = r1.headers["etag"]
+
+    r2 = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+    assert r2.headers["etag"] == etag
+
+    # другая страница — другая версия
+    r_page = await client.get(
+        TWEETS_PATH, headers={**h_alice, "If-None-Match": etag}, params={"limit": 1}
+    )
+    assert r_page.status_code == 200
+
+    await client.post(
+        f"{TWEETS_PATH}/{tid}/likes", headers={"api-key": seed_users["jack"]["api_key"]}
+    )
+    r3 = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": etag})
+    assert r3.status_code == 200, r3.text
+    assert r3.headers["etag"] != etag
+    assert r3.json()["tweets"][0]["likes"][0]["name"] == "jack"
+
+
+@pytest.mark.asyncio
+async def test_feed_etag_follows_database_not_process(client, session, seed_users):
+    """
+    Версия ленты берётся из БД: изменение в обход обработчиков этого процесса
+    (другой воркер, служебная команда) тоже меняет ETag.
+    """
+    h_alice = {"api-key": seed_users["alice"]["api_key"]}
+    tid = (await _create_tweet(client, h_alice, text="drift")).json()["tweet_id"]
+    etag = (await client.get(TWEETS_PATH, headers=h_alice)).headers["etag"]
+
+    await session.execute(update(Tweet).where(Tweet.id == tid).values(likes_count=5))
+    r = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": etag})
+    assert r.status_code == 304  # запись в обход сервисов версию не сдвигает
+
+    assert await like_service.recount_likes(session) == 1  # python -m app.commands recount-likes
+    r = await client.get(TWEETS_PATH, headers={**h_alice, "If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
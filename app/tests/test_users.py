@@ -141,3 +141,21 @@ async def test_unfollow_idempotent(client, seed_users):
     r2 = await client.delete(FOLLOW_DEL.format(user_id=bob["id"]), headers=h)
     assert r2.status_code == 200, r2.text
     assert r2.json()["result"] is True
+
+
+# ---------- условный GET профиля ----------
+@pytest.mark.asyncio
+async def test_me_etag_changes_when_followed(client, seed_users):
+    """/me с If-None-Match → 304, пока кто-то не подпишется на пользователя."""
+    headers = {"api-key": seed_users["alice"]["api_key"]}
+    etag = (await client.get(ME_PATH, headers=headers)).headers["etag"]
+
+    r = await client.get(ME_PATH, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    bob_headers = {"api-key": seed_users["bob"]["api_key"]}
+    await client.post(FOLLOW_POST.format(user_id=seed_users["alice"]["id"]), headers=bob_headers)
+
+    r = await client.get(ME_PATH, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert [u["name"] for u in r.json()["user"]["followers"]] == ["bob"]
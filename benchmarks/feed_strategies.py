@@ -0,0 +1,149 @@
+# benchmarks/feed_strategies.py
+"""
+Сравнение стратегий ленты pull / push / hybrid на синтетическом графе подписок
+со степенным (power-law) распределением популярности.
+
+Для каждой стратегии поднимается отдельная временная SQLite-база с одинаковым
+графом; меряется стоимость записи (create_tweet, включая fan-out) и чтения
+(первая страница ленты и лента целиком) для случайных читателей.
+
+    python -m benchmarks.feed_strategies --users 2000 --tweets 3000 --reads 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.db.base import Base
+from app.models import Follow, User
+from app.services import tweets as tweet_service
+from app.services import users as user_service
+
+STRATEGIES = ("pull", "push", "hybrid")
+
+
+def build_graph(users: int, alpha: float, mean_follows: int, seed: int) -> List[Tuple[int, int]]:
+    """
+    Пары (follower, followee): популярность автора ∝ 1 / rank^alpha,
+    число подписок читателя — тоже с тяжёлым хвостом (Парето).
+    """
+    rnd = random.Random(seed)
+    ids = list(range(1, users + 1))
+    weights = [1 / (rank**alpha) for rank in ids]
+    edges = set()
+    for follower in ids:
+        k = min(users - 1, max(1, int(rnd.paretovariate(1.5) * mean_follows / 3)))
+        for followee in rnd.choices(ids, weights=weights, k=k):
+            if followee != follower:
+                edges.add((follower, followee))
+    return sorted(edges)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_strategy(strategy: str, args: argparse.Namespace) -> Dict[str, float]:
+    settings.FEED_STRATEGY = strategy
+    settings.FEED_CELEBRITY_FOLLOWERS = args.threshold
+    settings.FEED_CACHE_ENABLED = False
+
+    fd, path = tempfile.mkstemp(suffix=f"-{strategy}.db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    make_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(User),
+                [
+                    {"id": i, "username": f"u{i}", "api_key": f"k{i}"}
+                    for i in range(1, args.users + 1)
+                ],
+            )
+            edges = build_graph(args.users, args.alpha, args.mean_follows, args.seed)
+            await conn.execute(
+                insert(Follow), [{"follower_id": a, "followee_id": b} for a, b in edges]
+            )
+        async with make_session() as session:
+            # подписки вставлены в обход сервиса: счётчики (порог hybrid) — пересчётом
+            await user_service.recount_follows(session)
+            await session.commit()
+
+        rnd = random.Random(args.seed + 1)
+        authors = [rnd.randint(1, args.users) for _ in range(args.tweets)]
+        # популярные авторы пишут чаще: половина твитов — от топ-1% аккаунтов
+        top = max(1, args.users // 100)
+        authors[: args.tweets // 2] = [rnd.randint(1, top) for _ in range(args.tweets // 2)]
+
+        write_ms: List[float] = []
+        for author_id in authors:
+            async with make_session() as session:
+                t0 = time.perf_counter()
+                await tweet_service.create_tweet(session, author_id=author_id, content="hello")
+                await session.commit()
+                write_ms.append((time.perf_counter() - t0) * 1000)
+
+        viewers = [rnd.randint(1, args.users) for _ in range(args.reads)]
+        page_ms: List[float] = []
+        full_ms: List[float] = []
+        for viewer_id in viewers:
+            async with make_session() as session:
+                t0 = time.perf_counter()
+                await tweet_service.list_feed_page(session, viewer_id=viewer_id, limit=50)
+                page_ms.append((time.perf_counter() - t0) * 1000)
+            async with make_session() as session:
+                t0 = time.perf_counter()
+                await tweet_service.list_feed_page(session, viewer_id=viewer_id)
+                full_ms.append((time.perf_counter() - t0) * 1000)
+
+        return {
+            "edges": len(edges),
+            "write_avg": statistics.mean(write_ms),
+            "write_p95": _percentile(write_ms, 0.95),
+            "page_avg": statistics.mean(page_ms),
+            "page_p95": _percentile(page_ms, 0.95),
+            "full_avg": statistics.mean(full_ms),
+        }
+    finally:
+        await engine.dispose()
+        os.remove(path)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tweets", type=int, default=3000)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--alpha", type=float, default=1.1, help="показатель power-law")
+    parser.add_argument("--mean-follows", type=int, default=40)
+    parser.add_argument("--threshold", type=int, default=200, help="порог знаменитости (hybrid)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    args = parser.parse_args()
+
+    print(
+        f"{'strategy':<8} {'write avg':>10} {'write p95':>10} {'page avg':>10} {'page p95':>10} {'full avg':>10}  (ms)"
+    )
+    for strategy in args.strategies:
+        r = await run_strategy(strategy, args)
+        print(
+            f"{strategy:<8} {r['write_avg']:>10.2f} {r['write_p95']:>10.2f} "
+            f"{r['page_avg']:>10.2f} {r['page_p95']:>10.2f} {r['full_avg']:>10.2f}"
+        )
+    print(f"граф: {args.users} пользователей, {r['edges']} подписок, твитов: {args.tweets}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+# benchmarks/follow_graph.py
+"""
+In-process граф подписок (app/services/follow_graph.py) против dict[int, set[int]]
+на синтетическом power-law графе.
+
+Меряется: сборка (CSR + обратный CSR), память, время ответа «на кого подписан X»
+и «кто подписан на X» для случайных пользователей (в т.ч. самых популярных), и цена
+журнала изменений + compact (в потоке: пауза event loop). Перед замером ответы графа сверяются с множествами.
+
+    python -m benchmarks.follow_graph --users 1000000 --mean-follows 10
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from bisect import bisect
+from itertools import accumulate
+from typing import Awaitable, Callable, Dict, List, Set
+
+from app.services.follow_graph import FollowGraph, _Adjacency, _CSRBuilder
+
+
+def build_out_csr(users: int, alpha: float, mean_follows: int, seed: int) -> _CSRBuilder:
+    """
+    Рёбра (follower, followee) сразу в CSR, по возрастанию follower: популярность
+    автора ∝ 1 / rank^alpha, число подписок — с тяжёлым хвостом (Парето).
+    """
+    rnd = random.Random(seed)
+    cum = list(accumulate(1 / (rank**alpha) for rank in range(1, users + 1)))
+    total = cum[-1]
+    builder = _CSRBuilder()
+    for follower in range(1, users + 1):
+        k = min(users - 1, max(1, int(rnd.paretovariate(1.5) * mean_follows / 3)))
+        followees = {bisect(cum, rnd.random() * total) + 1 for _ in range(k)}
+        followees.discard(follower)
+        builder.extend((follower, f) for f in sorted(followees))
+    return builder
+
+
+def _timed_us(fn: Callable[[int], object], ids: List[int]) -> Dict[str, float]:
+    samples = []
+    for user_id in ids:
+        t0 = time.perf_counter()
+        fn(user_id)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return {
+        "avg": statistics.mean(samples),
+        "p99": samples[min(len(samples) - 1, int(0.99 * len(samples)))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--alpha", type=float, default=1.1, help="показатель power-law")
+    parser.add_argument("--mean-follows", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=20_000)
+    parser.add_argument("--changes", type=int, default=10_000, help="подписок в журнал")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    out = build_out_csr(args.users, args.alpha, args.mean_follows, args.seed).build()
+    gen_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    graph = FollowGraph(compact_threshold=args.changes * 2 + 1)
+    graph._out, graph._in = _Adjacency(out), _Adjacency(out.transposed())
+    transpose_s = time.perf_counter() - t0
+    edges = len(out.targets)
+
+    # эталон: множества с отдельными int-объектами на ребро (как после чтения из БД)
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    following: Dict[int, Set[int]] = {}
+    followers: Dict[int, Set[int]] = {}
+    for node in range(1, out.nodes):
+        row = out.row(node).tolist()
+        if row:
+            following[node] = set(row)
+            for target in row:
+                followers.setdefault(target, set()).add(node)
+    sets_s = time.perf_counter() - t0
+    sets_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    csr_bytes = graph.stats()["bytes"]
+
+    rnd = random.Random(args.seed + 1)
+    ids = [rnd.randint(1, args.users) for _ in range(args.reads)]
+    top = list(range(1, 101))  # самые популярные: длинные списки подписчиков
+    for user_id in ids[:1000] + top:
+        assert graph.following(user_id) == sorted(following.get(user_id, ()))
+        assert graph.followers(user_id) == sorted(followers.get(user_id, ()))
+
+    print(f"граф: {args.users} пользователей, {edges} подписок; генерация {gen_s:.1f} с")
+    print(
+        f"память: CSR {csr_bytes / 2**20:.1f} MiB, dict[set] {sets_bytes / 2**20:.1f} MiB "
+        f"({sets_bytes / csr_bytes:.1f}x); сборка: обратный CSR {transpose_s:.1f} с, "
+        f"множества {sets_s:.1f} с"
+    )
+    print(f"{'запрос (мкс)':<28} {'CSR avg':>9} {'CSR p99':>9} {'sets avg':>9} {'sets p99':>9}")
+    cases = [
+        ("following(случайный)", graph.following, following, ids),
+        ("followers(случайный)", graph.followers, followers, ids),
+        ("followers(топ-100)", graph.followers, followers, top * 10),
+    ]
+    for name, fn, ref, sample in cases:
+        a = _timed_us(fn, sample)
+        b = _timed_us(lambda u, ref=ref: sorted(ref.get(u, ())), sample)
+        print(f"{name:<28} {a['avg']:>9.2f} {a['p99']:>9.2f} {b['avg']:>9.2f} {b['p99']:>9.2f}")
+
+    # журнал изменений: подписки поверх CSR, чтение с журналом, затем compact
+    t0 = time.perf_counter()
+    for _ in range(args.changes):
+        graph.add(rnd.randint(1, args.users), rnd.randint(1, 100))
+    add_us = (time.perf_counter() - t0) / args.changes * 1e6
+    with_delta = _timed_us(graph.followers, top)
+    t0 = time.perf_counter()
+    stall_ms = asyncio.run(_loop_stall_ms(graph.compact()))
+    compact_s = time.perf_counter() - t0
+    print(
+        f"журнал: add {add_us:.2f} мкс; followers(топ-100) с журналом {with_delta['avg']:.0f} мкс; "
+        f"compact {args.changes} подписок: {compact_s:.2f} с "
+        f"(в потоке; макс. пауза event loop {stall_ms:.1f} мс)"
+    )
+
+
+async def _loop_stall_ms(work: Awaitable[None]) -> float:
+    """Выполнить work и вернуть самую долгую паузу event loop за это время."""
+    task = asyncio.ensure_future(work)
+    worst, last = 0.0, time.perf_counter()
+    while not task.done():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        worst, last = max(worst, now - last - 0.001), now
+    await task
+    return worst * 1000
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# benchmarks/media_serving.py
+"""
+Раздача больших файлов из /media: прежний StaticFiles (куски по 64 КиБ) против
+MediaFiles (app/routes/media_files.py) с разным MEDIA_SERVE_CHUNK_SIZE.
+
+Сервер — настоящий uvicorn в отдельном процессе, клиент ходит по loopback:
+- --clients параллельных скачиваний файла --size-mb (МиБ/с суммарно);
+- Range-запросы по 1 МиБ из случайных мест файла (перемотка видео), задержка;
+- повтор с If-None-Match (у MediaFiles — 304 без тела).
+
+    python -m benchmarks.media_serving --size-mb 200 --clients 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+MIB = 1024 * 1024
+
+
+def serve(directory: str, port: int, mode: str) -> None:
+    """Дочерний процесс: только раздача каталога (без БД и остального приложения)."""
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+
+    from app.routes.media_files import MediaFiles
+
+    files = (
+        StaticFiles(directory=directory) if mode == "static" else MediaFiles(directory=directory)
+    )
+    app = Starlette(routes=[Mount("/media", files)])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str) -> None:
+    for _ in range(100):
+        try:
+            await client.head(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("сервер не поднялся")
+
+
+def _ms(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {"p50": statistics.median(samples), "p99": samples[int(0.99 * (len(samples) - 1))]}
+
+
+async def measure(url: str, size: int, args: argparse.Namespace) -> Dict[str, float]:
+    async with httpx.AsyncClient(timeout=None) as client:
+        await _wait_ready(client, url)
+
+        async def download(until: float) -> int:
+            total = 0
+            while time.perf_counter() < until:
+                async with client.stream("GET", url) as r:
+                    async for chunk in r.aiter_raw(MIB):
+                        total += len(chunk)
+            return total
+
+        t0 = time.perf_counter()
+        got = await asyncio.gather(*(download(t0 + args.duration) for _ in range(args.clients)))
+        throughput = sum(got) / (time.perf_counter() - t0) / MIB
+
+        rnd = random.Random(1)
+        ranges = []
+        for _ in range(args.ranges):
+            start = rnd.randrange(0, size - MIB)
+            t = time.perf_counter()
+            r = await client.get(url, headers={"Range": f"bytes={start}-{start + MIB - 1}"})
+            ranges.append((time.perf_counter() - t) * 1000)
+            assert r.status_code == 206 and len(r.content) == MIB, r.status_code
+
+        etag = (await client.head(url)).headers["etag"]
+        revalidate, not_modified = [], 0
+        for _ in range(args.ranges):
+            t = time.perf_counter()
+            async with client.stream("GET", url, headers={"If-None-Match": etag}) as r:
+                not_modified += r.status_code == 304
+                async for _chunk in r.aiter_raw(MIB):
+                    pass  # у StaticFiles тоже 304 (свой ETag), но без immutable-кэша
+            revalidate.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "mib_s": throughput,
+        "range_p50": _ms(ranges)["p50"],
+        "range_p99": _ms(ranges)["p99"],
+        "inm_p50": _ms(revalidate)["p50"],
+        "304": not_modified / args.ranges,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    workdir = Path(tempfile.mkdtemp(prefix="media-serve-bench-"))
+    name = "ab/cd/clip.mp4"
+    (workdir / name).parent.mkdir(parents=True)
+    with (workdir / name).open("wb") as out:
+        for _ in range(args.size_mb):
+            out.write(os.urandom(MIB))
+    size = args.size_mb * MIB
+    url = f"http://127.0.0.1:{args.port}/media/{name}"
+
+    modes = [("static", 64)] + [("media", kb) for kb in args.chunk_kb]
+    print(
+        f"файл {args.size_mb} MiB, {args.clients} клиентов × {args.duration:.0f} с; "
+        f"Range по 1 MiB, мс; сервер uvicorn (loopback)"
+    )
+    print(
+        f"{'mode':<16} {'MiB/s':>8} {'range p50':>10} {'range p99':>10} "
+        f"{'INM p50':>8} {'304':>5}"
+    )
+    try:
+        for mode, chunk_kb in modes:
+            env = {**os.environ, "MEDIA_SERVE_CHUNK_SIZE": str(chunk_kb * 1024)}
+            server = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.media_serving", "--port", str(args.port)]
+                + ["--serve", str(workdir), mode],
+                env=env,
+            )
+            try:
+                r = await measure(url, size, args)
+            finally:
+                server.terminate()
+                server.wait()
+            label = "StaticFiles" if mode == "static" else f"MediaFiles {chunk_kb}K"
+            print(
+                f"{label:<16} {r['mib_s']:>8.0f} {r['range_p50']:>10.2f} {r['range_p99']:>10.2f} "
+                f"{r['inm_p50']:>8.2f} {r['304']:>5.0%}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4, help="параллельных скачиваний")
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд на режим")
+    parser.add_argument("--ranges", type=int, default=200, help="Range-запросов на режим")
+    parser.add_argument("--chunk-kb", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", nargs=2, metavar=("DIR", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:  # дочерний процесс-сервер
+        serve(args.serve[0], args.port, args.serve[1])
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/media_uploads.py
+"""
+Задержка ленты, пока идут загрузки больших медиафайлов: прежняя запись
+(shutil.copyfileobj прямо в event loop) против конвейера app/services/medias.py
+(куски + пул потоков для диска + fsync по MEDIA_FSYNC).
+
+Приложение гоняется in-process через ASGI-транспорт httpx. Читатель ленты
+запрашивает GET /api/tweets подряд: сначала без загрузок (база), затем пока
+--uploads клиентов непрерывно грузят файлы по --size-mb.
+
+    python -m benchmarks.media_uploads --uploads 8 --size-mb 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from fastapi import UploadFile
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db import session as db_session
+from app.db.base import Base
+from app.main import create_app
+from app.models import Tweet, User
+from app.services import medias
+
+PIPELINE_SAVE = medias._save_upload
+
+
+async def legacy_save(file: UploadFile, disk_path: Path) -> int:
+    """Как было: синхронное копирование и stat() внутри async def (блокирует loop)."""
+    with disk_path.open("wb") as out:
+        shutil.copyfileobj(file.file, out)
+        if settings.MEDIA_FSYNC != "off":  # та же политика, что у конвейера
+            out.flush()
+            os.fsync(out.fileno())
+    size = disk_path.stat().st_size
+    if size == 0:
+        disk_path.unlink()
+    return size
+
+
+async def seed(url: str) -> None:
+    eng = db_session.make_engine(url)
+    async with eng.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "reader", "api_key": "k1"}])
+        await conn.execute(
+            insert(Tweet), [{"author_id": 1, "content": f"tweet {i}"} for i in range(200)]
+        )
+    await eng.dispose()
+
+
+def _stats(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "n": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "max": latencies[-1],
+    }
+
+
+async def run(mode: str, url: str, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    medias._save_upload = PIPELINE_SAVE if mode == "pipeline" else legacy_save
+    eng = db_session.make_engine(url)
+    db_session.SessionLocal = async_sessionmaker(eng, expire_on_commit=False, class_=AsyncSession)
+    db_session.read_router = db_session.ReadRouter(eng, [])
+    payload = os.urandom(1024 * 1024) * args.size_mb
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        headers = {"api-key": "k1"}
+
+        async def read_feed(until: float) -> List[float]:
+            latencies = []
+            while time.perf_counter() < until:
+                t0 = time.perf_counter()
+                r = await client.get("/api/tweets?limit=50", headers=headers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                assert r.status_code == 200, r.text
+                await asyncio.sleep(0.005)
+            return latencies
+
+        async def upload(until: float) -> int:
+            done = 0
+            while time.perf_counter() < until:
+                # файловый объект: httpx отдаёт тело кусками, как сеть (bytes ушли бы одним)
+                files = {"file": ("clip.mp4", io.BytesIO(payload), "video/mp4")}
+                r = await client.post("/api/medias", headers=headers, files=files)
+                assert r.status_code == 200, r.text
+                done += 1
+            return done
+
+        idle = await read_feed(time.perf_counter() + args.duration / 2)
+        until = time.perf_counter() + args.duration
+        busy, *uploaded = await asyncio.gather(
+            read_feed(until), *(upload(until) for _ in range(args.uploads))
+        )
+    await eng.dispose()
+    return {"idle": _stats(idle), "busy": _stats(busy), "uploads": {"n": sum(uploaded)}}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=8, help="одновременных загрузок")
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд под нагрузкой")
+    parser.add_argument("--fsync", choices=["off", "file", "full"], default=settings.MEDIA_FSYNC)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "pipeline"])
+    args = parser.parse_args()
+    settings.MEDIA_FSYNC = args.fsync
+
+    workdir = Path(tempfile.mkdtemp(prefix="media-bench-"))
+    medias.MEDIA_DIR = workdir
+    url = f"sqlite+aiosqlite:///{workdir / 'bench.db'}"
+    try:
+        await seed(url)
+        print(
+            f"{args.uploads} загрузок по {args.size_mb} MiB, fsync={args.fsync}; "
+            "задержка GET /api/tweets, мс"
+        )
+        print(
+            f"{'mode':<9} {'idle p50':>9} {'idle p99':>9} {'busy p50':>9} {'busy p99':>9} "
+            f"{'busy max':>9} {'uploads':>8}"
+        )
+        for mode in args.modes:
+            r = await run(mode, url, args)
+            for path in workdir.rglob("*.mp4"):
+                path.unlink()
+            idle, busy = r["idle"], r["busy"]
+            print(
+                f"{mode:<9} {idle['p50']:>9.2f} {idle['p99']:>9.2f} {busy['p50']:>9.2f} "
+                f"{busy['p99']:>9.2f} {busy['max']:>9.2f} {r['uploads']['n']:>8}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# benchmarks/serialization.py
+"""
+Сериализация ленты: прежний путь (валидируемые pydantic-DTO → response_model →
+pydantic JSON) против быстрого (строки → dict → orjson, app/serialization.py).
+
+Строки БД имитируются простыми объектами, чтобы мерить только сборку ответа.
+Перед замером проверяется, что оба пути дают одинаковые байты.
+
+    python -m benchmarks.serialization --tweets 1000 --likes 5 --repeat 50
+"""
+
+import argparse
+import random
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app import serialization
+from app.schemas import LikeUser, TweetOut, TweetsResponse, UserPublic
+from app.services.tweets import _tweet_to_wire
+
+
+def make_rows(tweets: int, likes: int, seed: int) -> List[SimpleNamespace]:
+    rnd = random.Random(seed)
+    users = [SimpleNamespace(id=i, username=f"user_{i}") for i in range(1, 501)]
+    rows = []
+    for i in range(1, tweets + 1):
+        rows.append(
+            SimpleNamespace(
+                id=i,
+                content=" ".join(rnd.choice(["привет", "hello", "🚀", "лента"]) for _ in range(20)),
+                author=rnd.choice(users),
+                attachments=[SimpleNamespace(path=f"media/{i}_{k}.png") for k in range(i % 3)],
+                likers=rnd.sample(users, likes),
+            )
+        )
+    return rows
+
+
+def legacy_path(rows: List[SimpleNamespace]) -> bytes:
+    """Как было: валидация при сборке DTO и ещё раз в response_model, затем pydantic JSON."""
+    items = [
+        TweetOut(
+            id=r.id,
+            content=r.content,
+            attachments=[m.path for m in r.attachments],
+            author=UserPublic(id=r.author.id, username=r.author.username),
+            likes=[LikeUser(user_id=u.id, name=u.username) for u in r.likers],
+        )
+        for r in rows
+    ]
+    adapter = _ADAPTER
+    validated = adapter.validate_python(TweetsResponse(result=True, tweets=items))
+    return adapter.dump_json(validated, by_alias=True, exclude_none=True)
+
+
+def fast_path(rows: List[SimpleNamespace]) -> bytes:
+    items = [
+        _tweet_to_wire(r, likers=[{"user_id": u.id, "name": u.username} for u in r.likers])
+        for r in rows
+    ]
+    return serialization.tweets_body(items)  # type: ignore[arg-type]
+
+
+_ADAPTER = TypeAdapter(TweetsResponse)
+
+
+def measure(fn: Callable[[List[SimpleNamespace]], bytes], rows, repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(rows)
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--likes", type=int, default=5, help="лайкнувших на твит")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = make_rows(args.tweets, args.likes, args.seed)
+    assert legacy_path(rows) == fast_path(rows), "форматы разошлись"
+
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"{'path':<16} {'avg':>8} {'p50':>8} {'min':>8}  (ms, {args.tweets} твитов)")
+    for name, fn in (("pydantic", legacy_path), (f"fast/{backend}", fast_path)):
+        t = measure(fn, rows, args.repeat)
+        print(f"{name:<16} {statistics.mean(t):>8.2f} {statistics.median(t):>8.2f} {min(t):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""home timeline (fan-out on write)
+
+Revision ID: 4d21f2cd3a1f
+Revises: 48a80849195b
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4d21f2cd3a1f"
+down_revision: Union[str, Sequence[str], None] = "48a80849195b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "home_timeline",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("tweet_id", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["tweet_id"], ["tweets.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "tweet_id"),
+    )
+    with op.batch_alter_table("home_timeline", schema=None) as batch_op:
+        batch_op.create_index("ix_home_timeline_user_created", ["user_id", "created_at"], unique=False)
+        batch_op.create_index("ix_home_timeline_user_author", ["user_id", "author_id"], unique=False)
+        batch_op.create_index("ix_home_timeline_tweet_id", ["tweet_id"], unique=False)
+
+    # backfill: собственные твиты автора + твиты всех, на кого подписан читатель
+    op.execute(
+        """
+        INSERT INTO home_timeline (user_id, tweet_id, author_id, created_at)
+        SELECT t.author_id, t.id, t.author_id, t.created_at
+        FROM tweets t
+        UNION ALL
+        SELECT f.follower_id, t.id, t.author_id, t.created_at
+        FROM follows f
+        JOIN tweets t ON t.author_id = f.followee_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("home_timeline", schema=None) as batch_op:
+        batch_op.drop_index("ix_home_timeline_tweet_id")
+        batch_op.drop_index("ix_home_timeline_user_author")
+        batch_op.drop_index("ix_home_timeline_user_created")
+
+    op.drop_table("home_timeline")
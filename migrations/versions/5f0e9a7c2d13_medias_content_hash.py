@@ -0,0 +1,33 @@
+"""medias.content_hash (content-addressed media, deduplication)
+
+Revision ID: 5f0e9a7c2d13
+Revises: e3b8c41f7a25
+Create Date: 2026-10-18 20:12:44.085371
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f0e9a7c2d13"
+down_revision: Union[str, Sequence[str], None] = "e3b8c41f7a25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # старые файлы остаются с NULL (в уникальном индексе NULL-ы не конфликтуют)
+    with op.batch_alter_table("medias", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+        batch_op.create_index("ix_medias_content_hash", ["content_hash"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("medias", schema=None) as batch_op:
+        batch_op.drop_index("ix_medias_content_hash")
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,45 @@
+"""media_variants (thumbnails / feed WebP / EXIF-stripped copies)
+
+Revision ID: 8c1d4e6f2a90
+Revises: 5f0e9a7c2d13
+Create Date: 2026-10-18 22:41:05.513208
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1d4e6f2a90"
+down_revision: Union[str, Sequence[str], None] = "5f0e9a7c2d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # уже загруженные картинки: python -m app.commands build-media-variants
+    op.create_table(
+        "media_variants",
+        sa.Column("media_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["media_id"], ["medias.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("media_id", "kind"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("media_variants")
@@ -0,0 +1,47 @@
+"""tweets.likes_count (denormalized like counter)
+
+Revision ID: 9c3e71b5a0d2
+Revises: 4d21f2cd3a1f
+Create Date: 2026-10-18 10:03:17.224906
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e71b5a0d2"
+down_revision: Union[str, Sequence[str], None] = "4d21f2cd3a1f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("tweets", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("likes_count", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    # backfill из фактических лайков
+    op.execute(
+        """
+        UPDATE tweets
+        SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.tweet_id = tweets.id)
+        """
+    )
+
+    with op.batch_alter_table("tweets", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_tweets_likes_count_created_at", ["likes_count", "created_at"], unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("tweets", schema=None) as batch_op:
+        batch_op.drop_index("ix_tweets_likes_count_created_at")
+        batch_op.drop_column("likes_count")
@@ -0,0 +1,73 @@
+"""composite indexes for feed, likers and followers queries
+
+Revision ID: a96611d0c2cf
+Revises: b7f5d0c4e8a1
+Create Date: 2026-10-18 16:08:42.390117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a96611d0c2cf"
+down_revision: Union[str, Sequence[str], None] = "b7f5d0c4e8a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки)
+NEW_INDEXES = [
+    # твиты автора от новых к старым: ORDER BY created_at DESC, id DESC — прямо из индекса
+    (
+        "ix_tweets_author_id_created_at",
+        "tweets",
+        ["author_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    ),
+    # лайкнувшие пачки твитов: tweet_id → user_id без чтения строк likes
+    ("ix_likes_tweet_id_user_id", "likes", ["tweet_id", "user_id"]),
+    # подписчики автора: followee_id → follower_id без чтения строк follows
+    ("ix_follows_followee_id_follower_id", "follows", ["followee_id", "follower_id"]),
+]
+
+# одноколоночные индексы — префиксы новых составных, только замедляют запись
+REDUNDANT_INDEXES = [
+    ("ix_tweets_author_id", "tweets", ["author_id"]),
+    ("ix_likes_tweet_id", "likes", ["tweet_id"]),
+    ("ix_follows_followee_id", "follows", ["followee_id"]),
+]
+
+
+def _create(indexes, **kw) -> None:
+    for name, table, columns in indexes:
+        op.create_index(name, table, columns, unique=False, **kw)
+
+
+def _drop(indexes, **kw) -> None:
+    for name, table, _columns in indexes:
+        op.drop_index(name, table_name=table, **kw)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name == "postgresql":
+        # CONCURRENTLY не блокирует запись в большие таблицы, но не работает в транзакции.
+        # Если сборка прервалась, останется INVALID-индекс: DROP INDEX и повторить upgrade.
+        with op.get_context().autocommit_block():
+            _create(NEW_INDEXES, postgresql_concurrently=True)
+            _drop(REDUNDANT_INDEXES, postgresql_concurrently=True)
+    else:
+        _create(NEW_INDEXES)
+        _drop(REDUNDANT_INDEXES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            _create(REDUNDANT_INDEXES, postgresql_concurrently=True)
+            _drop(NEW_INDEXES, postgresql_concurrently=True)
+    else:
+        _create(REDUNDANT_INDEXES)
+        _drop(NEW_INDEXES)
@@ -0,0 +1,31 @@
+"""likes (tweet_id, id) index for likers preview and pagination
+
+Revision ID: b7f5d0c4e8a1
+Revises: 9c3e71b5a0d2
+Create Date: 2026-10-18 12:41:05.513207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7f5d0c4e8a1"
+down_revision: Union[str, Sequence[str], None] = "9c3e71b5a0d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ORDER BY id DESC LIMIT n внутри одного твита читается прямо из индекса
+    with op.batch_alter_table("likes", schema=None) as batch_op:
+        batch_op.create_index("ix_likes_tweet_id_id", ["tweet_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("likes", schema=None) as batch_op:
+        batch_op.drop_index("ix_likes_tweet_id_id")
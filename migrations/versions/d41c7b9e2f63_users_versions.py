@@ -0,0 +1,36 @@
+"""users.tweets_version / follows_version (ETag versions)
+
+Revision ID: d41c7b9e2f63
+Revises: 8c1d4e6f2a90
+Create Date: 2026-10-19 10:12:47.301874
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d41c7b9e2f63"
+down_revision: Union[str, Sequence[str], None] = "8c1d4e6f2a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("tweets_version", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("follows_version", sa.Integer(), server_default="0", nullable=False)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("follows_version")
+        batch_op.drop_column("tweets_version")
@@ -0,0 +1,43 @@
+"""users.followers_count / following_count (denormalized follow counters)
+
+Revision ID: e3b8c41f7a25
+Revises: a96611d0c2cf
+Create Date: 2026-10-18 18:21:05.613240
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b8c41f7a25"
+down_revision: Union[str, Sequence[str], None] = "a96611d0c2cf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("followers_count", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("following_count", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    # backfill из фактических подписок (оба подзапроса идут по индексам follows)
+    op.execute("""
+        UPDATE users
+        SET followers_count = (SELECT COUNT(*) FROM follows WHERE follows.followee_id = users.id),
+            following_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = users.id)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("following_count")
+        batch_op.drop_column("followers_count")